@@ -0,0 +1,262 @@
+# This file is part of beets.
+# Copyright 2016, Adrian Sampson.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+"""A cache of the raw responses of the metadata sources, kept in an
+SQLite database next to the library, so that the releases and searches
+looked up by earlier runs are not fetched from the network again.
+"""
+
+from __future__ import annotations
+
+import json
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import TYPE_CHECKING, Any, Callable, NamedTuple
+
+from beets import config, logging
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+log = logging.getLogger("beets")
+
+# How many stale responses can wait to be fetched again. Beyond this,
+# stale responses are returned without being refreshed.
+REFRESH_QUEUE_SIZE = 64
+
+
+class SourceStats(NamedTuple):
+    """What the cache holds for a metadata source."""
+
+    source: str
+    responses: int
+    size: int
+    expired: int
+    hits: int
+
+
+class LookupCache:
+    """Responses of the metadata sources, keyed by the source and a
+    string identifying the request, such as an ID or a search query.
+
+    A response is fresh for `ttl` seconds. For `stale` more seconds, it
+    is still returned, while it is fetched again in the background.
+    The least recently used responses are dropped once the cache grows
+    beyond `max_size` bytes.
+
+    The refreshes are fetched one at a time by a single daemon thread,
+    so they never hold up exiting.
+    """
+
+    table = "responses"
+
+    def __init__(self, path: str, ttl: float, stale: float, max_size: int):
+        self.path = path
+        self.ttl = ttl
+        self.stale = stale
+        self.max_size = max_size
+        self.settings = (path, ttl, stale, max_size)
+        self._refreshing: set[tuple[str, str]] = set()
+        self._lock = threading.Lock()
+        self._queue: queue.Queue[tuple[str, str, Callable[[], Any]]] = (
+            queue.Queue(REFRESH_QUEUE_SIZE)
+        )
+        self._worker: threading.Thread | None = None
+        with self._connect() as conn:
+            conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    source TEXT,
+                    key TEXT,
+                    value TEXT,
+                    size INTEGER,
+                    fetched REAL,
+                    accessed REAL,
+                    hits INTEGER DEFAULT 0,
+                    PRIMARY KEY (source, key));
+                """
+            )
+
+    def _connect(self) -> closing[sqlite3.Connection]:
+        # A connection for each use keeps the cache usable from any
+        # thread.
+        return closing(
+            sqlite3.connect(self.path, timeout=config["timeout"].as_number())
+        )
+
+    def get(self, source: str, key: str, fetch: Callable[[], Any]) -> Any:
+        """Return the response to the request `key` to `source`, calling
+        `fetch` to get it if the cache has no usable response. `fetch`
+        must return data that can be stored as JSON. None is not cached.
+        """
+        now = time.time()
+        with self._connect() as conn, conn:
+            row = conn.execute(
+                f"SELECT value, fetched FROM {self.table} "
+                "WHERE source=? AND key=?",
+                (source, key),
+            ).fetchone()
+            if row and now - row[1] < self.ttl + self.stale:
+                conn.execute(
+                    f"UPDATE {self.table} SET accessed=?, hits=hits+1 "
+                    "WHERE source=? AND key=?",
+                    (now, source, key),
+                )
+        if not row or now - row[1] >= self.ttl + self.stale:
+            return self._fetch(source, key, fetch)
+
+        if now - row[1] >= self.ttl:
+            self._refresh(source, key, fetch)
+        return json.loads(row[0])
+
+    def _fetch(self, source: str, key: str, fetch: Callable[[], Any]) -> Any:
+        value = fetch()
+        if value is not None:
+            self.put(source, key, value)
+        return value
+
+    def _refresh(self, source: str, key: str, fetch: Callable[[], Any]):
+        """Queue a stale response to be fetched again in the background,
+        unless it is already queued or the queue is full.
+        """
+        with self._lock:
+            if (source, key) in self._refreshing:
+                return
+            try:
+                self._queue.put_nowait((source, key, fetch))
+            except queue.Full:
+                return
+            self._refreshing.add((source, key))
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run_refreshes,
+                    name="lookup-cache-refresh",
+                    daemon=True,
+                )
+                self._worker.start()
+
+    def _run_refreshes(self):
+        while True:
+            source, key, fetch = self._queue.get()
+            try:
+                self._fetch(source, key, fetch)
+            except Exception as exc:
+                log.debug("could not refresh {0} {1}: {2}", source, key, exc)
+            finally:
+                with self._lock:
+                    self._refreshing.discard((source, key))
+                self._queue.task_done()
+
+    def put(self, source: str, key: str, value: Any):
+        """Store the response to the request `key` to `source`."""
+        data = json.dumps(value)
+        now = time.time()
+        with self._connect() as conn, conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} "
+                "(source, key, value, size, fetched, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (source, key, data, len(data), now, now),
+            )
+            (total,) = conn.execute(
+                f"SELECT COALESCE(SUM(size), 0) FROM {self.table}"
+            ).fetchone()
+            if total > self.max_size:
+                self._evict(conn, total)
+
+    def _evict(self, conn: sqlite3.Connection, total: int):
+        """Drop the least recently used responses until the cache fits
+        in its size.
+        """
+        evicted = []
+        rows = conn.execute(
+            f"SELECT source, key, size FROM {self.table} ORDER BY accessed"
+        )
+        for source, key, size in rows:
+            if total <= self.max_size:
+                break
+            evicted.append((source, key))
+            total -= size
+        conn.executemany(
+            f"DELETE FROM {self.table} WHERE source=? AND key=?", evicted
+        )
+
+    def responses(self, source: str) -> Iterator[tuple[str, Any]]:
+        """Yield the requests to `source` with their cached responses."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT key, value FROM {self.table} WHERE source=?",
+                (source,),
+            )
+            for key, value in rows:
+                yield key, json.loads(value)
+
+    def stats(self) -> list[SourceStats]:
+        """Describe the responses held for each source."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT source, COUNT(*), SUM(size), "
+                "SUM(fetched < ?), SUM(hits) "
+                f"FROM {self.table} GROUP BY source ORDER BY source",
+                (time.time() - self.ttl,),
+            ).fetchall()
+        return [SourceStats(*row) for row in rows]
+
+    def clear(self, source: str | None = None) -> int:
+        """Drop the responses of `source`, or of all the sources. Return
+        the number of responses dropped.
+        """
+        with self._connect() as conn, conn:
+            if source is None:
+                cursor = conn.execute(f"DELETE FROM {self.table}")
+            else:
+                cursor = conn.execute(
+                    f"DELETE FROM {self.table} WHERE source=?", (source,)
+                )
+        return cursor.rowcount
+
+
+_cache: LookupCache | None = None
+
+
+def get_cache() -> LookupCache | None:
+    """Return the cache set up by the configuration, or None if it is
+    disabled.
+    """
+    global _cache
+    conf = config["lookup_cache"]
+    if not conf["enabled"].get(bool):
+        return None
+    settings = (
+        conf["path"].as_filename(),
+        conf["ttl"].as_number(),
+        conf["stale"].as_number(),
+        int(conf["max_size"].as_number() * 1024 * 1024),
+    )
+    if _cache is None or _cache.settings != settings:
+        _cache = LookupCache(*settings)
+    return _cache
+
+
+def lookup(source: str, key: str, fetch: Callable[[], Any]) -> Any:
+    """Return the response to the request `key` to `source`, from the
+    cache if possible, or else by calling `fetch`.
+    """
+    cache = get_cache()
+    if cache is None:
+        return fetch()
+    return cache.get(source, key, fetch)
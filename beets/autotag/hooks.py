@@ -17,7 +17,7 @@
 from __future__ import annotations
 
 import re
-from functools import total_ordering
+from functools import lru_cache, total_ordering
 from typing import TYPE_CHECKING, Any, Callable, NamedTuple, TypeVar, cast
 
 from jellyfish import levenshtein_distance
@@ -273,6 +273,43 @@ SD_PATTERNS = [
 SD_REPLACE = [
     (r"&", "and"),
 ]
+# The number of normalized strings kept for `string_dist`.
+STRING_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=STRING_CACHE_SIZE)
+def _string_dist_normalize(string: str) -> str:
+    """Transliterate `string` to lowercase ASCII letters and digits, as
+    compared by `_string_dist_basic`.
+    """
+    string = as_string(unidecode(string))
+    return re.sub(r"[^a-z0-9]", "", string.lower())
+
+
+@lru_cache(maxsize=STRING_CACHE_SIZE)
+def _string_dist_prepare(string: str) -> str:
+    """Apply the normalizing substitutions of `string_dist` to
+    `string`.
+    """
+    string = string.lower()
+
+    # Don't penalize strings that move certain words to the end. For
+    # example, "the something" should be considered equal to
+    # "something, the".
+    for word in SD_END_WORDS:
+        if string.endswith(", %s" % word):
+            string = "{} {}".format(word, string[: -len(word) - 2])
+
+    # Perform a couple of basic normalizing substitutions.
+    for pat, repl in SD_REPLACE:
+        string = re.sub(pat, repl, string)
+    return string
+
+
+@lru_cache(maxsize=STRING_CACHE_SIZE)
+def _string_dist_drop(pattern: str, string: str) -> str:
+    """Remove the portions of `string` matched by `pattern`."""
+    return re.sub(pattern, "", string)
 
 
 def _string_dist_basic(str1: str, str2: str) -> float:
@@ -283,10 +320,8 @@ def _string_dist_basic(str1: str, str2: str) -> float:
     """
     assert isinstance(str1, str)
     assert isinstance(str2, str)
-    str1 = as_string(unidecode(str1))
-    str2 = as_string(unidecode(str2))
-    str1 = re.sub(r"[^a-z0-9]", "", str1.lower())
-    str2 = re.sub(r"[^a-z0-9]", "", str2.lower())
+    str1 = _string_dist_normalize(str1)
+    str2 = _string_dist_normalize(str2)
     if not str1 and not str2:
         return 0.0
     return levenshtein_distance(str1, str2) / float(max(len(str1), len(str2)))
@@ -296,28 +331,17 @@ def string_dist(str1: str | None, str2: str | None) -> float:
     """Gives an "intuitive" edit distance between two strings. This is
     an edit distance, normalized by the string length, with a number of
     tweaks that reflect intuition about text.
+
+    The normalized forms of the strings are cached, since the autotagger
+    compares the same titles with many others.
     """
     if str1 is None and str2 is None:
         return 0.0
     if str1 is None or str2 is None:
         return 1.0
 
-    str1 = str1.lower()
-    str2 = str2.lower()
-
-    # Don't penalize strings that move certain words to the end. For
-    # example, "the something" should be considered equal to
-    # "something, the".
-    for word in SD_END_WORDS:
-        if str1.endswith(", %s" % word):
-            str1 = "{} {}".format(word, str1[: -len(word) - 2])
-        if str2.endswith(", %s" % word):
-            str2 = "{} {}".format(word, str2[: -len(word) - 2])
-
-    # Perform a couple of basic normalizing substitutions.
-    for pat, repl in SD_REPLACE:
-        str1 = re.sub(pat, repl, str1)
-        str2 = re.sub(pat, repl, str2)
+    str1 = _string_dist_prepare(str1)
+    str2 = _string_dist_prepare(str2)
 
     # Change the weight for certain string portions matched by a set
     # of regular expressions. We gradually change the strings and build
@@ -327,8 +351,8 @@ def string_dist(str1: str | None, str2: str | None) -> float:
     penalty = 0.0
     for pat, weight in SD_PATTERNS:
         # Get strings that drop the pattern.
-        case_str1 = re.sub(pat, "", str1)
-        case_str2 = re.sub(pat, "", str2)
+        case_str1 = _string_dist_drop(pat, str1)
+        case_str2 = _string_dist_drop(pat, str2)
 
         if case_str1 != str1 or case_str2 != str2:
             # If the pattern was present (i.e., it is deleted in the
@@ -129,9 +129,9 @@ def assign_items(
     """
     log.debug("Computing track assignment...")
     # Construct the cost matrix.
-    costs = [[float(track_distance(i, t)) for t in tracks] for i in items]
+    costs = track_distance_matrix(items, tracks)
     # Assign items to tracks
-    _, _, assigned_item_idxs = lap.lapjv(np.array(costs), extend_cost=True)
+    _, _, assigned_item_idxs = lap.lapjv(costs, extend_cost=True)
     log.debug("...done.")
 
     # Each item in `assigned_item_idxs` list corresponds to a track in the
@@ -220,6 +220,83 @@ def track_distance(
     return dist
 
 
+def track_distance_matrix(
+    items: Sequence[Item],
+    tracks: Sequence[TrackInfo],
+) -> np.ndarray:
+    """Compute the distance of every item to every track, as
+    `track_distance` does, and return them as a matrix with a row for
+    each item and a column for each track.
+
+    The penalties are computed for all the pairs at once, rather than by
+    building a Distance object for each pair. Only the plugins that add
+    to the track distance are asked about each pair.
+    """
+    shape = (len(items), len(tracks))
+    weights = hooks.Distance._weights
+    raw = np.zeros(shape)
+    max_dist = np.zeros(shape)
+    if not items or not tracks:
+        return raw
+
+    def add(key: str, penalty: np.ndarray, mask: np.ndarray):
+        raw[mask] += (penalty * weights[key])[mask]
+        max_dist[mask] += weights[key]
+
+    # Empty track infos are not compared, as in `track_distance`.
+    present = np.broadcast_to([bool(t) for t in tracks], shape)
+
+    # Length.
+    item_lengths = np.array([i.length for i in items], dtype=float)
+    track_lengths = np.array([t.length or 0 for t in tracks], dtype=float)
+    length_max = get_track_length_max()
+    diff = (
+        np.abs(item_lengths[:, np.newaxis] - track_lengths)
+        - get_track_length_grace()
+    )
+    if length_max:
+        ratio = np.clip(np.minimum(diff, length_max), 0, None) / length_max
+    else:
+        ratio = np.zeros(shape)
+    add("track_length", ratio, present & (track_lengths != 0))
+
+    # Title.
+    titles = np.array(
+        [[hooks.string_dist(i.title, t.title) for t in tracks] for i in items]
+    )
+    add("track_title", titles, present)
+
+    # Track index.
+    item_tracks = np.array([i.track or 0 for i in items])[:, np.newaxis]
+    indices = np.array([t.index or 0 for t in tracks])
+    medium_indices = np.array([t.medium_index or 0 for t in tracks])
+    changed = (item_tracks != indices) & (item_tracks != medium_indices)
+    add("track_index", changed, present & (item_tracks != 0) & (indices != 0))
+
+    # Track ID.
+    item_ids = np.array([i.mb_trackid for i in items], dtype=object)
+    track_ids = np.array([t.track_id for t in tracks], dtype=object)
+    has_id = np.array([bool(i.mb_trackid) for i in items])[:, np.newaxis]
+    add("track_id", item_ids[:, np.newaxis] != track_ids, present & has_id)
+
+    # Penalize mismatching disc numbers.
+    discs = np.array([i.disc or 0 for i in items])[:, np.newaxis]
+    mediums = np.array([t.medium or 0 for t in tracks])
+    add("medium", discs != mediums, present & (discs != 0) & (mediums != 0))
+
+    # Plugins.
+    if plugins.track_distance_plugins():
+        for row, item in enumerate(items):
+            for col, track in enumerate(tracks):
+                if not track:
+                    continue
+                dist = plugins.track_distance(item, track)
+                raw[row, col] += dist.raw_distance
+                max_dist[row, col] += dist.max_distance
+
+    return np.divide(raw, max_dist, out=np.zeros(shape), where=max_dist != 0)
+
+
 def distance(
     items: Sequence[Item],
     album_info: AlbumInfo,
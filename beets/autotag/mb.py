@@ -16,6 +16,7 @@
 
 from __future__ import annotations
 
+import json
 import re
 import traceback
 from collections import Counter
@@ -29,6 +30,7 @@ import musicbrainzngs
 import beets
 import beets.autotag.hooks
 from beets import config, logging, plugins, util
+from beets.autotag import cache
 from beets.plugins import MetadataSourcePlugin
 from beets.util.id_extractors import (
     beatport_id_regex,
@@ -119,6 +121,18 @@ BROWSE_CHUNKSIZE = 100
 BROWSE_MAXTRACKS = 500
 
 
+def _request(name: str, *args, **kwargs) -> Any:
+    """Call the `musicbrainzngs` function `name`, or reuse the response
+    of an earlier call from the lookup cache.
+    """
+    key = json.dumps([name, args, kwargs], sort_keys=True)
+    return cache.lookup(
+        "musicbrainz",
+        key,
+        lambda: getattr(musicbrainzngs, name)(*args, **kwargs),
+    )
+
+
 def track_url(trackid: str) -> str:
     return urljoin(BASE_URL, "recording/" + trackid)
 
@@ -412,9 +426,15 @@ def _set_date_str(
                 setattr(info, key, date_num)
 
 
-def album_info(release: dict) -> beets.autotag.hooks.AlbumInfo:
+def album_info(
+    release: dict, browse: bool = True
+) -> beets.autotag.hooks.AlbumInfo:
     """Takes a MusicBrainz release result dictionary and returns a beets
     AlbumInfo object containing the interesting data about that release.
+
+    Unless `browse` is false, the recordings of releases with too many
+    tracks for the release lookup to describe them fully are fetched
+    again.
     """
     # Get artist name using join phrases.
     artist_name, artist_sort_name, artist_credit_name = _flatten_artist_credit(
@@ -434,13 +454,14 @@ def album_info(release: dict) -> beets.autotag.hooks.AlbumInfo:
     # The MusicBrainz API omits 'artist-relation-list' and 'work-relation-list'
     # when the release has more than 500 tracks. So we use browse_recordings
     # on chunks of tracks to recover the same information in this case.
-    if ntracks > BROWSE_MAXTRACKS:
+    if browse and ntracks > BROWSE_MAXTRACKS:
         log.debug("Album {} has too many tracks", release["id"])
         recording_list = []
         for i in range(0, ntracks, BROWSE_CHUNKSIZE):
             log.debug("Retrieving tracks starting at {}", i)
             recording_list.extend(
-                musicbrainzngs.browse_recordings(
+                _request(
+                    "browse_recordings",
                     release=release["id"],
                     limit=BROWSE_CHUNKSIZE,
                     includes=BROWSE_INCLUDES,
@@ -714,7 +735,8 @@ def match_album(
 
     try:
         log.debug("Searching for MusicBrainz releases with: {!r}", criteria)
-        res = musicbrainzngs.search_releases(
+        res = _request(
+            "search_releases",
             limit=config["musicbrainz"]["searchlimit"].get(int), **criteria
         )
     except musicbrainzngs.MusicBrainzError as exc:
@@ -745,7 +767,8 @@ def match_track(
         return
 
     try:
-        res = musicbrainzngs.search_recordings(
+        res = _request(
+            "search_recordings",
             limit=config["musicbrainz"]["searchlimit"].get(int), **criteria
         )
     except musicbrainzngs.MusicBrainzError as exc:
@@ -788,7 +811,7 @@ def _find_actual_release_from_pseudo_release(
 
     actual_id = translations[0]["target"]
 
-    return musicbrainzngs.get_release_by_id(actual_id, RELEASE_INCLUDES)
+    return _request("get_release_by_id", actual_id, RELEASE_INCLUDES)
 
 
 def _merge_pseudo_and_actual_album(
@@ -842,7 +865,7 @@ def album_for_id(releaseid: str) -> beets.autotag.hooks.AlbumInfo | None:
         log.debug("Invalid MBID ({0}).", releaseid)
         return None
     try:
-        res = musicbrainzngs.get_release_by_id(albumid, RELEASE_INCLUDES)
+        res = _request("get_release_by_id", albumid, RELEASE_INCLUDES)
 
         # resolve linked release relations
         actual_res = None
@@ -878,7 +901,7 @@ def track_for_id(releaseid: str) -> beets.autotag.hooks.TrackInfo | None:
         log.debug("Invalid MBID ({0}).", releaseid)
         return None
     try:
-        res = musicbrainzngs.get_recording_by_id(trackid, TRACK_INCLUDES)
+        res = _request("get_recording_by_id", trackid, TRACK_INCLUDES)
     except musicbrainzngs.ResponseError:
         log.debug("Track ID match failed.")
         return None
@@ -16,7 +16,7 @@
 Library.
 """
 
-from .db import Database, Model, Results
+from .db import Aggregate, Database, Index, Model, Results
 from .query import (
     AndQuery,
     FieldQuery,
@@ -33,9 +33,11 @@ from .queryparse import (
 from .types import Type
 
 __all__ = [
+    "Aggregate",
     "AndQuery",
     "Database",
     "FieldQuery",
+    "Index",
     "InvalidQueryError",
     "MatchQuery",
     "Model",
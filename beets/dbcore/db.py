@@ -17,16 +17,36 @@
 from __future__ import annotations
 
 import contextlib
+import functools
 import os
+import queue
 import re
 import sqlite3
 import threading
 import time
+import urllib.parse
 from abc import ABC
-from collections import defaultdict
-from collections.abc import Generator, Iterable, Iterator, Mapping, Sequence
+from collections import OrderedDict, defaultdict
+from collections.abc import (
+    Generator,
+    Hashable,
+    Iterable,
+    Iterator,
+    Mapping,
+    Sequence,
+)
+from itertools import islice
 from sqlite3 import Connection
-from typing import TYPE_CHECKING, Any, AnyStr, Callable, Generic, TypeVar, cast
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AnyStr,
+    Callable,
+    Generic,
+    NamedTuple,
+    TypeVar,
+    cast,
+)
 
 from unidecode import unidecode
 
@@ -37,6 +57,7 @@ from . import types
 from .query import (
     FieldQueryType,
     FieldSort,
+    FlexSource,
     MatchQuery,
     NullSort,
     Query,
@@ -57,6 +78,62 @@ else:
 FlexAttrs = dict[str, str]
 
 
+class Index(NamedTuple):
+    """A secondary index on the table of a model. `on` lists the
+    indexed columns or SQL expressions.
+    """
+
+    name: str
+    on: Sequence[str]
+
+    @classmethod
+    def for_expression(cls, table: str, expression: str) -> Index:
+        """Make an index of `table` on a single column or expression,
+        named after them.
+        """
+        suffix = re.sub(r"\W+", "_", expression).strip("_").lower()
+        return cls(f"{table}_by_{suffix}", (expression,))
+
+
+class Aggregate(NamedTuple):
+    """An aggregate of the values of a field over the objects matching
+    a query: their ``count``, ``sum``, ``min`` or ``max``, possibly of
+    the `distinct` values only. Like in SQL, missing values are ignored
+    and the sum of no values is zero.
+    """
+
+    function: str
+    field: str
+    distinct: bool = False
+
+    _sql_functions = {
+        "count": "COUNT({})",
+        "sum": "COALESCE(SUM({}), 0)",
+        "min": "MIN({})",
+        "max": "MAX({})",
+    }
+
+    def sql(self) -> str:
+        """Generate the SQL expression computing the aggregate."""
+        column = f"DISTINCT {self.field}" if self.distinct else self.field
+        return self._sql_functions[self.function].format(column)
+
+    def compute(self, values: Iterable[Any]) -> Any:
+        """Compute the aggregate of `values` in Python."""
+        values = [v for v in values if v is not None]
+        if self.distinct:
+            values = list(set(values))
+        if self.function == "count":
+            return len(values)
+        elif self.function == "sum":
+            return sum(values)
+        elif self.function == "min":
+            return min(values, default=None)
+        elif self.function == "max":
+            return max(values, default=None)
+        raise ValueError(f"unknown aggregate function {self.function!r}")
+
+
 class DBAccessError(Exception):
     """The SQLite database became inaccessible.
 
@@ -139,6 +216,39 @@ class FormattedMapping(Mapping[str, str]):
         return value
 
 
+class RowValues(Mapping[str, Any]):
+    """A read-only mapping over the values of a database row.
+
+    Columns are looked up through an index map shared by all the rows
+    of a query, so that each row does not need its own dictionary.
+    """
+
+    __slots__ = ("_row", "_index")
+
+    def __init__(self, row: Sequence[Any], index: Mapping[str, int]):
+        self._row = row
+        self._index = index
+
+    def __getitem__(self, key: str) -> Any:
+        return self._row[self._index[key]]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def copy(self) -> RowValues:
+        """Return the mapping itself, since it cannot be modified."""
+        return self
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+
 # NOTE: This seems like it should be a `Mapping`, i.e.
 # ```
 # class LazyConvertDict(Mapping[str, Any])
@@ -151,15 +261,20 @@ class FormattedMapping(Mapping[str, str]):
 class LazyConvertDict:
     """Lazily convert types for attributes fetched from the database"""
 
+    __slots__ = ("_data", "model_cls", "_converted")
+
     def __init__(self, model_cls: Model):
         """Initialize the object empty"""
         # FIXME: Dict[str, SQLiteType]
-        self._data: dict[str, Any] = {}
+        self._data: Mapping[str, Any] = {}
         self.model_cls = model_cls
         self._converted: dict[str, Any] = {}
 
-    def init(self, data: dict[str, Any]):
-        """Set the base data that should be lazily converted"""
+    def init(self, data: Mapping[str, Any]):
+        """Set the base data that should be lazily converted. It may be
+        a read-only mapping such as `RowValues`, which is only copied
+        into a dictionary if a value is deleted.
+        """
         self._data = data
 
     def _convert(self, key: str, value: Any):
@@ -186,6 +301,8 @@ class LazyConvertDict:
         if key in self._converted:
             del self._converted[key]
         if key in self._data:
+            if not isinstance(self._data, dict):
+                self._data = dict(self._data)
             del self._data[key]
 
     def keys(self) -> list[str]:
@@ -303,6 +420,11 @@ class Model(ABC, Generic[D]):
     do not relate to any specific field.
     """
 
+    _indices: Sequence[Index] = ()
+    """Secondary indices on the model's table, created when the database
+    is opened.
+    """
+
     _always_dirty = False
     """By default, fields only become "dirty" when their value actually
     changes. Enabling this flag marks fields as dirty even when the new
@@ -314,6 +436,12 @@ class Model(ABC, Generic[D]):
     to the database.
     """
 
+    _projection: frozenset[str] | None = None
+    """The fields the object was read from the database with, if it was
+    fetched with a projection. Its other fields are only loaded when
+    they are accessed.
+    """
+
     @cached_classproperty
     def _relation(cls):
         """The model that this model is closely related to."""
@@ -340,6 +468,15 @@ class Model(ABC, Generic[D]):
         """Fields in the related table."""
         return cls._relation._fields.keys() - cls.shared_db_fields
 
+    @classmethod
+    def _flex_sources(cls, key: str) -> list[FlexSource]:
+        """Return where the value of the flexible attribute `key` is
+        looked up in the database, in order of precedence.
+        """
+        return [
+            FlexSource(cls._flex_table, f"{cls._table}.id", cls._type(key).sql)
+        ]
+
     @classmethod
     def _getters(cls: type[Model]):
         """Return a mapping from field names to getter functions."""
@@ -373,8 +510,8 @@ class Model(ABC, Generic[D]):
     def _awaken(
         cls: type[AnyModel],
         db: D | None = None,
-        fixed_values: dict[str, Any] = {},
-        flex_values: dict[str, Any] = {},
+        fixed_values: Mapping[str, Any] = {},
+        flex_values: Mapping[str, Any] = {},
     ) -> AnyModel:
         """Create an object with values drawn from the database.
 
@@ -427,6 +564,7 @@ class Model(ABC, Generic[D]):
         new._values_fixed = self._values_fixed.copy()
         new._values_flex = self._values_flex.copy()
         new._dirty = self._dirty.copy()
+        new._projection = self._projection
         return new
 
     # Essential field accessors.
@@ -450,10 +588,16 @@ class Model(ABC, Generic[D]):
         elif key in self._fields:  # Fixed.
             if key in self._values_fixed:
                 return self._values_fixed[key]
+            elif self._unprojected(key):
+                self._load_unprojected()
+                return self._get(key, default, raise_)
             else:
                 return self._type(key).null
         elif key in self._values_flex:  # Flexible.
             return self._values_flex[key]
+        elif self._unprojected(key):
+            self._load_unprojected()
+            return self._get(key, default, raise_)
         elif raise_:
             raise KeyError(key)
         else:
@@ -461,6 +605,15 @@ class Model(ABC, Generic[D]):
 
     get = _get
 
+    def _stored_value(self, key):
+        """Get the value of a field as it is to be stored in the
+        database. Unlike `_get`, this ignores any getter of the same
+        name as a fixed field.
+        """
+        if key in self._fields and not self._unprojected(key):
+            return self._values_fixed.get(key, self._type(key).null)
+        return self[key]
+
     def __getitem__(self, key):
         """Get the value for a field. Raise a KeyError if the field is
         not available.
@@ -495,6 +648,8 @@ class Model(ABC, Generic[D]):
 
     def __delitem__(self, key):
         """Remove a flexible attribute from the model."""
+        if self._unprojected(key):
+            self._load_unprojected()
         if key in self._values_flex:  # Flexible.
             del self._values_flex[key]
             self._dirty.add(key)  # Mark for dropping on store.
@@ -509,6 +664,9 @@ class Model(ABC, Generic[D]):
         """Get a list of available field names for this object. The
         `computed` parameter controls whether computed (plugin-provided)
         fields are included in the key list.
+
+        Only the flexible attributes in the projection are listed for an
+        object fetched with one.
         """
         base_keys = list(self._fields) + list(self._values_flex.keys())
         if computed:
@@ -529,7 +687,7 @@ class Model(ABC, Generic[D]):
         """Assign all values in the given dict."""
         for key, value in values.items():
             try:
-                self[key] = value.format(**self)
+                self[key] = value.format_map(self)
             except:
                 self[key] = value
 
@@ -542,6 +700,8 @@ class Model(ABC, Generic[D]):
 
     def __contains__(self, key) -> bool:
         """Determine whether `key` is an attribute on this object."""
+        if self._unprojected(key):
+            self._load_unprojected()
         return key in self.keys(computed=True)
 
     def __iter__(self) -> Iterator[str]:
@@ -573,54 +733,95 @@ class Model(ABC, Generic[D]):
         else:
             del self[key]
 
+    # Projections.
+
+    def _unprojected(self, key: str) -> bool:
+        """Whether `key` was left out of the fields the object was
+        fetched with.
+        """
+        return self._projection is not None and key not in self._projection
+
+    def _load_unprojected(self):
+        """Load the values of the fields left out of the projection the
+        object was fetched with. The values already set on the object,
+        including modified ones, are kept.
+        """
+        projection, self._projection = self._projection, None
+        if projection is None or not self._db or not self.id:
+            return
+        stored_obj = self._db._get(type(self), self.id)
+        if stored_obj is None:
+            return
+        for source, stored in (
+            (self._values_fixed, stored_obj._values_fixed),
+            (self._values_flex, stored_obj._values_flex),
+        ):
+            for key in stored.keys():
+                if key not in projection and key not in source:
+                    source[key] = stored[key]
+
     # Database interaction (CRUD methods).
 
+    def _dirty_changes(
+        self, fields: Iterable[str] | None = None
+    ) -> tuple[dict[str, SQLiteType], dict[str, Any], list[str]]:
+        """Get the changes to write to the database for the dirty
+        fields among `fields` (all fields if not specified): the SQL
+        values of the fixed fields, the values of the modified or added
+        flexible attributes, and the names of the deleted ones.
+        """
+        if fields is None:
+            fields = self._fields
+        dirty = set(self._dirty)
+
+        fixed: dict[str, SQLiteType] = {}
+        for key in fields:
+            if key != "id" and key in dirty:
+                dirty.remove(key)
+                fixed[key] = self._type(key).to_sql(self._stored_value(key))
+
+        flex = {}
+        for key, value in self._values_flex.items():
+            if key in dirty:
+                dirty.remove(key)
+                flex[key] = value
+
+        deleted = [key for key in dirty if key not in self._fields]
+        return fixed, flex, deleted
+
     def store(self, fields: Iterable[str] | None = None):
         """Save the object's metadata into the library database.
         :param fields: the fields to be stored. If not specified, all fields
         will be.
         """
-        if fields is None:
-            fields = self._fields
         db = self._check_db()
-
-        # Build assignments for query.
-        assignments = []
-        subvars: list[SQLiteType] = []
-        for key in fields:
-            if key != "id" and key in self._dirty:
-                self._dirty.remove(key)
-                assignments.append(key + "=?")
-                value = self._type(key).to_sql(self[key])
-                subvars.append(value)
+        fixed, flex, deleted = self._dirty_changes(fields)
 
         with db.transaction() as tx:
             # Main table update.
-            if assignments:
+            if fixed:
                 query = "UPDATE {} SET {} WHERE id=?".format(
-                    self._table, ",".join(assignments)
+                    self._table, ",".join(f"{key}=?" for key in fixed)
                 )
-                subvars.append(self.id)
-                tx.mutate(query, subvars)
+                tx.mutate(query, [*fixed.values(), self.id])
 
             # Modified/added flexible attributes.
-            for key, value in self._values_flex.items():
-                if key in self._dirty:
-                    self._dirty.remove(key)
-                    tx.mutate(
-                        "INSERT INTO {} "
-                        "(entity_id, key, value) "
-                        "VALUES (?, ?, ?);".format(self._flex_table),
-                        (self.id, key, value),
-                    )
+            for key, value in flex.items():
+                tx.mutate(
+                    "INSERT INTO {} "
+                    "(entity_id, key, value) "
+                    "VALUES (?, ?, ?);".format(self._flex_table),
+                    (self.id, key, value),
+                )
 
             # Deleted flexible attributes.
-            for key in self._dirty:
+            for key in deleted:
                 tx.mutate(
                     f"DELETE FROM {self._flex_table} WHERE entity_id=? AND key=?",
                     (self.id, key),
                 )
 
+        db._touch(self._table, [*fixed, *flex, *deleted])
         self.clear_dirty()
 
     def load(self):
@@ -637,6 +838,7 @@ class Model(ABC, Generic[D]):
         assert stored_obj is not None, f"object {self.id} not in DB"
         self._values_fixed = LazyConvertDict(self)
         self._values_flex = LazyConvertDict(self)
+        self._projection = None
         self.update(dict(stored_obj))
         self.clear_dirty()
 
@@ -648,6 +850,7 @@ class Model(ABC, Generic[D]):
             tx.mutate(
                 f"DELETE FROM {self._flex_table} WHERE entity_id=?", (self.id,)
             )
+        db._touch(self._table)
 
     def add(self, db: D | None = None):
         """Add the object to the library database. This object must be
@@ -668,9 +871,10 @@ class Model(ABC, Generic[D]):
 
             # Mark every non-null field as dirty and store.
             for key in self:
-                if self[key] is not None:
+                if self._stored_value(key) is not None:
                     self._dirty.add(key)
             self.store()
+        db._touch(self._table)
 
     # Formatting and templating.
 
@@ -724,6 +928,8 @@ class Model(ABC, Generic[D]):
         Remove the database connection as sqlite connections are not
         picklable.
         """
+        if self._projection is not None:
+            self._load_unprojected()
         state = self.__dict__.copy()
         state["_db"] = None
         return state
@@ -748,6 +954,9 @@ class Results(Generic[AnyModel]):
         flex_rows,
         query: Query | None = None,
         sort=None,
+        limit: int | None = None,
+        prefetch: Callable[[list[AnyModel]], None] | None = None,
+        projection: frozenset[str] | None = None,
     ):
         """Create a result set that will construct objects of type
         `model_class`.
@@ -755,31 +964,57 @@ class Results(Generic[AnyModel]):
         `model_class` is a subclass of `Model` that will be
         constructed. `rows` is a query result: a list of mappings. The
         new objects will be associated with the database `db`.
+        `flex_rows` holds the flexible attributes (`entity_id`, `key`,
+        `value` and the 1-based `position` of their row) of those
+        objects, ordered like `rows`.
 
         If `query` is provided, it is used as a predicate to filter the
         results for a "slow query" that cannot be evaluated by the
         database directly. If `sort` is provided, it is used to sort the
         full list of results before returning. This means it is a "slow
         sort" and all objects must be built before returning the first
-        one.
+        one. If `limit` is provided, at most that many objects are
+        produced; it is used when the database cannot apply the limit
+        itself because of a slow query or sort.
+
+        If `prefetch` is provided, it is called with each chunk of
+        ``db.fetch_chunk_size`` objects before they are produced, for
+        example to load related objects for the whole chunk at once.
+
+        `projection` holds the fields the rows were restricted to, if
+        any: the objects load their other fields when they are accessed.
         """
         self.model_class = model_class
         self.rows = rows
         self.db = db
         self.query = query
         self.sort = sort
+        self.limit = limit
+        self.prefetch = prefetch
+        self.projection = projection
         self.flex_rows = flex_rows
 
         # We keep a queue of rows we haven't yet consumed for
-        # materialization. We preserve the original total number of
-        # rows.
-        self._rows = rows
+        # materialization, paired with their flexible attributes as they
+        # are consumed. We preserve the original total number of rows.
+        self._rows = _merge_flex_rows(rows, flex_rows)
+        self._row_index = 0
         self._row_count = len(rows)
+        self._new_objects = self._prefetched(self._make_models(self._rows))
+
+        # The positions of the fixed fields in the rows, shared by the
+        # objects made from them.
+        self._columns: dict[str, int] | None = None
 
         # The materialized objects corresponding to rows that have been
         # consumed.
         self._objects: list[AnyModel] = []
 
+    @property
+    def _exhausted(self) -> bool:
+        """Whether every row has been consumed for materialization."""
+        return self._row_index >= self._row_count
+
     def _get_objects(self) -> Iterator[AnyModel]:
         """Construct and generate Model objects for they query. The
         objects are returned in the order emitted from the database; no
@@ -790,12 +1025,8 @@ class Results(Generic[AnyModel]):
         a `Results` object a second time should be much faster than the
         first.
         """
-
-        # Index flexible attributes by the item ID, so we have easier access
-        flex_attrs = self._get_indexed_flex_attrs()
-
         index = 0  # Position in the materialized objects.
-        while index < len(self._objects) or self._rows:
+        while index < len(self._objects) or not self._exhausted:
             # Are there previously-materialized objects to produce?
             if index < len(self._objects):
                 yield self._objects[index]
@@ -804,9 +1035,9 @@ class Results(Generic[AnyModel]):
             # Otherwise, we consume another row, materialize its object
             # and produce it.
             else:
-                while self._rows:
-                    row = self._rows.pop(0)
-                    obj = self._make_model(row, flex_attrs.get(row["id"], {}))
+                while not self._exhausted:
+                    obj = next(self._new_objects)
+                    self._row_index += 1
                     # If there is a slow-query predicate, ensurer that the
                     # object passes it.
                     if not self.query or self.query.match(obj):
@@ -819,42 +1050,68 @@ class Results(Generic[AnyModel]):
         """Construct and generate Model objects for all matching
         objects, in sorted order.
         """
-        if self.sort:
+        if self.sort and self.limit:
+            # Slow sort with a limit. Only the first objects in sorted
+            # order need to be kept while walking the full list.
+            return iter(self.sort.top(self._get_objects(), self.limit))
+
+        elif self.sort:
             # Slow sort. Must build the full list first.
             objects = self.sort.sort(list(self._get_objects()))
             return iter(objects)
 
+        elif self.limit:
+            # Objects are pre-sorted, but some may be filtered out by a
+            # slow query.
+            return islice(self._get_objects(), self.limit)
+
         else:
             # Objects are pre-sorted (i.e., by the database).
             return self._get_objects()
 
-    def _get_indexed_flex_attrs(self) -> dict[int, FlexAttrs]:
-        """Index flexible attributes by the entity id they belong to"""
-        flex_values: dict[int, FlexAttrs] = {}
-        for row in self.flex_rows:
-            if row["entity_id"] not in flex_values:
-                flex_values[row["entity_id"]] = {}
-
-            flex_values[row["entity_id"]][row["key"]] = row["value"]
+    def _make_models(
+        self, rows: Iterable[tuple[sqlite3.Row, FlexAttrs]]
+    ) -> Iterator[AnyModel]:
+        """Create Model objects for rows paired with their flexible
+        attributes.
+        """
+        for row, flex_values in rows:
+            yield self._make_model(row, flex_values)
 
-        return flex_values
+    def _prefetched(self, objects: Iterator[AnyModel]) -> Iterator[AnyModel]:
+        """Generate `objects`, passing each chunk of them to `prefetch`
+        before producing it.
+        """
+        if not self.prefetch:
+            yield from objects
+            return
+        while chunk := list(islice(objects, self.db.fetch_chunk_size)):
+            self.prefetch(chunk)
+            yield from chunk
 
     def _make_model(
         self, row: sqlite3.Row, flex_values: FlexAttrs = {}
     ) -> AnyModel:
-        """Create a Model object for the given row"""
-        cols = dict(row)
-        values = {k: v for (k, v) in cols.items() if not k[:4] == "flex"}
+        """Create a Model object for the given row. Its fixed values are
+        read from the row itself as they are accessed.
+        """
+        if self._columns is None:
+            self._columns = {
+                k: i for i, k in enumerate(row.keys()) if not k[:4] == "flex"
+            }
+        values = RowValues(row, self._columns)
 
         # Construct the Python object
         obj = self.model_class._awaken(self.db, values, flex_values)
+        if self.projection is not None:
+            obj._projection = self.projection
         return obj
 
     def __len__(self) -> int:
         """Get the number of matching objects."""
-        if not self._rows:
+        if self._exhausted:
             # Fully materialized. Just count the objects.
-            return len(self._objects)
+            return self._limited(len(self._objects))
 
         elif self.query:
             # A slow query. Fall back to testing every object.
@@ -865,7 +1122,11 @@ class Results(Generic[AnyModel]):
 
         else:
             # A fast query. Just count the rows.
-            return self._row_count
+            return self._limited(self._row_count)
+
+    def _limited(self, count: int) -> int:
+        """Cap a number of objects to the limit of the result set."""
+        return min(count, self.limit) if self.limit else count
 
     def __nonzero__(self) -> bool:
         """Does this result contain any objects?"""
@@ -879,7 +1140,7 @@ class Results(Generic[AnyModel]):
         """Get the nth item in this result set. This is inefficient: all
         items up to n are materialized and thrown away.
         """
-        if not self._rows and not self.sort:
+        if self._exhausted and not self.sort and not self.limit:
             # Fully materialized and already in order. Just look up the
             # object.
             return self._objects[n]
@@ -903,6 +1164,253 @@ class Results(Generic[AnyModel]):
             return None
 
 
+class StreamingResults(Results[AnyModel]):
+    """A result set that walks a live database cursor instead of
+    fetching every row up front.
+
+    Rows are read from the cursor in chunks of `chunk_size` rows. Their
+    flexible attributes are read from a second cursor, ordered like the
+    main rows, and merged in as the rows stream, so the memory held at
+    any time is bounded by the chunk size rather than by the size of the
+    result set. Objects are not cached: iterating a second time
+    re-executes the query.
+
+    Both cursors need to see the same snapshot of the database, which
+    only a read connection of the pool provides. Without one, the rows
+    are fetched all at once instead, like those of `Results`.
+    """
+
+    def __init__(
+        self,
+        model_class: type[AnyModel],
+        db: D,
+        sql: str,
+        flex_sql: str,
+        subvals: Sequence[SQLiteType],
+        query: Query | None = None,
+        sort=None,
+        limit: int | None = None,
+        chunk_size: int | None = None,
+        prefetch: Callable[[list[AnyModel]], None] | None = None,
+        flex_subvals: Sequence[SQLiteType] | None = None,
+        projection: frozenset[str] | None = None,
+    ):
+        """Create a result set for the rows produced by the SQL
+        statement `sql` with substitution values `subvals`.
+
+        `flex_sql` selects the flexible attributes of those rows, in the
+        same order, using the substitution values `flex_subvals` (by
+        default, the same). `query` and `sort` are the slow query and
+        slow sort components and `limit` the limit to apply to them, and
+        `prefetch` and `projection` are as for `Results`. `chunk_size`
+        defaults to the database's `fetch_chunk_size`.
+        """
+        super().__init__(
+            model_class, [], db, [], query, sort, limit, prefetch, projection
+        )
+        self.sql = sql
+        self.flex_sql = flex_sql
+        self.subvals = subvals
+        self.flex_subvals = subvals if flex_subvals is None else flex_subvals
+        self.chunk_size = chunk_size or db.fetch_chunk_size
+
+    def _read(
+        self,
+        statement: str,
+        subvals: Sequence[SQLiteType],
+        reader: Connection,
+    ) -> Iterator[sqlite3.Row]:
+        """Execute `statement` with the substitution values `subvals` on
+        the read connection `reader` and generate its rows, fetching
+        `chunk_size` rows from the cursor at a time.
+        """
+        cursor = reader.execute(statement, subvals)
+        try:
+            while rows := cursor.fetchmany(self.chunk_size):
+                yield from rows
+        finally:
+            cursor.close()
+
+    @contextlib.contextmanager
+    def _reader(self) -> Iterator[Connection | None]:
+        """Provide the read connection to iterate the results with.
+
+        A connection of the pool is used for as long as the results are
+        iterated, unless the current thread is in a transaction: then,
+        only the writer connection sees its changes and None is given.
+        """
+        with self.db._tx_stack() as stack:
+            in_transaction = bool(stack)
+        reader = None if in_transaction else self.db._acquire_reader()
+        try:
+            yield reader
+        finally:
+            if reader:
+                self.db._release_reader(reader)
+
+    def _get_objects(self) -> Iterator[AnyModel]:
+        """Construct and generate Model objects as rows are read from
+        the cursor.
+        """
+        with self._reader() as reader:
+            if reader:
+                rows = self._read(self.sql, self.subvals, reader)
+                flex_rows = self._read(self.flex_sql, self.flex_subvals, reader)
+            else:
+                # Commits of other threads could come between chunks
+                # read on the writer connection.
+                all_rows, all_flex_rows = self.db._fetch_rows(
+                    self.sql, self.flex_sql, self.subvals, self.flex_subvals
+                )
+                rows = (row for row in all_rows)
+                flex_rows = (row for row in all_flex_rows)
+            try:
+                objects = self._make_models(_merge_flex_rows(rows, flex_rows))
+                for obj in self._prefetched(objects):
+                    if not self.query or self.query.match(obj):
+                        yield obj
+            finally:
+                rows.close()
+                flex_rows.close()
+
+    def raw_rows(self, keys: Sequence[str]) -> Iterator[sqlite3.Row]:
+        """Generate rows of the SQL values of the fixed fields `keys` of
+        the matching objects, in order, without constructing the
+        objects.
+
+        The results must not have a slow query or sort, which can only
+        be applied to objects.
+        """
+        assert not (self.query or self.sort), "slow query or sort"
+        statement = f"SELECT {', '.join(keys)} FROM ({self.sql})"
+        with self._reader() as reader:
+            if not reader:
+                with self.db.transaction(read_only=True) as tx:
+                    rows = tx.query(statement, self.subvals)
+                yield from rows
+                return
+            rows = self._read(statement, self.subvals, reader)
+            try:
+                yield from rows
+            finally:
+                rows.close()
+
+    def __len__(self) -> int:
+        """Get the number of matching objects."""
+        if self.query:
+            # A slow query. Fall back to testing every object.
+            return sum(1 for _ in self)
+
+        with self.db.transaction(read_only=True) as tx:
+            rows = tx.query(f"SELECT COUNT(*) FROM ({self.sql})", self.subvals)
+        return self._limited(rows[0][0])
+
+    def __getitem__(self, n):
+        """Get the nth item in this result set by walking the cursor up
+        to it.
+        """
+        it = iter(self)
+        try:
+            for i in range(n):
+                next(it)
+            return next(it)
+        except StopIteration:
+            raise IndexError(f"result index {n} out of range")
+
+
+def _merge_flex_rows(
+    rows: Iterable[sqlite3.Row], flex_rows: Iterable[sqlite3.Row]
+) -> Iterator[tuple[sqlite3.Row, FlexAttrs]]:
+    """Pair every row with the flexible attributes of its entity.
+
+    `flex_rows` must list the attributes in the order of the `position`
+    of their row in `rows`, counting from 1. Both sequences are then
+    merged in a single pass, without indexing the attributes.
+    Attributes that do not belong to the row at their position are
+    skipped.
+    """
+    flex_iter = iter(flex_rows)
+    flex_row = next(flex_iter, None)
+    for position, row in enumerate(rows, 1):
+        flex_values: FlexAttrs = {}
+        while flex_row is not None and flex_row["position"] <= position:
+            if (
+                flex_row["position"] == position
+                and flex_row["entity_id"] == row["id"]
+            ):
+                flex_values[flex_row["key"]] = flex_row["value"]
+            flex_row = next(flex_iter, None)
+        yield row, flex_values
+
+
+class CacheInfo(NamedTuple):
+    """Statistics about the use of a :class:`QueryCache`."""
+
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class QueryCache:
+    """A size-bounded cache of the rows fetched by queries, discarding
+    the least recently used entries first.
+
+    Entries are only valid for the database revision they were fetched
+    at: the whole cache is emptied when a lookup or insertion happens at
+    a newer revision.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.revision = -1
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _check_revision(self, revision: int):
+        if revision != self.revision:
+            self._entries.clear()
+            self.revision = revision
+
+    def get(self, key: Hashable, revision: int) -> Any | None:
+        """Get the value stored for `key` at `revision`, or None."""
+        with self._lock:
+            self._check_revision(revision)
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, revision: int, value: Any):
+        """Store `value` for `key` at `revision`, evicting the least
+        recently used entry if the cache is full.
+        """
+        with self._lock:
+            self._check_revision(revision)
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove every entry and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def info(self) -> CacheInfo:
+        """Get statistics about the use of the cache."""
+        with self._lock:
+            return CacheInfo(
+                self.hits, self.misses, self.maxsize, len(self._entries)
+            )
+
+
 class Transaction:
     """A context manager for safe, concurrent access to the database.
     All SQL commands should be executed through a transaction.
@@ -913,20 +1421,38 @@ class Transaction:
     current transaction.
     """
 
-    def __init__(self, db: Database):
+    def __init__(self, db: Database, read_only: bool = False):
         self.db = db
+        self.read_only = read_only
+        self._reader: Connection | None = None
+        self._writer = False
 
     def __enter__(self) -> Transaction:
         """Begin a transaction. This transaction may be created while
         another is active in a different thread.
+
+        A read-only root transaction runs on a connection from the
+        database's pool of read connections, if it has one, without
+        waiting for other transactions. Nested transactions use the
+        connection of the transaction they are nested in, except for
+        those that may write in a transaction running on a read
+        connection: they run on the writer connection, as a transaction
+        of their own that is committed when they end.
         """
         with self.db._tx_stack() as stack:
-            first = not stack
+            parent = stack[-1] if stack else None
             stack.append(self)
-        if first:
-            # Beginning a "root" transaction, which corresponds to an
-            # SQLite transaction.
+        if parent and not (parent._reader and not self.read_only):
+            self._reader = parent._reader
+            return self
+
+        # Beginning a "root" transaction, which corresponds to an
+        # SQLite transaction.
+        if self.read_only:
+            self._reader = self.db._acquire_reader()
+        if not self._reader:
             self.db._db_lock.acquire()
+            self._writer = True
         return self
 
     def __exit__(
@@ -944,27 +1470,67 @@ class Transaction:
         with self.db._tx_stack() as stack:
             assert stack.pop() is self
             empty = not stack
-        if empty:
+        if empty and self._reader:
+            # Ending a read-only "root" transaction. Give the connection
+            # back to the pool.
+            self.db._release_reader(self._reader)
+            self._reader = None
+        elif self._writer:
             # Ending a "root" transaction. End the SQLite transaction.
             self.db._connection().commit()
             self._mutated = False
+            self._writer = False
             self.db._db_lock.release()
 
+    @property
+    def _conn(self) -> Connection:
+        """The connection the statements of this transaction run on."""
+        return self._reader or self.db._connection()
+
     def query(
         self, statement: str, subvals: Sequence[SQLiteType] = ()
     ) -> list[sqlite3.Row]:
         """Execute an SQL statement with substitution values and return
         a list of rows from the database.
         """
-        cursor = self.db._connection().execute(statement, subvals)
-        return cursor.fetchall()
+        return self.cursor(statement, subvals).fetchall()
+
+    def cursor(
+        self, statement: str, subvals: Sequence[SQLiteType] = ()
+    ) -> sqlite3.Cursor:
+        """Execute an SQL statement with substitution values and return
+        the live cursor, so that rows can be fetched incrementally.
+
+        The cursor outlives the transaction: callers that keep reading
+        from it should do so within further transactions.
+        """
+        return self._conn.execute(statement, subvals)
 
     def mutate(self, statement: str, subvals: Sequence[SQLiteType] = ()) -> Any:
         """Execute an SQL statement with substitution values and return
         the row ID of the last affected row.
         """
+        return self._mutate(self._conn.execute, statement, subvals).lastrowid
+
+    def mutate_many(
+        self, statement: str, subvals: Iterable[Sequence[SQLiteType]]
+    ):
+        """Execute an SQL statement once for every sequence of
+        substitution values in `subvals`.
+        """
+        self._mutate(self._conn.executemany, statement, subvals)
+
+    def _mutate(
+        self,
+        execute: Callable[[str, Any], sqlite3.Cursor],
+        statement: str,
+        subvals: Any,
+    ) -> sqlite3.Cursor:
+        """Run a mutating statement with the given `execute` method of
+        the connection and return the cursor.
+        """
         try:
-            cursor = self.db._connection().execute(statement, subvals)
+            cursor = execute(statement, subvals)
         except sqlite3.OperationalError as e:
             # In two specific cases, SQLite reports an error while accessing
             # the underlying database file. We surface these exceptions as
@@ -978,13 +1544,13 @@ class Transaction:
                 raise
         else:
             self._mutated = True
-            return cursor.lastrowid
+            return cursor
 
     def script(self, statements: str):
         """Execute a string containing multiple SQL statements."""
         # We don't know whether this mutates, but quite likely it does.
         self._mutated = True
-        self.db._connection().executescript(statements)
+        self._conn.executescript(statements)
 
 
 class Database:
@@ -1004,7 +1570,37 @@ class Database:
     data is written in a transaction.
     """
 
-    def __init__(self, path, timeout: float = 5.0):
+    fetch_chunk_size = 500
+    """The number of rows read from the cursor at a time by streaming
+    result sets.
+    """
+
+    regexp_cache_size = 128
+    """The number of compiled patterns each connection keeps for the
+    ``regexp`` SQL function.
+    """
+
+    def __init__(
+        self,
+        path,
+        timeout: float = 5.0,
+        pragmas: Mapping[str, str | int] | None = None,
+        read_connections: int = 0,
+        query_cache_size: int = 0,
+    ):
+        """Open the database at `path`.
+
+        `pragmas` are SQLite pragmas (such as ``journal_mode``,
+        ``synchronous``, ``cache_size``, ``mmap_size`` or ``temp_store``)
+        to set on every connection. When the database is a file in WAL
+        journal mode, up to `read_connections` read-only connections are
+        opened on demand so that read-only transactions can run in
+        parallel with each other and with the single writer connection.
+
+        If `query_cache_size` is positive, the rows fetched by that many
+        distinct queries are kept in :attr:`query_cache` until the
+        database is changed.
+        """
         if sqlite3.threadsafety == 0:
             raise RuntimeError(
                 "sqlite3 must be compiled with multi-threading support"
@@ -1012,13 +1608,23 @@ class Database:
 
         self.path = path
         self.timeout = timeout
+        self.pragmas = dict(pragmas or {})
 
-        self._connections: dict[int, sqlite3.Connection] = {}
+        self._writer: Connection | None = None
+        self._readers: list[Connection] = []
+        self._idle_readers: queue.LifoQueue[Connection] = queue.LifoQueue()
+        self._open_readers = 0
+        self._max_readers = 0
         self._tx_stacks: defaultdict[int, list[Transaction]] = defaultdict(list)
         self._extensions: list[str] = []
+        self._table_revisions: defaultdict[tuple[str, str | None], int]
+        self._table_revisions = defaultdict(int)
+        self.query_cache = (
+            QueryCache(query_cache_size) if query_cache_size > 0 else None
+        )
 
-        # A lock to protect the _connections and _tx_stacks maps, which
-        # both map thread IDs to private resources.
+        # A lock to protect the connections and the _tx_stacks map, which
+        # maps thread IDs to private resources.
         self._shared_map_lock = threading.Lock()
 
         # A lock to protect access to the database itself. SQLite does
@@ -1035,29 +1641,83 @@ class Database:
         for model_cls in self._models:
             self._make_table(model_cls._table, model_cls._fields)
             self._make_attribute_table(model_cls._flex_table)
+            self._make_indices(model_cls._table, model_cls._indices)
+
+        # Separate read connections only help when readers do not block
+        # the writer, and cannot share an in-memory database.
+        with self.transaction() as tx:
+            journal_mode = tx.query("PRAGMA journal_mode")[0][0]
+        if journal_mode == "wal":
+            self._max_readers = read_connections
 
     # Primitive access control: connections and transactions.
 
     def _connection(self) -> Connection:
-        """Get a SQLite connection object to the underlying database.
-        One connection object is created per thread.
+        """Get the SQLite connection used to write to the underlying
+        database. A single connection is shared by all threads, which
+        take turns using it in transactions.
         """
-        thread_id = threading.current_thread().ident
-        # Help the type checker: ident can only be None if the thread has not
-        # been started yet; but since this results from current_thread(), that
-        # can't happen
-        assert thread_id is not None
+        with self._shared_map_lock:
+            if self._writer is None:
+                self._writer = self._create_connection()
+            return self._writer
+
+    def _acquire_reader(self) -> Connection | None:
+        """Take a read-only connection from the pool, opening a new one
+        if the pool is not full. Return None if the database has no read
+        connections or if all of them are in use: callers then use the
+        writer connection instead of waiting, which could deadlock a
+        thread that already holds a read connection.
+
+        The connection is in a transaction, so that all its reads see
+        the same snapshot of the database until it is released.
+        """
+        try:
+            conn = self._idle_readers.get_nowait()
+        except queue.Empty:
+            conn = None
+        if conn is None:
+            conn = self._open_reader()
+        if conn is not None:
+            conn.execute("BEGIN")
+        return conn
 
+    def _open_reader(self) -> Connection | None:
+        """Open a new read-only connection, or return None if the pool
+        is full.
+        """
         with self._shared_map_lock:
-            if thread_id in self._connections:
-                return self._connections[thread_id]
-            else:
-                conn = self._create_connection()
-                self._connections[thread_id] = conn
-                return conn
+            if self._open_readers >= self._max_readers:
+                return None
+            # Reserve the place of the new connection.
+            self._open_readers += 1
+
+        try:
+            conn = self._create_connection(read_only=True)
+        except BaseException:
+            with self._shared_map_lock:
+                self._open_readers -= 1
+            raise
+        with self._shared_map_lock:
+            self._readers.append(conn)
+        return conn
 
-    def _create_connection(self) -> Connection:
-        """Create a SQLite connection to the underlying database.
+    def _release_reader(self, conn: Connection):
+        """Give a connection taken with `_acquire_reader` back to the
+        pool.
+        """
+        conn.rollback()
+        with self._shared_map_lock:
+            pooled = conn in self._readers
+        if pooled:
+            self._idle_readers.put(conn)
+        else:
+            # The database was closed while the connection was in use.
+            conn.close()
+
+    def _create_connection(self, read_only: bool = False) -> Connection:
+        """Create a SQLite connection to the underlying database,
+        read-only if `read_only` is true.
 
         Makes a new connection every time. If you need to configure the
         connection settings (e.g., add custom functions), override this
@@ -1066,14 +1726,23 @@ class Database:
         # Make a new connection. The `sqlite3` module can't use
         # bytestring paths here on Python 3, so we need to
         # provide a `str` using `os.fsdecode`.
+        path = os.fsdecode(self.path)
+        if read_only:
+            path = f"file:{urllib.parse.quote(path)}?mode=ro"
         conn = sqlite3.connect(
-            os.fsdecode(self.path),
+            path,
             timeout=self.timeout,
-            # We have our own same-thread checks in _connection(), but need to
-            # call conn.close() in _close()
+            # Connections are shared between threads, but never used by
+            # two threads at the same time.
             check_same_thread=False,
+            uri=read_only,
         )
         self.add_functions(conn)
+        for name, value in self.pragmas.items():
+            if read_only and name == "journal_mode":
+                # The journal mode is a property of the database file.
+                continue
+            conn.execute(f"PRAGMA {name} = {value}")
 
         if self.supports_extensions:
             conn.enable_load_extension(True)
@@ -1087,10 +1756,16 @@ class Database:
         return conn
 
     def add_functions(self, conn):
+        # Every connection gets its own cache of compiled patterns, so that
+        # a query compiles its pattern once instead of once per row.
+        compile_pattern = functools.lru_cache(self.regexp_cache_size)(
+            re.compile
+        )
+
         def regexp(value, pattern):
             if isinstance(value, bytes):
                 value = value.decode()
-            return re.search(pattern, str(value)) is not None
+            return compile_pattern(pattern).search(str(value)) is not None
 
         def bytelower(bytestring: AnyStr | None) -> AnyStr | None:
             """A custom ``bytelower`` sqlite function so we can compare
@@ -1105,9 +1780,19 @@ class Database:
 
             return bytestring
 
-        conn.create_function("regexp", 2, regexp)
-        conn.create_function("unidecode", 1, unidecode)
-        conn.create_function("bytelower", 1, bytelower)
+        def unidecode_(value: str | None) -> str | None:
+            """Transliterate text to ASCII, passing NULL through so that
+            the function can be used to index nullable columns.
+            """
+            if value is not None:
+                return unidecode(str(value))
+
+            return value
+
+        conn.create_function("regexp", 2, regexp, deterministic=True)
+        # Deterministic functions may be used in index expressions.
+        conn.create_function("unidecode", 1, unidecode_, deterministic=True)
+        conn.create_function("bytelower", 1, bytelower, deterministic=True)
 
     def _close(self):
         """Close the all connections to the underlying SQLite database
@@ -1115,9 +1800,14 @@ class Database:
         unusable; new connections can still be opened on demand.
         """
         with self._shared_map_lock:
-            while self._connections:
-                _thread_id, conn = self._connections.popitem()
-                conn.close()
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            # Connections in use are closed when they are released.
+            self._readers.clear()
+            self._open_readers = 0
+            while not self._idle_readers.empty():
+                self._idle_readers.get_nowait().close()
 
     @contextlib.contextmanager
     def _tx_stack(self) -> Generator[list[Transaction]]:
@@ -1132,13 +1822,54 @@ class Database:
         assert thread_id is not None
 
         with self._shared_map_lock:
-            yield self._tx_stacks[thread_id]
+            stack = self._tx_stacks[thread_id]
+            yield stack
+            if not stack:
+                # Do not keep the stacks of threads that may have ended.
+                del self._tx_stacks[thread_id]
+
+    def _in_transaction(self) -> bool:
+        """Whether the current thread is in a transaction."""
+        with self._tx_stack() as stack:
+            return bool(stack)
+
+    def _touch(self, table: str, fields: Iterable[str] | None = None):
+        """Record a change to the rows of `table`: to the values of
+        `fields`, or the addition or removal of rows if `fields` is None.
+        """
+        if fields is None:
+            self._table_revisions[table, None] += 1
+        else:
+            for field in fields:
+                self._table_revisions[table, field] += 1
+
+    def table_revision(
+        self, table: str, fields: Iterable[str] = ()
+    ) -> tuple[int, ...]:
+        """Get a token that changes whenever rows are added to or removed
+        from `table`, or the values of any of `fields` change in it.
+
+        Unlike `revision`, which changes with any write to the database,
+        this lets data derived from a few fields remain valid while other
+        fields are written. Only changes made through the model methods
+        (such as `Model.store` or `Database.bulk_store`) are tracked.
+        """
+        revisions = self._table_revisions
+        return (
+            revisions[table, None],
+            *(revisions[table, field] for field in fields),
+        )
 
-    def transaction(self) -> Transaction:
+    def transaction(self, read_only: bool = False) -> Transaction:
         """Get a :class:`Transaction` object for interacting directly
         with the underlying SQLite database.
+
+        If `read_only` is true, the transaction must not write to the
+        database, which lets it run in parallel with other transactions.
+        Transactions nested in it may write: their changes are committed
+        when they end, and are not seen by the read-only transaction.
         """
-        return Transaction(self)
+        return Transaction(self, read_only)
 
     def load_extension(self, path: str):
         """Load an SQLite extension into all open connections."""
@@ -1150,8 +1881,11 @@ class Database:
         self._extensions.append(path)
 
         # Load the extension into every open connection.
-        for conn in self._connections.values():
-            conn.load_extension(path)
+        with self._shared_map_lock:
+            connections = [self._writer, *self._readers]
+        for conn in connections:
+            if conn is not None:
+                conn.load_extension(path)
 
     # Schema setup and migration.
 
@@ -1209,6 +1943,136 @@ class Database:
                 """.format(flex_table)
             )
 
+    def _make_indices(self, table: str, indices: Iterable[Index]):
+        """Create the given indices on `table` (if they don't exist)."""
+        setup_sql = "".join(
+            f"CREATE INDEX IF NOT EXISTS {index.name} "
+            f"ON {table} ({', '.join(index.on)});\n"
+            for index in indices
+        )
+        if setup_sql:
+            with self.transaction() as tx:
+                tx.script(setup_sql)
+
+    def indices(self, table: str) -> list[tuple[str, str]]:
+        """Get the name and the SQL definition of the indices on `table`,
+        excluding those SQLite creates implicitly.
+        """
+        with self.transaction(read_only=True) as tx:
+            rows = tx.query(
+                "SELECT name, sql FROM sqlite_master "
+                "WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL "
+                "ORDER BY name",
+                (table,),
+            )
+        return [(row["name"], row["sql"]) for row in rows]
+
+    def create_index(self, model_cls: type[Model], expression: str) -> Index:
+        """Create an index on a column or an SQL expression of the
+        table of `model_cls` and return it.
+        """
+        index = Index.for_expression(model_cls._table, expression)
+        self._make_indices(model_cls._table, [index])
+        return index
+
+    def drop_index(self, name: str):
+        """Drop the index called `name` (if it exists)."""
+        with self.transaction() as tx:
+            tx.mutate(f"DROP INDEX IF EXISTS {name}")
+
+    # Bulk writes.
+
+    def bulk_store(
+        self, models: Iterable[Model], fields: Iterable[str] | None = None
+    ):
+        """Save the metadata of several objects into the database, like
+        calling `store` on each of them but in a single transaction and
+        with one statement per table and set of changed fields.
+        """
+        models = list(models)
+        if fields is not None:
+            fields = list(fields)
+
+        updates: defaultdict[tuple[str, tuple[str, ...]], list[list[Any]]]
+        updates = defaultdict(list)
+        flex_updates: defaultdict[str, list[tuple[Any, ...]]]
+        flex_updates = defaultdict(list)
+        flex_deletes: defaultdict[str, list[tuple[Any, ...]]]
+        flex_deletes = defaultdict(list)
+        for model in models:
+            model._check_db()
+            fixed, flex, deleted = model._dirty_changes(fields)
+            if fixed:
+                updates[model._table, tuple(fixed)].append(
+                    [*fixed.values(), model.id]
+                )
+            flex_updates[model._flex_table].extend(
+                (model.id, key, value) for key, value in flex.items()
+            )
+            flex_deletes[model._flex_table].extend(
+                (model.id, key) for key in deleted
+            )
+            self._touch(model._table, [*fixed, *flex, *deleted])
+
+        with self.transaction() as tx:
+            for (table, keys), rows in updates.items():
+                assignments = ",".join(f"{key}=?" for key in keys)
+                tx.mutate_many(
+                    f"UPDATE {table} SET {assignments} WHERE id=?", rows
+                )
+            for flex_table, rows in flex_updates.items():
+                # Thanks to the unique constraint of the table, an
+                # existing value is replaced.
+                if rows:
+                    tx.mutate_many(
+                        f"INSERT INTO {flex_table} (entity_id, key, value) "
+                        "VALUES (?, ?, ?)",
+                        rows,
+                    )
+            for flex_table, rows in flex_deletes.items():
+                if rows:
+                    tx.mutate_many(
+                        f"DELETE FROM {flex_table} WHERE entity_id=? AND key=?",
+                        rows,
+                    )
+
+        for model in models:
+            model.clear_dirty()
+
+    def bulk_add(self, models: Iterable[Model]):
+        """Add several objects to the database, like calling `add` on
+        each of them but in a single transaction and with one statement
+        per table and set of fields.
+        """
+        models = list(models)
+        by_table: defaultdict[str, list[Model]] = defaultdict(list)
+        for model in models:
+            by_table[model._table].append(model)
+
+        added = time.time()
+        with self.transaction() as tx:
+            for table, table_models in by_table.items():
+                # The first row gets the next free id. As no row has a
+                # larger one, the ids that follow are free too.
+                first_id = tx.mutate(f"INSERT INTO {table} DEFAULT VALUES")
+                ids = range(first_id, first_id + len(table_models))
+                tx.mutate_many(
+                    f"INSERT INTO {table} (id) VALUES (?)",
+                    [(id,) for id in ids[1:]],
+                )
+                self._touch(table)
+                for model, id in zip(table_models, ids):
+                    model._db = self
+                    model.id = id
+                    model.added = added
+
+                    # Mark every non-null field as dirty.
+                    for key in model:
+                        if model._stored_value(key) is not None:
+                            model._dirty.add(key)
+
+            self.bulk_store(models)
+
     # Querying.
 
     def _fetch(
@@ -1217,12 +2081,23 @@ class Database:
         query: Query | None = None,
         sort: Sort | None = None,
         limit: int | None = None,
-        select: str | None = None,
+        fields: Iterable[str] | None = None,
+        stream: bool = False,
+        prefetch: Callable[[list[AnyModel]], None] | None = None,
     ) -> Results[AnyModel]:
         """Fetch the objects of type `model_cls` matching the given
         query. The query may be given as a string, string sequence, a
         Query object, or None (to fetch everything). `sort` is an
         `Sort` object.
+
+        If `fields` is given, only these fields (fixed or flexible) are
+        read from the database, along with the ids and the fields a slow
+        query or sort needs. The other fields of the objects are loaded
+        when they are first accessed.
+
+        If `stream` is true, return a `StreamingResults` that reads rows
+        from a live cursor in chunks instead of fetching them all up
+        front. `prefetch` is passed to the results.
         """
         query = query or TrueQuery()  # A null query.
         sort = sort or NullSort()  # Unsorted.
@@ -1234,55 +2109,200 @@ class Database:
         if query.field_names & model_cls.other_db_fields:
             _from += f" {model_cls.relation_join}"
 
-        if select and table != "albums":
-            if table != "albums":
-                select += ', artist_sort, artist, album, disc, track'
-            else:
-                select += ', albumartist_sort'
-
         # group by id to avoid duplicates when joining with the relation
         sql = (
-            f"SELECT {select if select else f'{table}.*'} "
+            f"SELECT {table}.* "
             f"FROM ({_from}) "
             f"WHERE {where or 1} "
             f"GROUP BY {table}.id"
         )
-        # Fetch flexible attributes for items matching the main query.
-        # Doing the per-item filtering in python is faster than issuing
-        # one query per item to sqlite.
-        select_sql = 'AND key IN ({})'.format(",".join(["'" + i + "'" for i in select.split(",")])) if select else ''
-        flex_sql = (
-            "SELECT * "
-            f"FROM {model_cls._flex_table} "
-            f"WHERE entity_id IN (SELECT id FROM ({sql})) {select_sql}"
+
+        # The sort field may exist in both 'items' and 'albums' tables
+        # (when they are joined), causing ambiguous column OperationalError
+        # if we try to order directly. Since the join is required only for
+        # filtering, we filter in a subquery and order its result, which
+        # has unique fields. Ties are broken by id so that the order is
+        # deterministic and can be reproduced for the flexible attributes.
+        # The subquery is named after the table so that sorts can refer
+        # to its rows.
+        order = f"{order_by}, id" if order_by else "id"
+        slow_query = None if where else query
+        slow_sort = sort if sort.is_slow() else None
+        # A slow query or sort must see every row: the limit is then
+        # applied to the objects instead.
+        sql_limit = None if slow_query or slow_sort else limit
+        limit_sql = f" LIMIT {sql_limit}" if sql_limit else ""
+
+        # Project the rows onto the requested fields. The names of the
+        # fixed fields are taken from the model, and the keys of the
+        # flexible attributes are passed as substitution values.
+        projection = None
+        columns = "*"
+        flex_filter = ""
+        flex_subvals = subvals
+        if fields is not None:
+            projection = frozenset(fields) | {"id"}
+            if slow_query:
+                projection |= slow_query.field_names
+            if slow_sort:
+                projection |= slow_sort.field_names
+            columns = ", ".join(k for k in model_cls._fields if k in projection)
+            flex_keys = sorted(projection.difference(model_cls._fields))
+            flex_filter = "AND flex.key IN ({}) ".format(
+                ", ".join("?" * len(flex_keys))
+            )
+            flex_subvals = [*subvals, *flex_keys]
+
+        main_sql = (
+            f"SELECT {columns} FROM ({sql}) AS {table} "
+            f"ORDER BY {order}{limit_sql}"
         )
 
-        if order_by:
-            # the sort field may exist in both 'items' and 'albums' tables
-            # (when they are joined), causing ambiguous column OperationalError
-            # if we try to order directly.
-            # Since the join is required only for filtering, we can filter in
-            # a subquery and order the result, which returns unique fields.
-            sql = f"SELECT * FROM ({sql}) ORDER BY {order_by}"
+        # Fetch flexible attributes for the objects matching the main
+        # query, in the same order as the main rows. This lets us attach
+        # them in a single pass as the rows are consumed instead of
+        # indexing every flexible attribute up front.
+        flex_sql = (
+            "SELECT flex.entity_id, flex.key, flex.value, main.position "
+            "FROM ("
+            f"SELECT id, ROW_NUMBER() OVER (ORDER BY {order}) AS position "
+            f"FROM ({sql}) AS {table} ORDER BY position{limit_sql}"
+            ") AS main "
+            f"JOIN {model_cls._flex_table} AS flex "
+            f"ON flex.entity_id = main.id {flex_filter}"
+            "ORDER BY main.position"
+        )
 
-        if limit:
-            sql += f" LIMIT {limit}"
+        if stream:
+            return StreamingResults(
+                model_cls,
+                self,
+                main_sql,
+                flex_sql,
+                subvals,
+                slow_query,
+                slow_sort,
+                None if sql_limit else limit,
+                prefetch=prefetch,
+                flex_subvals=flex_subvals,
+                projection=projection,
+            )
 
-        with self.transaction() as tx:
-            rows = tx.query(sql, subvals)
-            flex_rows = tx.query(flex_sql, subvals)
-            # for row in flex_rows:
-            #     print(row[0], row[1], row[2], row[3])
+        cache = self.query_cache
+        if cache is None or self._in_transaction():
+            rows, flex_rows = self._fetch_rows(
+                main_sql, flex_sql, subvals, flex_subvals
+            )
+        else:
+            key = (main_sql, flex_sql, tuple(flex_subvals))
+            revision = self.revision
+            cached = cache.get(key, revision)
+            if cached is None:
+                writing = self._db_lock.locked()
+                rows, flex_rows = self._fetch_rows(
+                    main_sql, flex_sql, subvals, flex_subvals
+                )
+                # The rows may predate the revision if a write was in
+                # progress while they were read.
+                if not (
+                    writing
+                    or self._db_lock.locked()
+                    or revision != self.revision
+                ):
+                    cache.put(key, revision, (rows, flex_rows))
+            else:
+                rows, flex_rows = cached
 
         return Results(
             model_cls,
             rows,
             self,
             flex_rows,
-            None if where else query,  # Slow query component.
-            sort if sort.is_slow() else None,  # Slow sort component.
+            slow_query,
+            slow_sort,
+            None if sql_limit else limit,
+            prefetch,
+            projection,
         )
 
+    def _fetch_rows(
+        self,
+        main_sql: str,
+        flex_sql: str,
+        subvals: Sequence[SQLiteType],
+        flex_subvals: Sequence[SQLiteType],
+    ) -> tuple[list[sqlite3.Row], list[sqlite3.Row]]:
+        """Run the statements fetching the main rows and the flexible
+        attributes of a query.
+        """
+        with self.transaction(read_only=True) as tx:
+            return (
+                tx.query(main_sql, subvals),
+                tx.query(flex_sql, flex_subvals),
+            )
+
+    def aggregate(
+        self,
+        model_cls: type[Model],
+        aggregates: Mapping[str, Aggregate],
+        query: Query | None = None,
+    ) -> dict[str, Any]:
+        """Compute the `aggregates` of the fields of the objects of type
+        `model_cls` matching `query`, returning their values by name.
+
+        The aggregates are computed by SQLite in a single statement,
+        with the query's WHERE clause, unless the query is slow or an
+        aggregate is of a field that is not fixed. Then, the objects are
+        fetched with only the fields needed and their stored values are
+        aggregated in Python.
+        """
+        for aggregate in aggregates.values():
+            if aggregate.function not in Aggregate._sql_functions:
+                raise ValueError(
+                    f"unknown aggregate function {aggregate.function!r}"
+                )
+        fields = {aggregate.field for aggregate in aggregates.values()}
+        results = self._fetch(model_cls, query, fields=fields, stream=True)
+        assert isinstance(results, StreamingResults)
+
+        if results.query or not fields.issubset(model_cls._fields):
+            # Iterate once: `list` would count the results first.
+            objects = list(iter(results))
+            return {
+                name: aggregate.compute(
+                    o._stored_value(aggregate.field) for o in objects
+                )
+                for name, aggregate in aggregates.items()
+            }
+
+        columns = ", ".join(
+            aggregate.sql() for aggregate in aggregates.values()
+        )
+        with self.transaction(read_only=True) as tx:
+            rows = tx.query(
+                f"SELECT {columns} FROM ({results.sql})", results.subvals
+            )
+        return dict(zip(aggregates, rows[0]))
+
+    def explain(
+        self,
+        model_cls: type[Model],
+        query: Query | None = None,
+        sort: Sort | None = None,
+    ) -> list[str]:
+        """Describe how SQLite would run the statement fetching the
+        objects of type `model_cls` that match `query`, including which
+        indices it uses, as reported by ``EXPLAIN QUERY PLAN``.
+        """
+        # Streaming results hold their statement without executing it.
+        results = self._fetch(model_cls, query, sort, stream=True)
+        assert isinstance(results, StreamingResults)
+        with self.transaction(read_only=True) as tx:
+            rows = tx.query(
+                f"EXPLAIN QUERY PLAN {results.sql}", results.subvals
+            )
+        return [row["detail"] for row in rows]
+
     def _get(
         self,
         model_cls: type[AnyModel],
@@ -16,15 +16,17 @@
 
 from __future__ import annotations
 
+import heapq
 import re
 import unicodedata
 from abc import ABC, abstractmethod
-from collections.abc import Iterator, MutableSequence, Sequence
+from collections.abc import Iterable, Iterator, MutableSequence, Sequence
+from copy import copy
 from datetime import datetime, timedelta
 from functools import reduce
 from operator import mul, or_
 from re import Pattern
-from typing import TYPE_CHECKING, Any, Generic, TypeVar, Union
+from typing import TYPE_CHECKING, Any, Generic, NamedTuple, TypeVar, Union
 
 from beets import util
 
@@ -120,6 +122,52 @@ AnySQLiteType = TypeVar("AnySQLiteType", bound=SQLiteType)
 FieldQueryType = type["FieldQuery"]
 
 
+class FlexSource(NamedTuple):
+    """A place where the value of a flexible attribute can be found in
+    the database: the attribute table, the SQL expression for the id of
+    the entity whose attributes apply, and the SQL type of the value.
+    """
+
+    flex_table: str
+    entity_id: str
+    sql_type: str = "TEXT"
+
+    def value(self, numeric: bool = False) -> str:
+        """An SQL expression for the attribute value, cast to the SQL
+        type of the field when it is numeric. If `numeric` is true,
+        values of other types are cast to numbers as well.
+        """
+        sql_type = self.sql_type
+        if numeric and sql_type not in ("INTEGER", "REAL"):
+            sql_type = "REAL"
+        if sql_type in ("INTEGER", "REAL"):
+            return f"CAST(value AS {sql_type})"
+        return "value"
+
+    def exists(self, condition: str = "") -> str:
+        """An SQL expression checking whether the attribute (the key of
+        which is left as a placeholder) is set and satisfies the given
+        `condition` on its `value`.
+        """
+        clause = (
+            f"SELECT 1 FROM {self.flex_table} "
+            f"WHERE entity_id = {self.entity_id} AND key = ?"
+        )
+        if condition:
+            clause += f" AND ({condition})"
+        return f"EXISTS ({clause})"
+
+    def lookup(self, key: str) -> str:
+        """An SQL expression for the value of the attribute `key`, or
+        NULL if it is not set.
+        """
+        key = key.replace("'", "''")
+        return (
+            f"(SELECT {self.value()} FROM {self.flex_table} "
+            f"WHERE entity_id = {self.entity_id} AND key = '{key}')"
+        )
+
+
 class FieldQuery(Query, Generic[P]):
     """An abstract query that searches in a specific field for a
     pattern. Subclasses must provide a `value_match` class method, which
@@ -130,6 +178,8 @@ class FieldQuery(Query, Generic[P]):
 
     @property
     def field(self) -> str:
+        if self._column:
+            return self._column
         return (
             f"{self.table}.{self.field_name}" if self.table else self.field_name
         )
@@ -139,6 +189,25 @@ class FieldQuery(Query, Generic[P]):
         """Return a set with field names that this query operates on."""
         return {self.field_name}
 
+    flex_pushdown = False
+    """Whether `col_clause` can be applied to the value of a flexible
+    attribute, so that queries on flexible attributes do not need to be
+    evaluated in Python.
+    """
+
+    flex_numeric = False
+    """Whether the query compares values as numbers, so that untyped
+    flexible attributes must be cast to numbers in SQL.
+    """
+
+    flex_sources: Sequence[FlexSource] = ()
+    """Where the value of the queried flexible attribute is looked up,
+    in order of precedence. Without sources, queries on flexible
+    attributes are slow.
+    """
+
+    _column: str | None = None
+
     def __init__(self, field_name: str, pattern: P, fast: bool = True):
         self.table, _, self.field_name = field_name.rpartition(".")
         self.pattern = pattern
@@ -150,10 +219,44 @@ class FieldQuery(Query, Generic[P]):
     def clause(self) -> tuple[str | None, Sequence[SQLiteType]]:
         if self.fast:
             return self.col_clause()
+        elif self.flex_pushdown and self.flex_sources:
+            return self.flex_clause()
         else:
             # Matching a flexattr. This is a slow query.
             return None, ()
 
+    def matches_missing(self) -> bool:
+        """Whether an object lacking the field matches the query."""
+        return self.value_match(self.pattern, None)
+
+    def flex_clause(self) -> tuple[str | None, Sequence[SQLiteType]]:
+        """Generate an SQLite expression implementing the query on a
+        flexible attribute.
+
+        The attribute value is taken from the first of `flex_sources`
+        where it is set, and matched with `col_clause`. Since objects
+        lacking the attribute are never selected, queries that match
+        missing values are left to `match()`.
+        """
+        if self.matches_missing():
+            return None, ()
+
+        clause_parts = []
+        subvals: list[SQLiteType] = []
+        for i, source in enumerate(self.flex_sources):
+            value_query = copy(self)
+            value_query._column = source.value(self.flex_numeric)
+            condition, condition_subvals = value_query.col_clause()
+
+            # Sources with a higher precedence must not set the value.
+            parts = [f"NOT {s.exists()}" for s in self.flex_sources[:i]]
+            parts.append(source.exists(condition))
+            clause_parts.append(" AND ".join(parts))
+            subvals += [self.field_name] * (i + 1)
+            subvals += condition_subvals
+
+        return " OR ".join(f"({c})" for c in clause_parts), subvals
+
     @classmethod
     def value_match(cls, pattern: P, value: Any):
         """Determine whether the value matches the pattern."""
@@ -182,6 +285,8 @@ class FieldQuery(Query, Generic[P]):
 class MatchQuery(FieldQuery[AnySQLiteType]):
     """A query that looks for exact matches in an Model field."""
 
+    flex_pushdown = True
+
     def col_clause(self) -> tuple[str, Sequence[SQLiteType]]:
         return self.field + " = ?", [self.pattern]
 
@@ -233,6 +338,8 @@ class StringFieldQuery(FieldQuery[P]):
 class StringQuery(StringFieldQuery[str]):
     """A query that matches a whole string in a specific Model field."""
 
+    flex_pushdown = True
+
     def col_clause(self) -> tuple[str, Sequence[SQLiteType]]:
         search = (
             self.pattern.replace("\\", "\\\\")
@@ -251,6 +358,8 @@ class StringQuery(StringFieldQuery[str]):
 class SubstringQuery(StringFieldQuery[str]):
     """A query that matches a substring in a specific Model field."""
 
+    flex_pushdown = True
+
     def col_clause(self) -> tuple[str, Sequence[SQLiteType]]:
         pattern = (
             self.pattern.replace("\\", "\\\\")
@@ -274,6 +383,8 @@ class RegexpQuery(StringFieldQuery[Pattern[str]]):
     expression.
     """
 
+    flex_pushdown = True
+
     def __init__(self, field_name: str, pattern: str, fast: bool = True):
         pattern = self._normalize(pattern)
         try:
@@ -362,6 +473,9 @@ class NumericQuery(FieldQuery[str]):
     a float.
     """
 
+    flex_pushdown = True
+    flex_numeric = True
+
     def _convert(self, s: str) -> float | int | None:
         """Convert a string to a numeric type (float or int).
 
@@ -394,6 +508,9 @@ class NumericQuery(FieldQuery[str]):
             self.rangemin = self._convert(parts[0])
             self.rangemax = self._convert(parts[1])
 
+    def matches_missing(self) -> bool:
+        return False
+
     def match(self, obj: Model) -> bool:
         if self.field_name not in obj:
             return False
@@ -779,11 +896,17 @@ class DateQuery(FieldQuery[str]):
     using an ellipsis interval syntax similar to that of NumericQuery.
     """
 
+    flex_pushdown = True
+    flex_numeric = True
+
     def __init__(self, field_name: str, pattern: str, fast: bool = True):
         super().__init__(field_name, pattern, fast)
         start, end = _parse_periods(pattern)
         self.interval = DateInterval.from_periods(start, end)
 
+    def matches_missing(self) -> bool:
+        return False
+
     def match(self, obj: Model) -> bool:
         if self.field_name not in obj:
             return False
@@ -852,6 +975,11 @@ class Sort:
     the database.
     """
 
+    @property
+    def field_names(self) -> set[str]:
+        """Return a set with field names that this sort orders by."""
+        return set()
+
     def order_clause(self) -> str | None:
         """Generates a SQL fragment to be used in a ORDER BY clause, or
         None if no fragment is used (i.e., this is a slow sort).
@@ -862,6 +990,10 @@ class Sort:
         """Sort the list of objects and return a list."""
         return sorted(items)
 
+    def top(self, items: Iterable[AnyModel], n: int) -> list[AnyModel]:
+        """Return the first `n` objects in sorted order."""
+        return self.sort(list(items))[:n]
+
     def is_slow(self) -> bool:
         """Indicate whether this query is *slow*, meaning that it cannot
         be executed in SQL and must be executed in Python.
@@ -887,6 +1019,11 @@ class MultipleSort(Sort):
     def add_sort(self, sort: Sort):
         self.sorts.append(sort)
 
+    @property
+    def field_names(self) -> set[str]:
+        """Return a set with field names of all the sub-sorts."""
+        return set().union(*(sort.field_names for sort in self.sorts))
+
     def order_clause(self) -> str:
         """Return the list SQL clauses for those sub-sorts for which we can be
         (at least partially) fast.
@@ -952,25 +1089,36 @@ class FieldSort(Sort):
         self.ascending = ascending
         self.case_insensitive = case_insensitive
 
-    def sort(self, objs: list[AnyModel]) -> list[AnyModel]:
+    @property
+    def field_names(self) -> set[str]:
+        """Return a set with the field that this sort orders by."""
+        return {self.field}
+
+    def key(self, obj: Model) -> Any:
+        """Get the value to compare `obj` by."""
         # TODO: Conversion and null-detection here. In Python 3,
         # comparisons with None fail. We should also support flexible
         # attributes with different types without falling over.
+        field_val = obj.get(self.field, None)
+        if field_val is None:
+            if _type := obj._types.get(self.field):
+                # If the field is typed, use its null value.
+                field_val = obj._types[self.field].null
+            else:
+                # If not, fall back to using an empty string.
+                field_val = ""
+        if self.case_insensitive and isinstance(field_val, str):
+            field_val = field_val.lower()
+        return field_val
 
-        def key(obj: Model) -> Any:
-            field_val = obj.get(self.field, None)
-            if field_val is None:
-                if _type := obj._types.get(self.field):
-                    # If the field is typed, use its null value.
-                    field_val = obj._types[self.field].null
-                else:
-                    # If not, fall back to using an empty string.
-                    field_val = ""
-            if self.case_insensitive and isinstance(field_val, str):
-                field_val = field_val.lower()
-            return field_val
-
-        return sorted(objs, key=key, reverse=not self.ascending)
+    def sort(self, objs: list[AnyModel]) -> list[AnyModel]:
+        return sorted(objs, key=self.key, reverse=not self.ascending)
+
+    def top(self, objs: Iterable[AnyModel], n: int) -> list[AnyModel]:
+        # Keep a heap of the `n` best objects instead of sorting them
+        # all. Like `sorted`, this is stable.
+        select = heapq.nsmallest if self.ascending else heapq.nlargest
+        return select(n, objs, key=self.key)
 
     def __repr__(self) -> str:
         return (
@@ -1015,6 +1163,35 @@ class SlowFieldSort(FieldSort):
         return True
 
 
+class FlexFieldSort(FieldSort):
+    """A sort criterion by a flexible field with a numeric type, which
+    can be sorted on in SQL by looking the value up in the attribute
+    tables given by `sources`. Objects without a value are ordered as
+    if they had the `null` value of the field's type.
+    """
+
+    def __init__(
+        self,
+        field: str,
+        ascending: bool = True,
+        case_insensitive: bool = True,
+        sources: Sequence[FlexSource] = (),
+        null: int | float | None = None,
+    ):
+        super().__init__(field, ascending, case_insensitive)
+        self.sources = sources
+        self.null = null
+
+    def order_clause(self) -> str:
+        order = "ASC" if self.ascending else "DESC"
+        values = [source.lookup(self.field) for source in self.sources]
+        if self.null is not None:
+            values.append(str(float(self.null)))
+        if len(values) == 1:
+            return f"{values[0]} {order}"
+        return f"COALESCE({', '.join(values)}) {order}"
+
+
 class NullSort(Sort):
     """No sorting. Leave results unsorted."""
 
@@ -1046,9 +1223,11 @@ class SmartArtistSort(FieldSort):
 
         return f"COALESCE(NULLIF({field}_sort, ''), {field}) {collate} {order}"
 
-    def sort(self, objs: list[AnyModel]) -> list[AnyModel]:
-        def key(o):
-            val = o[f"{self.field}_sort"] or o[self.field]
-            return val.lower() if self.case_insensitive else val
+    @property
+    def field_names(self) -> set[str]:
+        """Return a set with the field and its sort field."""
+        return {self.field, f"{self.field}_sort"}
 
-        return sorted(objs, key=key, reverse=not self.ascending)
+    def key(self, obj: Model) -> Any:
+        val = obj[f"{self.field}_sort"] or obj[self.field]
+        return val.lower() if self.case_insensitive else val
@@ -208,6 +208,15 @@ def construct_sort_part(
             field = "albumartist" if model_cls.__name__ == "Album" else "artist"
     elif field in model_cls._fields:
         sort_cls = query.FixedFieldSort
+    elif (
+        field not in model_cls._getters()
+        and (field_type := model_cls._type(field)).sql in ("INTEGER", "REAL")
+        and (sources := model_cls._flex_sources(field))
+    ):
+        # A flexible field with a numeric type can be sorted in SQL.
+        return query.FlexFieldSort(
+            field, is_ascending, case_insensitive, sources, field_type.null
+        )
     else:
         # Flexible or computed.
         sort_cls = query.SlowFieldSort
@@ -28,6 +28,7 @@ from bisect import bisect_left, insort
 from collections import defaultdict
 from dataclasses import dataclass
 from enum import Enum
+from multiprocessing.pool import ThreadPool
 from tempfile import mkdtemp
 from typing import Callable, Iterable, Sequence
 
@@ -209,6 +210,7 @@ class ImportSession:
     _is_resuming: dict[bytes, bool]
     _merged_items: set[PathBytes]
     _merged_dirs: set[PathBytes]
+    read_pool: ThreadPool | None
 
     def __init__(
         self,
@@ -237,6 +239,7 @@ class ImportSession:
         self._is_resuming = {}
         self._merged_items = set()
         self._merged_dirs = set()
+        self.read_pool = None
 
         # Normalize the paths.
         self.paths = list(map(normpath, paths or []))
@@ -365,7 +368,10 @@ class ImportSession:
             # also add the music to the library database, so later
             # stages need to read and write data from there.
             if self.config["autotag"]:
-                stages += [lookup_candidates(self), user_query(self)]
+                stages += [
+                    self._workers(lookup_candidates, "lookup_workers"),
+                    user_query(self),
+                ]
             else:
                 stages += [import_asis(self)]
 
@@ -375,10 +381,18 @@ class ImportSession:
             for stage_func in plugins.import_stages():
                 stages.append(plugin_stage(self, stage_func))
 
-            stages += [manipulate_files(self)]
+            stages += [
+                self._workers(manipulate_files, "file_workers"),
+                finalize_tasks(self),
+            ]
 
         pl = pipeline.Pipeline(stages)
 
+        # The files of a directory are read by a pool of threads.
+        read_workers = self.config["read_workers"].get(int)
+        if read_workers > 1:
+            self.read_pool = ThreadPool(read_workers)
+
         # Run the pipeline.
         plugins.send("import_begin", session=self)
         try:
@@ -389,6 +403,31 @@ class ImportSession:
         except ImportAbortError:
             # User aborted operation. Silently stop.
             pass
+        finally:
+            if self.read_pool:
+                self.read_pool.terminate()
+                self.read_pool = None
+
+        for stats in pl.stats:
+            log.debug(
+                "stage {0}: {1} tasks in {2:.1f} seconds ({3:.1f} per second)",
+                stats.name,
+                stats.messages,
+                stats.seconds,
+                stats.messages / stats.seconds if stats.seconds else 0,
+            )
+
+    def _workers(self, stage_func, option):
+        """Set up the pipeline stage of `stage_func` with the number of
+        threads given by the `option` configuration. The tasks leave
+        the stage in the order they entered it.
+        """
+        workers = self.config[option].get(int)
+        if workers > 1:
+            return pipeline.OrderedStage(
+                stage_func(self) for _ in range(workers)
+            )
+        return stage_func(self)
 
     # Incremental and resumed imports
 
@@ -671,8 +710,7 @@ class ImportTask(BaseImportTask):
             for item in items:
                 item.set_parse(field, format(item, value))
         with lib.transaction():
-            for item in items:
-                item.store()
+            lib.bulk_store(items)
             self.album.store()
 
     def finalize(self, session: ImportSession):
@@ -863,9 +901,7 @@ class ImportTask(BaseImportTask):
             if write and (self.apply or self.choice_flag == action.RETAG):
                 item.try_write()
 
-        with session.lib.transaction():
-            for item in self.imported_items():
-                item.store()
+        session.lib.bulk_store(self.imported_items())
 
         plugins.send("import_task_files", session=session, task=self)
 
@@ -1332,9 +1368,8 @@ class ImportTaskFactory:
         # Search for music in the directory.
         for dirs, paths in sorted(self.paths(), key=lambda k: -os.path.getmtime(k[0][0])):
             if self.session.config["singletons"]:
-                for path in paths:
-                    tasks = self._create(self.singleton(path))
-                    yield from tasks
+                for task in self.singletons(paths):
+                    yield from self._create(task)
                 yield self.sentinel(dirs)
 
             else:
@@ -1382,18 +1417,27 @@ class ImportTaskFactory:
 
     def singleton(self, path: PathBytes):
         """Return a `SingletonImportTask` for the music file."""
-        if self.session.already_imported(self.toppath, [path]):
-            log.debug(
-                "Skipping previously-imported path: {0}", displayable_path(path)
-            )
-            self.skipped += 1
-            return None
+        tasks = self.singletons([path])
+        return tasks[0] if tasks else None
 
-        item = self.read_item(path)
-        if item:
-            return SingletonImportTask(self.toppath, item)
-        else:
-            return None
+    def singletons(self, paths: Sequence[PathBytes]):
+        """Return a `SingletonImportTask` for each music file among
+        `paths` that was not imported before, in the same order.
+        """
+        new_paths = []
+        for path in paths:
+            if self.session.already_imported(self.toppath, [path]):
+                log.debug(
+                    "Skipping previously-imported path: {0}",
+                    displayable_path(path),
+                )
+                self.skipped += 1
+            else:
+                new_paths.append(path)
+        return [
+            SingletonImportTask(self.toppath, item)
+            for item in self.read_items(new_paths)
+        ]
 
     def album(self, paths: Iterable[PathBytes], items, dirs=None):
         """Return a `ImportTask` with all media files from paths.
@@ -1417,9 +1461,9 @@ class ImportTaskFactory:
             self.skipped += 1
             return None
 
-        items: list[library.Item] = [
-            item for item in map(self.read_item, paths if has_new_paths else []) if item
-        ]
+        items: list[library.Item] = self.read_items(
+            paths if has_new_paths else []
+        )
 
         if len(items) > 0:
             return ImportTask(self.toppath, dirs, items)
@@ -1461,6 +1505,20 @@ class ImportTaskFactory:
         log.debug("Archive extracted to: {0}", self.toppath)
         return archive_task
 
+    def read_items(self, paths: Sequence[PathBytes]) -> list[library.Item]:
+        """Return the `Item`s read from the paths, in the same order,
+        leaving out the files that cannot be read.
+
+        The files are read concurrently by the session's `read_pool`,
+        if any.
+        """
+        pool = self.session.read_pool
+        if pool is not None and len(paths) > 1:
+            items = pool.map(self.read_item, paths)
+        else:
+            items = map(self.read_item, paths)
+        return [item for item in items if item]
+
     def read_item(self, path: PathBytes):
         """Return an `Item` read from the path.
 
@@ -1757,11 +1815,10 @@ def plugin_stage(
     task.reload()
 
 
-@pipeline.stage
+@pipeline.mutator_stage
 def manipulate_files(session: ImportSession, task: ImportTask):
     """A coroutine (pipeline stage) that performs necessary file
-    manipulations *after* items have been added to the library and
-    finalizes each task.
+    manipulations *after* items have been added to the library.
     """
     if not task.skip:
         if task.should_remove_duplicates:
@@ -1788,7 +1845,13 @@ def manipulate_files(session: ImportSession, task: ImportTask):
             write=session.config["write"],
         )
 
-    # Progress, cleanup, and event.
+
+@pipeline.stage
+def finalize_tasks(session: ImportSession, task: ImportTask):
+    """A coroutine (pipeline stage) that records the progress of each
+    task, cleans up its files and emits its event, in the order of the
+    tasks.
+    """
     task.finalize(session)
 
 
@@ -16,9 +16,11 @@
 
 from __future__ import annotations
 
+import inspect
 import os
 import re
 import shlex
+import sqlite3
 import string
 import sys
 import time
@@ -41,9 +43,11 @@ from beets.util import (
     samefile,
     syspath,
 )
-from beets.util.functemplate import Template, template
+from beets.util.functemplate import Template, branching, template
 
 if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
     from .dbcore.query import FieldQuery, FieldQueryType
 
 # To use the SQLite "blob" type, it doesn't suffice to provide a byte
@@ -397,7 +401,17 @@ class LibModel(dbcore.Model["Library"]):
             # Using an explicit table name resolves this.
             field = f"{cls._table}.{field}"
 
-        return query_cls(field, pattern, fast)
+        query = query_cls(field, pattern, fast)
+        if (
+            not fast
+            and isinstance(query, dbcore.FieldQuery)
+            and field not in cls._getters()
+            and field not in cls._queries
+        ):
+            # A flexible attribute: let the query look its value up in
+            # the database.
+            query.flex_sources = cls._flex_sources(field)
+        return query
 
     @classmethod
     def any_field_query(cls, *args, **kwargs) -> dbcore.OrQuery:
@@ -606,6 +620,7 @@ class Item(LibModel):
         "channels": types.INTEGER,
         "mtime": DateType(),
         "added": DateType(),
+        "filesize": types.INTEGER,
     }
 
     _search_fields = (
@@ -641,6 +656,19 @@ class Item(LibModel):
 
     _queries = {"singleton": SingletonQuery}
 
+    _indices = [
+        dbcore.Index.for_expression("items", field)
+        for field in (
+            "album_id",
+            "path",
+            "albumartist",
+            "mb_trackid",
+            "mb_albumid",
+            "added",
+            "mtime",
+        )
+    ]
+
     _format_config_key = "format_item"
 
     # Cached album object. Read-only.
@@ -691,9 +719,23 @@ class Item(LibModel):
     def _getters(cls):
         getters = plugins.item_field_getters()
         getters["singleton"] = lambda i: i.album_id is None
-        getters["filesize"] = Item.try_filesize  # In bytes.
+        getters["filesize"] = Item._filesize  # In bytes.
         return getters
 
+    @classmethod
+    def _flex_sources(cls, key):
+        # Items fall back to the fields of their album, which may be
+        # fixed or computed.
+        if key in Album._fields or key in Album._getters():
+            return []
+        return super()._flex_sources(key) + [
+            dbcore.query.FlexSource(
+                Album._flex_table,
+                f"{cls._table}.album_id",
+                Album._type(key).sql,
+            )
+        ]
+
     def duplicates_query(self, fields: list[str]) -> dbcore.AndQuery:
         """Return a query for entities with same values in the given fields."""
         return super().duplicates_query(fields) & dbcore.query.NoneQuery(
@@ -830,6 +872,7 @@ class Item(LibModel):
             self.mtime = self.current_mtime()
 
         self.path = read_path
+        self.filesize = self.try_filesize()
 
     def write(self, path=None, tags=None, id3v23=None):
         """Write the item's metadata to a media file.
@@ -878,9 +921,10 @@ class Item(LibModel):
         except UnreadableFileError as exc:
             raise WriteError(self.path, exc)
 
-        # The file has a new mtime.
+        # The file has a new mtime and size.
         if path == self.path:
             self.mtime = self.current_mtime()
+            self.filesize = self.try_filesize()
         plugins.send("after_write", item=self, path=path)
 
     def try_write(self, *args, **kwargs):
@@ -896,14 +940,15 @@ class Item(LibModel):
             log.error("{0}", exc)
             return False
 
-    def try_sync(self, write, move, with_album=True):
+    def try_sync(self, write, move, with_album=True, store=True):
         """Synchronize the item with the database and, possibly, update its
         tags on disk and its path (by moving the file).
 
         `write` indicates whether to write new tags into the file. Similarly,
         `move` controls whether the path should be updated. In the
         latter case, files are *only* moved when they are inside their
-        library's directory (if any).
+        library's directory (if any). If `store` is false, the item is not
+        stored, so that the caller can store many items at once.
 
         Similar to calling :meth:`write`, :meth:`move`, and :meth:`store`
         (conditionally).
@@ -918,7 +963,8 @@ class Item(LibModel):
                     util.displayable_path(self.path),
                 )
                 self.move(with_album=with_album)
-        self.store()
+        if store:
+            self.store()
 
     # Files themselves.
 
@@ -980,6 +1026,12 @@ class Item(LibModel):
         """
         return int(os.path.getmtime(syspath(self.path)))
 
+    def _filesize(self):
+        """Get the size of the file in bytes stored in the database, or
+        get it from the file if none was stored.
+        """
+        return self._values_fixed.get("filesize") or self.try_filesize()
+
     def try_filesize(self):
         """Get the size of the underlying file in bytes.
 
@@ -1090,74 +1142,8 @@ class Item(LibModel):
         base directory for the destination.
         """
         db = self._check_db()
-        platform = platform or sys.platform
-        basedir = basedir or db.directory
-        path_formats = path_formats or db.path_formats
-        if replacements is None:
-            replacements = self._db.replacements
-
-        # Use a path format based on a query, falling back on the
-        # default.
-        for query, path_format in path_formats:
-            if query == PF_KEY_DEFAULT:
-                continue
-            query, _ = parse_query_string(query, type(self))
-            if query.match(self):
-                # The query matches the item! Use the corresponding path
-                # format.
-                break
-        else:
-            # No query matched; fall back to default.
-            for query, path_format in path_formats:
-                if query == PF_KEY_DEFAULT:
-                    break
-            else:
-                assert False, "no default path format"
-        if isinstance(path_format, Template):
-            subpath_tmpl = path_format
-        else:
-            subpath_tmpl = template(path_format)
-
-        # Evaluate the selected template.
-        subpath = self.evaluate_template(subpath_tmpl, True)
-
-        # Prepare path for output: normalize Unicode characters.
-        if platform == "darwin":
-            subpath = unicodedata.normalize("NFD", subpath)
-        else:
-            subpath = unicodedata.normalize("NFC", subpath)
-
-        if beets.config["asciify_paths"]:
-            subpath = util.asciify_path(
-                subpath, beets.config["path_sep_replace"].as_str()
-            )
-
-        maxlen = beets.config["max_filename_length"].get(int)
-        if not maxlen:
-            # When zero, try to determine from filesystem.
-            maxlen = util.max_filename_length(db.directory)
-
-        subpath, fellback = util.legalize_path(
-            subpath,
-            replacements,
-            maxlen,
-            os.path.splitext(self.path)[1],
-            fragment,
-        )
-        if fellback:
-            # Print an error message if legalization fell back to
-            # default replacements because of the maximum length.
-            log.warning(
-                "Fell back to default replacements when naming "
-                "file {}. Configure replacements to avoid lengthening "
-                "the filename.",
-                subpath,
-            )
-
-        if fragment:
-            return util.as_string(subpath)
-        else:
-            return normpath(os.path.join(basedir, subpath))
+        router = db.path_router(path_formats, replacements, type(self))
+        return router.destination(self, fragment, basedir, platform)
 
 
 class Album(LibModel):
@@ -1227,6 +1213,11 @@ class Album(LibModel):
         "artist": dbcore.query.SmartArtistSort,
     }
 
+    _indices = [
+        dbcore.Index.for_expression("albums", field)
+        for field in ("albumartist", "mb_albumid", "added")
+    ]
+
     # List of keys that are set on an album's items.
     item_keys = [
         "added",
@@ -1298,16 +1289,19 @@ class Album(LibModel):
         getters["albumtotal"] = Album._albumtotal
         return getters
 
-    def items(self, sort=None, limit=None, select=None):
+    def items(self, sort=None, limit=None, fields=None):
         """Return an iterable over the items associated with this
-        album.
+        album. If `fields` is given, only these fields of the items are
+        read up front.
 
         This method conflicts with :meth:`LibModel.items`, which is
         inherited from :meth:`beets.dbcore.Model.items`.
         Since :meth:`Album.items` predates these methods, and is
         likely to be used by plugins, we keep this interface as-is.
         """
-        return self._db.items(dbcore.MatchQuery('album_id', self.id), sort, limit, select)
+        return self._db.items(
+            dbcore.MatchQuery("album_id", self.id), sort, limit, fields
+        )
 
     def remove(self, delete=False, with_items=True):
         """Remove this album and all its associated items from the
@@ -1527,16 +1521,18 @@ class Album(LibModel):
         with self._db.transaction():
             super().store(fields)
             if track_updates:
-                for item in self.items():
+                items = list(self.items())
+                for item in items:
                     for key, value in track_updates.items():
                         item[key] = value
-                    item.store()
+                self._db.bulk_store(items)
             if track_deletes:
-                for item in self.items():
+                items = list(self.items())
+                for item in items:
                     for key in track_deletes:
                         if key in item:
                             del item[key]
-                    item.store()
+                self._db.bulk_store(items)
 
     def try_sync(self, write, move, inherit=True):
         """Synchronize the album and its items with the database.
@@ -1599,6 +1595,155 @@ def parse_query_string(s, model_cls):
     return parse_query_parts(parts, model_cls)
 
 
+# Path format routing.
+
+
+class PathFormatRouter:
+    """The path formats of a library, prepared to choose and evaluate
+    the destinations of many items: the queries of the path formats are
+    parsed, their templates compiled and the relevant configuration
+    read once.
+
+    The router keeps statistics on the destinations it computes in
+    `count` and `elapsed` (in seconds).
+    """
+
+    def __init__(
+        self,
+        lib: Library,
+        path_formats,
+        replacements,
+        model_cls: type[Item],
+    ):
+        self.directory = lib.directory
+        self.replacements = replacements
+
+        # Queries in the order of the path formats, and the default
+        # template if any.
+        self.formats: list[tuple[dbcore.Query, Template]] = []
+        self.default: Template | None = None
+        for query, path_format in path_formats:
+            if not isinstance(path_format, Template):
+                path_format = template(path_format)
+            if query == PF_KEY_DEFAULT:
+                if self.default is None:
+                    self.default = path_format
+            else:
+                query, _ = parse_query_string(query, model_cls)
+                self.formats.append((query, path_format))
+
+        self.asciify = beets.config["asciify_paths"].get(bool)
+        self.sep_replace = beets.config["path_sep_replace"].as_str()
+        self.maxlen = beets.config["max_filename_length"].get(int)
+        if not self.maxlen:
+            # When zero, try to determine from filesystem.
+            self.maxlen = util.max_filename_length(self.directory)
+
+        self.count = 0
+        self.elapsed = 0.0
+
+    @cached_property
+    def fields(self) -> set[str] | None:
+        """The item fields that choosing and evaluating a destination
+        reads, to fetch the items with. None if the path formats use
+        computed fields, whose dependencies are not known.
+        """
+        fields = {"album_id", "path"}
+        templates = [t for _, t in self.formats]
+        if self.default:
+            templates.append(self.default)
+        for path_format in templates:
+            fields.update(path_format.varnames)
+        for query, _ in self.formats:
+            fields.update(query.field_names)
+        # `singleton` is only computed from `album_id`.
+        if fields.intersection(Item._getters()).difference(["singleton"]):
+            return None
+        return fields
+
+    def template_for(self, item: Item) -> Template:
+        """Get the template of the first path format whose query
+        matches `item`, falling back on the default.
+        """
+        for query, path_format in self.formats:
+            if query.match(item):
+                return path_format
+        assert self.default is not None, "no default path format"
+        return self.default
+
+    def destination(
+        self,
+        item: Item,
+        fragment: bool = False,
+        basedir=None,
+        platform: str | None = None,
+    ):
+        """Return the destination of `item`, as described in
+        :meth:`Item.destination`.
+        """
+        start = time.perf_counter()
+        platform = platform or sys.platform
+        basedir = basedir or self.directory
+
+        # Evaluate the selected template.
+        subpath = item.evaluate_template(self.template_for(item), True)
+
+        # Prepare path for output: normalize Unicode characters.
+        if platform == "darwin":
+            subpath = unicodedata.normalize("NFD", subpath)
+        else:
+            subpath = unicodedata.normalize("NFC", subpath)
+
+        if self.asciify:
+            subpath = util.asciify_path(subpath, self.sep_replace)
+
+        subpath, fellback = util.legalize_path(
+            subpath,
+            self.replacements,
+            self.maxlen,
+            os.path.splitext(item.path)[1],
+            fragment,
+        )
+        if fellback:
+            # Print an error message if legalization fell back to
+            # default replacements because of the maximum length.
+            log.warning(
+                "Fell back to default replacements when naming "
+                "file {}. Configure replacements to avoid lengthening "
+                "the filename.",
+                subpath,
+            )
+
+        if fragment:
+            dest = util.as_string(subpath)
+        else:
+            dest = normpath(os.path.join(basedir, subpath))
+
+        self.count += 1
+        self.elapsed += time.perf_counter() - start
+        return dest
+
+    def destinations(
+        self,
+        items: Iterable[Item],
+        fragment: bool = False,
+        basedir=None,
+        platform: str | None = None,
+    ) -> list:
+        """Return the destinations of all `items`, in order."""
+        count, elapsed = self.count, self.elapsed
+        dests = [
+            self.destination(item, fragment, basedir, platform)
+            for item in items
+        ]
+        log.debug(
+            "computed {} destinations in {:.3f} seconds",
+            self.count - count,
+            self.elapsed - elapsed,
+        )
+        return dests
+
+
 # The Library: interface to the database.
 
 
@@ -1615,7 +1760,24 @@ class Library(dbcore.Database):
         replacements=None,
     ):
         timeout = beets.config["timeout"].as_number()
-        super().__init__(path, timeout=timeout)
+        db_config = beets.config["database"]
+        pragmas = {
+            name: db_config[name].get()
+            for name in (
+                "journal_mode",
+                "synchronous",
+                "cache_size",
+                "mmap_size",
+                "temp_store",
+            )
+        }
+        super().__init__(
+            path,
+            timeout=timeout,
+            pragmas=pragmas,
+            read_connections=db_config["read_connections"].get(int),
+            query_cache_size=db_config["query_cache"].get(int),
+        )
 
         self.directory = normpath(directory or platformdirs.user_music_path())
 
@@ -1624,6 +1786,100 @@ class Library(dbcore.Database):
 
         # Used for template substitution performance.
         self._memotable: dict[tuple[str, ...], str] = {}
+        self._unique_groups: dict[tuple, tuple[tuple[int, ...], set]] = {}
+
+        # The most recently used path format router and what it was
+        # built from.
+        self._router: PathFormatRouter | None = None
+        self._router_key: tuple | None = None
+
+        # Replace the Python implementation of the ``regexp`` function with
+        # a native one if the user provides an SQLite extension for it.
+        regexp_extension = db_config["regexp_extension"].get()
+        if regexp_extension:
+            try:
+                self.load_extension(db_config["regexp_extension"].as_filename())
+            except (ValueError, sqlite3.OperationalError) as exc:
+                log.warning(
+                    "could not load regexp extension {0}: {1}",
+                    regexp_extension,
+                    exc,
+                )
+
+        # Create the indices configured by the user.
+        for model_cls in self._models:
+            key = f"index_{model_cls.__name__.lower()}"
+            for expression in beets.config[key].as_str_seq():
+                try:
+                    self.create_index(model_cls, expression)
+                except sqlite3.OperationalError as exc:
+                    log.warning(
+                        "could not create index on {0}: {1}", expression, exc
+                    )
+
+    def path_router(
+        self, path_formats=None, replacements=None, model_cls=None
+    ) -> PathFormatRouter:
+        """Get a :class:`PathFormatRouter` for `path_formats` and
+        `replacements`, defaulting to the library's.
+
+        The router is reused as long as the path formats, replacements,
+        library directory and configuration do not change.
+        """
+        path_formats = path_formats or self.path_formats
+        if replacements is None:
+            replacements = self.replacements
+        model_cls = model_cls or Item
+        # Every change to the configuration adds a source to it. Sources
+        # are compared by identity first, so the check is cheap.
+        key = (
+            path_formats,
+            replacements,
+            model_cls,
+            self.directory,
+            tuple(beets.config.sources),
+        )
+        if self._router is None or key != self._router_key:
+            self._router = PathFormatRouter(
+                self, path_formats, replacements, model_cls
+            )
+            self._router_key = key
+        return self._router
+
+    def _ambiguous_groups(self, model_cls, keys) -> set[tuple] | None:
+        """Get the combinations of values of the fields `keys` that are
+        shared by several objects of `model_cls`, or by several singletons
+        for items. These are the only objects that `%aunique` and
+        `%sunique` need to disambiguate.
+
+        The groups are found with a single grouped query and cached until
+        objects are added or removed or one of the fields changes. Return
+        None if one of the fields is not a fixed field of the model.
+        """
+        if not keys or not all(key in model_cls._fields for key in keys):
+            return None
+
+        fields = [*keys, "album_id"] if model_cls is Item else keys
+        revision = self.table_revision(model_cls._table, fields)
+        cache_key = (model_cls, tuple(keys))
+        cached = self._unique_groups.get(cache_key)
+        if cached and cached[0] == revision:
+            return cached[1]
+
+        columns = ", ".join(keys)
+        where = "album_id IS NULL" if model_cls is Item else "1"
+        with self.transaction(read_only=True) as tx:
+            rows = tx.query(
+                f"SELECT {columns} FROM {model_cls._table} WHERE {where} "
+                f"GROUP BY {columns} HAVING COUNT(*) > 1"
+            )
+        types = [model_cls._type(key) for key in keys]
+        groups = {
+            tuple(t.from_sql(value) for t, value in zip(types, row))
+            for row in rows
+        }
+        self._unique_groups[cache_key] = (revision, groups)
+        return groups
 
     # Adding objects to the database.
 
@@ -1637,6 +1893,23 @@ class Library(dbcore.Database):
         self._memotable = {}
         return obj.id
 
+    def bulk_add(self, objs):
+        """Add several :class:`Item` or :class:`Album` objects to the
+        library database at once.
+        """
+        objs = list(objs)
+        super().bulk_add(objs)
+        self._memotable = {}
+
+    def bulk_store(self, objs, fields=None):
+        """Store several :class:`Item` or :class:`Album` objects to the
+        library database at once.
+        """
+        objs = list(objs)
+        super().bulk_store(objs, fields)
+        for obj in objs:
+            plugins.send("database_change", lib=self, model=obj)
+
     def add_album(self, items):
         """Create a new album consisting of a list of items.
 
@@ -1657,16 +1930,23 @@ class Library(dbcore.Database):
             album.add(self)
             for item in items:
                 item.album_id = album.id
-                if item.id is None:
-                    item.add(self)
-                else:
-                    item.store()
+            self.bulk_add(item for item in items if item.id is None)
+            self.bulk_store(item for item in items if item.id is not None)
 
         return album
 
     # Querying.
 
-    def _fetch(self, model_cls, query, sort=None, limit=None, select=None):
+    def _fetch(
+        self,
+        model_cls,
+        query,
+        sort=None,
+        limit=None,
+        fields=None,
+        stream=False,
+        prefetch=None,
+    ):
         """Parse a query and fetch.
 
         If an order specification is present in the query string
@@ -1688,7 +1968,7 @@ class Library(dbcore.Database):
             sort = parsed_sort
 
         return super()._fetch(
-            model_cls, query, sort, limit, select
+            model_cls, query, sort, limit, fields, stream, prefetch
         )
 
     @staticmethod
@@ -1705,13 +1985,169 @@ class Library(dbcore.Database):
             Item, beets.config["sort_item"].as_str_seq()
         )
 
-    def albums(self, query=None, sort=None, limit=None, select=None):
-        """Get :class:`Album` objects matching the query."""
-        return self._fetch(Album, query, sort or self.get_default_album_sort(), limit, select)
+    def albums(
+        self, query=None, sort=None, limit=None, fields=None, stream=False
+    ):
+        """Get :class:`Album` objects matching the query.
+
+        If `fields` is given, only these fields are read from the
+        database: the others are loaded when they are first accessed.
+        If `stream` is true, the albums are read from the database in
+        chunks as they are iterated instead of being fetched up front.
+        """
+        return self._fetch(
+            Album,
+            query,
+            sort or self.get_default_album_sort(),
+            limit,
+            fields,
+            stream,
+        )
+
+    def items(
+        self,
+        query=None,
+        sort=None,
+        limit=None,
+        fields=None,
+        stream=False,
+        with_albums=False,
+    ):
+        """Get :class:`Item` objects matching the query.
+
+        If `fields` is given, only these fields are read from the
+        database: the others are loaded when they are first accessed.
+        If `stream` is true, the items are read from the database in
+        chunks as they are iterated instead of being fetched up front.
+        If `with_albums` is true, the albums of the items are loaded
+        along with them, with one query per chunk of items, instead of
+        one query per item when they are first needed.
+        """
+        return self._fetch(
+            Item,
+            query,
+            sort or self.get_default_item_sort(),
+            limit,
+            fields,
+            stream,
+            self._album_prefetcher() if with_albums else None,
+        )
+
+    def _album_prefetcher(self) -> Callable[[list[Item]], None]:
+        """Make a function that attaches their albums to a list of
+        items. Albums are kept in an identity map across calls: items of
+        the same album share one :class:`Album` object, and only albums
+        not seen before are loaded, in a single query.
+        """
+        albums: dict[int, Album] = {}
+
+        def prefetch(items: list[Item]):
+            missing = {
+                item.album_id for item in items if item.album_id is not None
+            }.difference(albums)
+            if missing:
+                query = dbcore.query.InQuery("id", list(missing))
+                albums.update((a.id, a) for a in self._fetch(Album, query))
+            for item in items:
+                if item.album_id is not None:
+                    item._cached_album = albums.get(item.album_id)
+
+        return prefetch
+
+    def format_items(self, query=None, fmt="", sort=None):
+        """Generate the strings of the items matching the query formatted
+        with the template `fmt`, like ``format(item, fmt)``.
+
+        When the template only refers to fixed item fields and to
+        functions that do not depend on the item, it is evaluated on the
+        values of those fields read from the database, without
+        constructing the items. Otherwise, or when the query or sort
+        cannot be run in SQL, the items are formatted one by one.
+        """
+        tmpl = template(fmt or beets.config[Item._format_config_key].as_str())
+        functions = self._batch_template_funcs(tmpl)
+        keys = self._batch_template_keys(tmpl)
+        batch = functions is not None and keys is not None
+        results = self.items(query, sort, stream=True, with_albums=not batch)
+        if not batch or results.query or results.sort:
+            for item in results:
+                yield item.evaluate_template(tmpl)
+            return
+
+        types = [Item._type(key) for key in keys]
+        fallbacks = [
+            (key, other)
+            for key, other in (
+                ("artist", "albumartist"),
+                ("albumartist", "artist"),
+            )
+            if key in keys
+        ]
+
+        def formatted_rows():
+            for row in results.raw_rows(keys):
+                values = {}
+                for key, typ, value in zip(keys, types, row):
+                    value = typ.format(typ.from_sql(value))
+                    if isinstance(value, bytes):
+                        value = value.decode("utf-8", "ignore")
+                    values[key] = value
+                # As in `FormattedItemMapping`.
+                for key, other in fallbacks:
+                    if not values[key]:
+                        values[key] = values[other]
+                yield values
+
+        yield from tmpl.substitute_many(formatted_rows(), functions)
+
+    @classmethod
+    def template_fields(cls, model_cls, fmt=""):
+        """Get the fields to fetch objects of type `model_cls` with, to
+        format them with the template `fmt` (by default, the configured
+        format of the model). Return None if every field may be needed:
+        computed fields and functions bound to the object can read any
+        field.
+        """
+        tmpl = template(
+            fmt or beets.config[model_cls._format_config_key].as_str()
+        )
+        if cls._batch_template_funcs(tmpl) is None or any(
+            key in model_cls._getters() for key in tmpl.varnames
+        ):
+            return None
+        return tmpl.varnames
+
+    @staticmethod
+    def _batch_template_funcs(tmpl):
+        """Get the template functions to evaluate `tmpl` on the values of
+        many items with, or None if it uses a function that needs the
+        item itself.
+        """
+        functions = DefaultTemplateFunctions._static_functions.copy()
+        functions.update(plugins.template_funcs())
+        prefix = DefaultTemplateFunctions._prefix
+        for key in DefaultTemplateFunctions._bound_func_names:
+            name = key[len(prefix) :]
+            if name in tmpl.funcnames and name not in functions:
+                return None
+        return functions
 
-    def items(self, query=None, sort=None, limit=None, select=None):
-        """Get :class:`Item` objects matching the query."""
-        return self._fetch(Item, query, sort or self.get_default_item_sort(), limit, select)
+    @staticmethod
+    def _batch_template_keys(tmpl):
+        """Get the fixed item fields to read from the database to
+        evaluate `tmpl`, or None if it refers to other fields: computed,
+        flexible or album fields need the items.
+        """
+        getters = Item._getters()
+        if any(
+            key not in Item._fields or key in getters for key in tmpl.varnames
+        ):
+            return None
+        # At least one column must be selected for every item.
+        keys = set(tmpl.varnames) or {"id"}
+        if keys & {"artist", "albumartist"}:
+            keys.update(("artist", "albumartist"))
+        return sorted(keys)
 
     # Convenience accessors.
 
@@ -1765,6 +2201,28 @@ class DefaultTemplateFunctions:
         """Names of tmpl_* functions in this class."""
         return [s for s in dir(cls) if s.startswith(cls._prefix)]
 
+    @cached_classproperty
+    def _static_functions(cls) -> dict[str, Callable[..., str]]:
+        """The static tmpl_* functions of this class, which are the same
+        for every object, by name as exposed in templates.
+        """
+        return {
+            key[len(cls._prefix) :]: getattr(cls, key)
+            for key in cls._func_names
+            if isinstance(inspect.getattr_static(cls, key), staticmethod)
+        }
+
+    @cached_classproperty
+    def _bound_func_names(cls) -> list[str]:
+        """Names of the tmpl_* functions that must be bound to an
+        object.
+        """
+        return [
+            key
+            for key in cls._func_names
+            if key[len(cls._prefix) :] not in cls._static_functions
+        ]
+
     def __init__(self, item=None, lib=None):
         """Parametrize the functions.
 
@@ -1781,8 +2239,8 @@ class DefaultTemplateFunctions:
         The keys are function names (as exposed in templates)
         and the values are Python functions.
         """
-        out = {}
-        for key in self._func_names:
+        out = self._static_functions.copy()
+        for key in self._bound_func_names:
             out[key[len(self._prefix) :]] = getattr(self, key)
         return out
 
@@ -1817,6 +2275,7 @@ class DefaultTemplateFunctions:
         return s[-_int_arg(chars) :]
 
     @staticmethod
+    @branching
     def tmpl_if(condition, trueval, falseval=""):
         """If ``condition`` is nonempty and nonzero, emit ``trueval``;
         otherwise, emit ``falseval`` (if provided).
@@ -1873,7 +2332,12 @@ class DefaultTemplateFunctions:
         if memoval is not None:
             return memoval
 
-        album = self.lib.get_album(album_id)
+        if isinstance(self.item, Item) and self.item._db is self.lib:
+            # Use the album attached to the item, which may have been
+            # prefetched.
+            album = self.item._cached_album
+        else:
+            album = self.lib.get_album(album_id)
 
         return self._tmpl_unique(
             "aunique",
@@ -1983,6 +2447,16 @@ class DefaultTemplateFunctions:
             bracket_l = ""
             bracket_r = ""
 
+        # Most objects are alone with their keys. Tell from the groups
+        # of objects sharing their keys, computed for the whole library
+        # at once, whether there is any ambiguity to resolve.
+        groups = self.lib._ambiguous_groups(type(db_item), keys)
+        if groups is not None and not db_item._dirty.intersection(keys):
+            values = tuple(db_item.get(key) for key in keys)
+            if None not in values and values not in groups:
+                self.lib._memotable[memokey] = ""
+                return ""
+
         # Find matching items to disambiguate with.
         query = db_item.duplicates_query(keys)
         ambigous_items = (
@@ -458,11 +458,22 @@ def track_distance(item: Item, info: TrackInfo) -> Distance:
     from beets.autotag.hooks import Distance
 
     dist = Distance()
-    for plugin in find_plugins():
+    for plugin in track_distance_plugins():
         dist.update(plugin.track_distance(item, info))
     return dist
 
 
+def track_distance_plugins() -> list[BeetsPlugin]:
+    """Return the loaded plugins that contribute to the track distance,
+    that is, those overriding `BeetsPlugin.track_distance`.
+    """
+    return [
+        plugin
+        for plugin in find_plugins()
+        if type(plugin).track_distance is not BeetsPlugin.track_distance
+    ]
+
+
 def album_distance(
     items: list[Item],
     album_info: AlbumInfo,
@@ -984,6 +995,14 @@ class MetadataSourcePlugin(Generic[R], BeetsPlugin, metaclass=abc.ABCMeta):
                 return id_
         return None
 
+    def _cached(self, key: str, fetch: Callable[[], Any]) -> Any:
+        """Return the raw response to the request `key`, such as a URL,
+        from the lookup cache if possible, or else by calling `fetch`.
+        """
+        from beets.autotag import cache
+
+        return cache.lookup(self.data_source.lower(), key, fetch)
+
     def candidates(
         self,
         items: list[Item],
@@ -22,7 +22,7 @@ from operator import attrgetter
 def _length(obj, album):
     """Get the duration of an item or album."""
     if album:
-        return sum(i.length for i in obj.items())
+        return sum(i.length for i in obj.items(fields=("length",)))
     else:
         return obj.length
 
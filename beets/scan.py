@@ -0,0 +1,204 @@
+# This file is part of beets.
+# Copyright 2016, Adrian Sampson.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+"""Walk directory trees incrementally, using a journal of the
+directories seen by the previous walk that is kept in the library
+database.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from typing import TYPE_CHECKING, NamedTuple
+
+from beets import util
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from beets.dbcore import Database
+
+# A directory whose mtime is this close to the start of a walk may be
+# changed again without its mtime changing, so its listing is not
+# trusted on the next walk.
+RACY_NS = 2_000_000_000
+
+
+class Entry(NamedTuple):
+    """What a walk saw of a directory: its status and listing."""
+
+    mtime_ns: int
+    inode: int
+    dirs: list[bytes]
+    files: list[bytes]
+
+
+def _join(names: list[bytes]) -> bytes:
+    return b"\0".join(names)
+
+
+def _split(names: bytes) -> list[bytes]:
+    return names.split(b"\0") if names else []
+
+
+def _under(path: bytes, top: bytes) -> bool:
+    """Whether `path` is `top` or a path inside it."""
+    return path == top or path.startswith(os.path.join(top, b""))
+
+
+class ScanJournal:
+    """The directories seen by the previous walks of a scanner (a name
+    such as ``update`` or ``unimported``), with their mtime, inode and
+    listing.
+
+    A directory gains or loses entries only when its mtime changes, so
+    `walk` reuses the listing of the unchanged directories instead of
+    reading them. Changes to the contents of files are not tracked.
+    """
+
+    table = "scan_journal"
+
+    def __init__(self, db: Database, scanner: str):
+        self.db = db
+        self.scanner = scanner
+        with db.transaction() as tx:
+            tx.script(
+                """
+                CREATE TABLE IF NOT EXISTS {0} (
+                    id INTEGER PRIMARY KEY,
+                    scanner TEXT,
+                    path BLOB,
+                    mtime_ns INTEGER,
+                    inode INTEGER,
+                    dirs BLOB,
+                    files BLOB,
+                    UNIQUE(scanner, path) ON CONFLICT REPLACE);
+                """.format(self.table)
+            )
+            rows = tx.query(
+                f"SELECT path, mtime_ns, inode, dirs, files FROM {self.table}"
+                " WHERE scanner=?",
+                (scanner,),
+            )
+        self.entries = {
+            row[0]: Entry(row[1], row[2], _split(row[3]), _split(row[4]))
+            for row in rows
+        }
+        self._seen: dict[bytes, Entry | None] = {}
+        self._tops: list[bytes] = []
+
+    def walk(
+        self, top: bytes
+    ) -> Iterator[tuple[bytes, list[bytes], list[bytes], bool]]:
+        """Walk the directory tree under `top` like `os.walk`, yielding
+        a `(dirpath, dirnames, filenames, changed)` tuple for every
+        directory, where `changed` tells whether its listing was read
+        because the directory changed since the previous walk.
+
+        As with `os.walk`, `dirnames` can be modified in place to prune
+        the walk. The directories seen are recorded by `save`.
+        """
+        start_ns = time.time_ns()
+        top = util.bytestring_path(top)
+        self._tops.append(top)
+        pending = [top]
+        while pending:
+            path = pending.pop()
+            try:
+                stat = os.stat(util.syspath(path))
+            except OSError:
+                continue
+
+            entry = self.entries.get(path)
+            changed = (
+                entry is None
+                or entry.mtime_ns != stat.st_mtime_ns
+                or entry.inode != stat.st_ino
+            )
+            if changed:
+                dirs, files = [], []
+                try:
+                    with os.scandir(util.syspath(path)) as it:
+                        for dirent in it:
+                            name = util.bytestring_path(dirent.name)
+                            # Like `os.walk`, do not follow symlinks.
+                            if dirent.is_dir(follow_symlinks=False):
+                                dirs.append(name)
+                            elif not dirent.is_dir():
+                                files.append(name)
+                except OSError:
+                    continue
+                dirs.sort()
+                files.sort()
+                entry = Entry(stat.st_mtime_ns, stat.st_ino, dirs, files)
+            dirs, files = list(entry.dirs), list(entry.files)
+
+            # Listings taken right after a change are read again next time.
+            racy = stat.st_mtime_ns >= start_ns - RACY_NS
+            self._seen[path] = None if racy else entry
+
+            yield path, dirs, files, changed
+            pending.extend(os.path.join(path, d) for d in reversed(dirs))
+
+    def forget(self, path: bytes):
+        """Do not record the directory at `path` as seen, so that the
+        next walk reads it again.
+        """
+        self._seen[util.bytestring_path(path)] = None
+
+    def save(self):
+        """Record the directories seen by `walk` for the next walk."""
+        updates = [
+            (
+                self.scanner,
+                path,
+                entry.mtime_ns,
+                entry.inode,
+                _join(entry.dirs),
+                _join(entry.files),
+            )
+            for path, entry in self._seen.items()
+            if entry is not None and entry != self.entries.get(path)
+        ]
+        # Forget the racy directories and those that were not found
+        # again under the walked trees.
+        for path in self.entries:
+            if path not in self._seen and any(
+                _under(path, top) for top in self._tops
+            ):
+                self._seen[path] = None
+        forgotten = [
+            (self.scanner, path)
+            for path, entry in self._seen.items()
+            if entry is None
+        ]
+        with self.db.transaction() as tx:
+            tx.mutate_many(
+                f"INSERT INTO {self.table} "
+                "(scanner, path, mtime_ns, inode, dirs, files) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                updates,
+            )
+            tx.mutate_many(
+                f"DELETE FROM {self.table} WHERE scanner=? AND path=?",
+                forgotten,
+            )
+        for path, entry in self._seen.items():
+            if entry is None:
+                self.entries.pop(path, None)
+            else:
+                self.entries[path] = entry
+        self._seen.clear()
+        self._tops.clear()
@@ -165,6 +165,7 @@ class ConfigMixin:
         config["verbose"] = 1
         config["ui"]["color"] = False
         config["threaded"] = False
+        config["lookup_cache"]["enabled"] = False
         return config
 
 
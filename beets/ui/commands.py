@@ -18,15 +18,29 @@ interface.
 
 import os
 import re
+import sqlite3
+import time
 from collections import Counter
 from collections.abc import Sequence
-from itertools import chain
+from itertools import chain, islice
+from multiprocessing.pool import ThreadPool
 from platform import python_version
 from typing import Any, NamedTuple
 
 import beets
-from beets import autotag, config, importer, library, logging, plugins, ui, util
-from beets.autotag import Recommendation, hooks
+from beets import (
+    autotag,
+    config,
+    dbcore,
+    importer,
+    library,
+    logging,
+    plugins,
+    ui,
+    util,
+)
+from beets.autotag import Recommendation, cache, hooks
+from beets.scan import ScanJournal
 from beets.ui import (
     decargs,
     input_,
@@ -75,7 +89,7 @@ def _do_query(lib, query, album, also_items=True):
 
     else:
         albums = []
-        items = list(lib.items(query))
+        items = list(lib.items(query, with_albums=True))
 
     if album and not albums:
         raise ui.UserError("No matching albums found.")
@@ -146,7 +160,7 @@ def fields_func(lib, opts, args):
     print_("Album fields:")
     _print_rows(library.Album.all_keys())
 
-    with lib.transaction() as tx:
+    with lib.transaction(read_only=True) as tx:
         # The SQL uses the DISTINCT to get unique values from the query
         unique_fields = "SELECT DISTINCT key FROM (%s)"
 
@@ -1606,11 +1620,12 @@ def list_items(lib, query, album, fmt=""):
     albums instead of single items.
     """
     if album:
-        for album in lib.albums(query):
+        fields = lib.template_fields(library.Album, fmt)
+        for album in lib.albums(query, fields=fields, stream=True):
             ui.print_(format(album, fmt))
     else:
-        for item in lib.items(query):
-            ui.print_(format(item, fmt))
+        for line in lib.format_items(query, fmt):
+            ui.print_(line)
 
 
 def list_func(lib, opts, args):
@@ -1629,101 +1644,210 @@ default_commands.append(list_cmd)
 # update: Update library contents according to on-disk tags.
 
 
-def update_items(lib, query, album, move, pretend, fields, exclude_fields=None):
+def _stat_file(path):
+    """Get the status of the file at `path`, or None if it does not
+    exist.
+    """
+    if not path:
+        return None
+    try:
+        return os.stat(syspath(path))
+    except OSError:
+        return None
+
+
+def _read_item(item):
+    """Read the metadata of `item` from its file. Return the
+    `ReadError` if it could not be read.
+    """
+    try:
+        item.read()
+    except library.ReadError as exc:
+        return exc
+
+
+def update_items(
+    lib,
+    query,
+    album,
+    move,
+    pretend,
+    fields,
+    exclude_fields=None,
+    jobs=None,
+    batch_size=100,
+    incremental=False,
+):
     """For all the items matched by the query, update the library to
     reflect the item's embedded tags.
     :param fields: The fields to be stored. If not specified, all fields will
     be.
     :param exclude_fields: The fields to not be stored. If not specified, all
     fields will be.
+    :param jobs: The number of threads checking and reading the files. If
+    not specified, the number of CPUs.
+    :param batch_size: The number of items whose files are checked and read
+    at once, and whose changes are stored in a transaction.
+    :param incremental: Only check the files in the directories whose
+    listing changed since the last incremental update. The directories
+    are only recorded as seen by an update of the whole library.
     """
-    with lib.transaction():
-        items, _ = _do_query(lib, query, album)
-        if move and fields is not None and "path" not in fields:
-            # Special case: if an item needs to be moved, the path field has to
-            # updated; otherwise the new path will not be reflected in the
-            # database.
-            fields.append("path")
-        if fields is None:
-            # no fields were provided, update all media fields
-            item_fields = fields or library.Item._media_fields
-            if move and "path" not in item_fields:
-                # move is enabled, add 'path' to the list of fields to update
-                item_fields.add("path")
-        else:
-            # fields was provided, just update those
-            item_fields = fields
-        # get all the album fields to update
-        album_fields = fields or library.Album._fields.keys()
-        if exclude_fields:
-            # remove any excluded fields from the item and album sets
-            item_fields = [f for f in item_fields if f not in exclude_fields]
-            album_fields = [f for f in album_fields if f not in exclude_fields]
-
-        # Walk through the items and pick up their changes.
-        affected_albums = set()
-        for item in items:
-            # Item deleted?
-            if not item.path or not os.path.exists(syspath(item.path)):
-                ui.print_(format(item))
-                ui.print_(ui.colorize("text_error", "  deleted"))
-                if not pretend:
-                    item.remove(True)
-                affected_albums.add(item.album_id)
-                continue
+    items, _ = _do_query(lib, query, album)
+    if incremental:
+        # Files in the library directory are added, removed or renamed
+        # only in the directories whose mtime changed.
+        journal = ScanJournal(lib, "update")
+        unchanged_dirs = {
+            root
+            for root, _, _, changed in journal.walk(lib.directory)
+            if not changed
+        }
+        items = (
+            item
+            for item in items
+            if os.path.dirname(item.path) not in unchanged_dirs
+        )
+    if move and fields is not None and "path" not in fields:
+        # Special case: if an item needs to be moved, the path field has to
+        # updated; otherwise the new path will not be reflected in the
+        # database.
+        fields.append("path")
+    if fields is None:
+        # no fields were provided, update all media fields
+        item_fields = fields or library.Item._media_fields
+        if move and "path" not in item_fields:
+            # move is enabled, add 'path' to the list of fields to update
+            item_fields.add("path")
+    else:
+        # fields was provided, just update those
+        item_fields = fields
+    # get all the album fields to update
+    album_fields = fields or library.Album._fields.keys()
+    if exclude_fields:
+        # remove any excluded fields from the item and album sets
+        item_fields = [f for f in item_fields if f not in exclude_fields]
+        album_fields = [f for f in album_fields if f not in exclude_fields]
+
+    # Walk through the items in batches. The files of a batch are checked
+    # and the changed ones read by a pool of threads; their changes are
+    # then picked up in order and stored at once, before their albums are
+    # updated.
+    start = time.perf_counter()
+    scanned = read = 0
+    affected_albums = set()
+    failed_dirs = set()
+    item_iter = iter(items)
+    with ThreadPool(jobs) as pool:
+        while batch := list(islice(item_iter, batch_size)):
+            stats = pool.map(_stat_file, [item.path for item in batch])
+            # Note which items changed before reading them updates their
+            # mtimes.
+            outdated = [
+                stat is not None and int(stat.st_mtime) > item.mtime
+                for item, stat in zip(batch, stats)
+            ]
+            modified = [item for item, o in zip(batch, outdated) if o]
+            errors = iter(pool.map(_read_item, modified))
+            scanned += len(batch)
+            read += len(modified)
+
+            changed_items = []
+            sized_items = []
+            with lib.transaction():
+                for item, stat, stale in zip(batch, stats, outdated):
+                    # Item deleted?
+                    if not stat:
+                        ui.print_(format(item))
+                        ui.print_(ui.colorize("text_error", "  deleted"))
+                        if not pretend:
+                            item.remove(True)
+                        affected_albums.add(item.album_id)
+                        continue
+
+                    # Did the item change since last checked?
+                    if not stale:
+                        log.debug(
+                            "skipping {0} because mtime is up to date ({1})",
+                            displayable_path(item.path),
+                            item.mtime,
+                        )
+                        # Store the size of the file if it was added before
+                        # sizes were stored.
+                        item.filesize = stat.st_size
+                        if "filesize" in item._dirty:
+                            sized_items.append(item)
+                        continue
+
+                    # New data was read.
+                    exc = next(errors)
+                    if exc:
+                        log.error(
+                            "error reading {0}: {1}",
+                            displayable_path(item.path),
+                            exc,
+                        )
+                        failed_dirs.add(os.path.dirname(item.path))
+                        continue
+
+                    # Special-case album artist when it matches track artist.
+                    # (Hacky but necessary for preserving album-level metadata
+                    # for non-autotagged imports.)
+                    if not item.albumartist:
+                        old_item = lib.get_item(item.id)
+                        if (
+                            old_item.albumartist
+                            == old_item.artist
+                            == item.artist
+                        ):
+                            item.albumartist = old_item.albumartist
+                            item._dirty.discard("albumartist")
+
+                    # Check for and display changes.
+                    changed = ui.show_model_changes(item, fields=item_fields)
+                    item_fields = item_fields.union(set(["mtime", "filesize"]))
+
+                    # Save changes.
+                    if not pretend:
+                        if changed:
+                            # Move the item if it's in the library.
+                            if move and lib.directory in ancestry(item.path):
+                                item.move(store=False)
+
+                            affected_albums.add(item.album_id)
+                        # If there were no changes to the metadata, the
+                        # file's mtime was still different. Store the new
+                        # mtime, which is set in the call to read(), so we
+                        # don't check this again in the future.
+                        changed_items.append(item)
 
-            # Did the item change since last checked?
-            if item.current_mtime() <= item.mtime:
-                log.debug(
-                    "skipping {0} because mtime is up to date ({1})",
-                    displayable_path(item.path),
-                    item.mtime,
-                )
-                continue
+                if not pretend:
+                    lib.bulk_store(changed_items, fields=item_fields)
+                    lib.bulk_store(sized_items, fields=["filesize"])
 
-            # Read new data.
-            try:
-                item.read()
-            except library.ReadError as exc:
-                log.error(
-                    "error reading {0}: {1}", displayable_path(item.path), exc
-                )
-                continue
+            log.debug("checked {0} files, read {1}", scanned, read)
 
-            # Special-case album artist when it matches track artist. (Hacky
-            # but necessary for preserving album-level metadata for non-
-            # autotagged imports.)
-            if not item.albumartist:
-                old_item = lib.get_item(item.id)
-                if old_item.albumartist == old_item.artist == item.artist:
-                    item.albumartist = old_item.albumartist
-                    item._dirty.discard("albumartist")
-
-            # Check for and display changes.
-            changed = ui.show_model_changes(item, fields=item_fields)
-            item_fields = item_fields.union(set(["mtime"]))
-
-            # Save changes.
-            if not pretend:
-                if changed:
-                    # Move the item if it's in the library.
-                    if move and lib.directory in ancestry(item.path):
-                        item.move(store=False)
+    elapsed = time.perf_counter() - start
+    log.info(
+        "checked {0} files and read {1} in {2:.1f} seconds "
+        "({3:.0f} files per second)",
+        scanned,
+        read,
+        elapsed,
+        scanned / elapsed if elapsed else 0,
+    )
 
-                    item.store(fields=item_fields)
-                    affected_albums.add(item.album_id)
-                else:
-                    # The file's mtime was different, but there were no
-                    # changes to the metadata. Store the new mtime,
-                    # which is set in the call to read(), so we don't
-                    # check this again in the future.
-                    item.store(fields=item_fields)
+    # Skip album changes while pretending.
+    if pretend:
+        return
 
-        # Skip album changes while pretending.
-        if pretend:
-            return
+    if incremental and not query:
+        # The files that could not be read are checked again next time.
+        for path in failed_dirs:
+            journal.forget(path)
+        journal.save()
 
-        # Modify affected albums to reflect changes in their items.
+    # Modify affected albums to reflect changes in their items.
+    with lib.transaction():
         for album_id in affected_albums:
             if album_id is None:  # Singletons.
                 continue
@@ -1752,6 +1876,9 @@ def update_items(lib, query, album, move, pretend, fields, exclude_fields=None):
 
 
 def update_func(lib, opts, args):
+    if opts.jobs is not None and opts.jobs < 1:
+        raise ui.UserError("the number of jobs must be at least 1")
+
     # Verify that the library folder exists to prevent accidental wipes.
     if not os.path.isdir(syspath(lib.directory)):
         ui.print_("Library path is unavailable or does not exist.")
@@ -1766,6 +1893,8 @@ def update_func(lib, opts, args):
         opts.pretend,
         opts.fields,
         opts.exclude_fields,
+        opts.jobs,
+        incremental=opts.incremental,
     )
 
 
@@ -1815,6 +1944,20 @@ update_cmd.parser.add_option(
     dest="exclude_fields",
     help="list of fields to exclude from updates",
 )
+update_cmd.parser.add_option(
+    "-j",
+    "--jobs",
+    type="int",
+    default=None,
+    help="number of files to check and read at once (default: CPU count)",
+)
+update_cmd.parser.add_option(
+    "-i",
+    "--incremental",
+    action="store_true",
+    help="only check files in directories changed since the last "
+    "incremental update",
+)
 update_cmd.func = update_func
 default_commands.append(update_cmd)
 
@@ -1904,15 +2047,44 @@ default_commands.append(remove_cmd)
 
 def show_stats(lib, query, exact):
     """Shows some statistics about the matched items."""
-    items = lib.items(query)
-
-    total_size = 0
-    total_time = 0.0
-    total_items = 0
-    artists = set()
-    albums = set()
-    album_artists = set()
-
+    stats = lib.aggregate(
+        library.Item,
+        {
+            "items": dbcore.Aggregate("count", "id"),
+            "time": dbcore.Aggregate("sum", "length"),
+            "size": dbcore.Aggregate("sum", "filesize"),
+            "artists": dbcore.Aggregate("count", "artist", distinct=True),
+            "albums": dbcore.Aggregate("count", "album_id", distinct=True),
+            "album_artists": dbcore.Aggregate(
+                "count", "albumartist", distinct=True
+            ),
+        },
+        query,
+    )
+    total_items = stats["items"]
+    total_time = stats["time"]
+    total_size = stats["size"]
+
+    # Items added before the sizes of their files were stored have none:
+    # get the size of their files, or estimate it. They are selected in
+    # SQL, so that the `filesize` getter does not read their sizes.
+    query, _ = library.parse_query_parts(query, library.Item)
+    unsized = dbcore.OrQuery(
+        [
+            dbcore.MatchQuery("filesize", 0),
+            dbcore.query.NoneQuery("filesize"),
+        ]
+    )
+    fields = ("path", "length", "bitrate")
+    if query.clause()[0]:
+        items = lib.items(dbcore.AndQuery([query, unsized]), fields=fields)
+    else:
+        # Only test the unsized items against a slow query.
+        items = (
+            item
+            for item in lib.items(unsized, fields=[*fields, *query.field_names])
+            if query.match(item)
+        )
     for item in items:
         if exact:
             try:
@@ -1921,12 +2093,6 @@ def show_stats(lib, query, exact):
                 log.info("could not get size of {}: {}", item.path, exc)
         else:
             total_size += int(item.length * item.bitrate / 8)
-        total_time += item.length
-        total_items += 1
-        artists.add(item.artist)
-        album_artists.add(item.albumartist)
-        if item.album_id:
-            albums.add(item.album_id)
 
     size_str = "" + ui.human_bytes(total_size)
     if exact:
@@ -1944,9 +2110,9 @@ Album artists: {}""".format(
             f" ({total_time:.2f} seconds)" if exact else "",
             "Total size" if exact else "Approximate total size",
             size_str,
-            len(artists),
-            len(albums),
-            len(album_artists),
+            stats["artists"],
+            stats["albums"],
+            stats["album_artists"],
         ),
     )
 
@@ -1965,6 +2131,98 @@ stats_cmd.func = stats_func
 default_commands.append(stats_cmd)
 
 
+# index: Manage the indices of the library database.
+
+
+def index_func(lib, opts, args):
+    model_cls = library.Album if opts.album else library.Item
+
+    for expression in opts.create or ():
+        try:
+            index = lib.create_index(model_cls, expression)
+        except sqlite3.OperationalError as exc:
+            raise ui.UserError(f"could not create index on {expression}: {exc}")
+        print_(f"Created index {index.name}.")
+
+    for name in opts.drop or ():
+        lib.drop_index(name)
+        print_(f"Dropped index {name}.")
+
+    if opts.explain:
+        if opts.album:
+            sort = lib.get_default_album_sort()
+        else:
+            sort = lib.get_default_item_sort()
+        for detail in lib.explain(model_cls, decargs(args), sort):
+            print_(detail)
+
+    elif not (opts.create or opts.drop):
+        for name, sql in lib.indices(model_cls._table):
+            print_(f"{name}: {sql}")
+
+
+index_cmd = ui.Subcommand(
+    "index", help="list, create or drop indices of the library database"
+)
+index_cmd.parser.add_option(
+    "-c",
+    "--create",
+    action="append",
+    metavar="EXPR",
+    help="create an index on a field or an SQL expression",
+)
+index_cmd.parser.add_option(
+    "-d",
+    "--drop",
+    action="append",
+    metavar="NAME",
+    help="drop the index with the given name",
+)
+index_cmd.parser.add_option(
+    "-e",
+    "--explain",
+    action="store_true",
+    help="show how the database runs a query and which indices it uses",
+)
+index_cmd.parser.add_album_option()
+index_cmd.func = index_func
+default_commands.append(index_cmd)
+
+
+# cache: Inspect or clear the lookup cache of the metadata sources.
+
+
+def cache_func(lib, opts, args):
+    lookups = cache.get_cache()
+    if lookups is None:
+        raise ui.UserError("the lookup cache is disabled")
+    action = args.pop(0) if args else "stats"
+
+    if action == "stats":
+        stats = lookups.stats()
+        for source in stats:
+            print_(
+                f"{source.source}: {source.responses} responses, "
+                f"{ui.human_bytes(source.size)}, {source.expired} expired, "
+                f"{source.hits} hits"
+            )
+        if not stats:
+            print_("The lookup cache is empty.")
+    elif action == "clear":
+        count = sum(lookups.clear(source) for source in args or [None])
+        print_(f"Removed {count} responses.")
+    else:
+        raise ui.UserError(f"unknown cache action: {action}")
+
+
+cache_cmd = ui.Subcommand(
+    "cache", help="show or clear the lookup cache of the metadata sources"
+)
+cache_cmd.parser.usage = "%prog [stats | clear [SOURCE...]]"
+cache_cmd.func = cache_func
+default_commands.append(cache_cmd)
+
+
 # version: Show current beets version.
 
 
@@ -2040,8 +2298,13 @@ def modify_items(lib, mods, dels, query, write, move, album, confirm, inherit):
 
     # Apply changes to database and files
     with lib.transaction():
-        for obj in changed:
-            obj.try_sync(write, move, inherit)
+        if album:
+            for obj in changed:
+                obj.try_sync(write, move, inherit)
+        else:
+            for obj in changed:
+                obj.try_sync(write, move, inherit, store=False)
+            lib.bulk_store(changed)
 
 
 def print_and_modify(obj, mods, dels):
@@ -41,6 +41,13 @@ ESCAPE_CHAR = "$"
 
 VARIABLE_PREFIX = "__var_"
 FUNCTION_PREFIX = "__func_"
+VALUES_NAME = "__values"
+BRANCH_NAME = "__branch"
+
+# Functions whose arguments after the first are branches: when the
+# function is marked with `branching`, compiled templates only evaluate
+# the branch it returns.
+BRANCHING_FUNCTIONS = frozenset(["if"])
 
 
 class Environment:
@@ -53,6 +60,31 @@ class Environment:
         self.functions = functions
 
 
+def branching(func):
+    """Mark a template function as returning one of its arguments after
+    the first, unchanged, or a value of its own. Compiled templates then
+    evaluate the arguments it does not return, and the fields they use,
+    lazily or not at all.
+    """
+    func.branching = True
+    return func
+
+
+def call_branching(func, condition, *branches):
+    """Call the template function `func` with `condition` and the
+    values computed by the functions `branches`, computing only the one
+    that a `branching` function returns.
+    """
+    if not getattr(func, "branching", False):
+        return func(condition, *(branch() for branch in branches))
+
+    # The branches themselves stand in for their values.
+    out = func(condition, *branches)
+    if any(out is branch for branch in branches):
+        return out()
+    return out
+
+
 # Code generation helpers.
 
 
@@ -149,12 +181,24 @@ class Symbol:
             # Keep original text.
             return self.original
 
-    def translate(self):
-        """Compile the variable lookup."""
+    def translate(self, lazy=False):
+        """Compile the variable lookup. If `lazy`, the value is looked up
+        when the expression is evaluated instead of being passed to the
+        compiled function.
+        """
         ident = self.ident
+        if lazy:
+            expr = ast.Subscript(
+                ex_rvalue(VALUES_NAME), ex_literal(ident), ast.Load()
+            )
+            return [expr], set(), set()
         expr = ex_rvalue(VARIABLE_PREFIX + ident)
         return [expr], {ident}, set()
 
+    def names(self):
+        """Get the sets of variable and function names in the symbol."""
+        return {self.ident}, set()
+
 
 class Call:
     """A function call in a template."""
@@ -185,37 +229,68 @@ class Call:
         else:
             return self.original
 
-    def translate(self):
-        """Compile the function call."""
+    def translate(self, lazy=False):
+        """Compile the function call. The branches of a branching
+        function are compiled as functions, whose variables are looked up
+        lazily.
+        """
         varnames = set()
         funcnames = {self.ident}
+        branching = self.ident in BRANCHING_FUNCTIONS and len(self.args) > 1
 
         arg_exprs = []
-        for arg in self.args:
-            subexprs, subvars, subfuncs = arg.translate()
+        for i, arg in enumerate(self.args):
+            is_branch = branching and i > 0
+            subexprs, subvars, subfuncs = arg.translate(lazy or is_branch)
             varnames.update(subvars)
             funcnames.update(subfuncs)
 
             # Create a subexpression that joins the result components of
             # the arguments.
-            arg_exprs.append(
-                ex_call(
-                    ast.Attribute(ex_literal(""), "join", ast.Load()),
-                    [
-                        ex_call(
-                            "map",
-                            [
-                                ex_rvalue(str.__name__),
-                                ast.List(subexprs, ast.Load()),
-                            ],
-                        )
-                    ],
-                )
+            arg_expr = ex_call(
+                ast.Attribute(ex_literal(""), "join", ast.Load()),
+                [
+                    ex_call(
+                        "map",
+                        [
+                            ex_rvalue(str.__name__),
+                            ast.List(subexprs, ast.Load()),
+                        ],
+                    )
+                ],
             )
+            if is_branch:
+                arg_expr = ast.Lambda(
+                    ast.arguments(
+                        posonlyargs=[],
+                        args=[],
+                        kwonlyargs=[],
+                        kw_defaults=[],
+                        defaults=[],
+                    ),
+                    arg_expr,
+                )
+            arg_exprs.append(arg_expr)
 
-        subexpr_call = ex_call(FUNCTION_PREFIX + self.ident, arg_exprs)
+        func = ex_rvalue(FUNCTION_PREFIX + self.ident)
+        if branching:
+            subexpr_call = ex_call(BRANCH_NAME, [func, *arg_exprs])
+        else:
+            subexpr_call = ex_call(func, arg_exprs)
         return [subexpr_call], varnames, funcnames
 
+    def names(self):
+        """Get the sets of variable and function names used in the call,
+        including those in its arguments.
+        """
+        varnames = set()
+        funcnames = {self.ident}
+        for arg in self.args:
+            subvars, subfuncs = arg.names()
+            varnames.update(subvars)
+            funcnames.update(subfuncs)
+        return varnames, funcnames
+
 
 class Expression:
     """Top-level template construct: contains a list of text blobs,
@@ -240,9 +315,12 @@ class Expression:
                 out.append(part.evaluate(env))
         return "".join(map(str, out))
 
-    def translate(self):
+    def translate(self, lazy=False):
         """Compile the expression to a list of Python AST expressions, a
         set of variable names used, and a set of function names.
+
+        If `lazy`, variables are looked up as the expressions are
+        evaluated, and are not included in the set of names.
         """
         expressions = []
         varnames = set()
@@ -251,12 +329,25 @@ class Expression:
             if isinstance(part, str):
                 expressions.append(ex_literal(part))
             else:
-                e, v, f = part.translate()
+                e, v, f = part.translate(lazy)
                 expressions.extend(e)
                 varnames.update(v)
                 funcnames.update(f)
         return expressions, varnames, funcnames
 
+    def names(self):
+        """Get the sets of all variable and function names referenced by
+        the expression, including those only used in branches.
+        """
+        varnames = set()
+        funcnames = set()
+        for part in self.parts:
+            if not isinstance(part, str):
+                v, f = part.names()
+                varnames.update(v)
+                funcnames.update(f)
+        return varnames, funcnames
+
 
 # Parser.
 
@@ -538,6 +629,7 @@ class Template:
     def __init__(self, template):
         self.expr = _parse(template)
         self.original = template
+        self.varnames, self.funcnames = self.expr.names()
         self.compiled = self.translate()
 
     def __eq__(self, other):
@@ -560,11 +652,41 @@ class Template:
 
         return res
 
+    def substitute_many(self, rows, functions={}):
+        """Evaluate the template for each mapping of values in `rows`,
+        generating the strings in order. The same `functions` are used
+        for every row, so the arguments of the compiled function are
+        only looked up once per row for the variables.
+        """
+        func, varnames, funcnames = self._compiled_parts
+        try:
+            func_args = {
+                FUNCTION_PREFIX + funcname: functions[funcname]
+                for funcname in funcnames
+            }
+        except KeyError:
+            # Missing functions are left in place by the interpreter.
+            for values in rows:
+                yield self.interpret(values, functions)
+            return
+
+        func_args[BRANCH_NAME] = call_branching
+        for values in rows:
+            args = dict(func_args)
+            args[VALUES_NAME] = values
+            try:
+                for varname in varnames:
+                    args[VARIABLE_PREFIX + varname] = values[varname]
+                res = "".join(func(**args))
+            except Exception:
+                res = self.interpret(values, functions)
+            yield res
+
     def translate(self):
         """Compile the template to a Python function."""
         expressions, varnames, funcnames = self.expr.translate()
 
-        argnames = []
+        argnames = [VALUES_NAME, BRANCH_NAME]
         for varname in varnames:
             argnames.append(VARIABLE_PREFIX + varname)
         for funcname in funcnames:
@@ -574,9 +696,12 @@ class Template:
             argnames,
             [ast.Return(ast.List(expressions, ast.Load()))],
         )
+        self._compiled_parts = func, varnames, funcnames
 
         def wrapper_func(values={}, functions={}):
-            args = {}
+            # Variables used only in branches are looked up in `values`
+            # if the branch is taken.
+            args = {VALUES_NAME: values, BRANCH_NAME: call_branching}
             for varname in varnames:
                 args[VARIABLE_PREFIX + varname] = values[varname]
             for funcname in funcnames:
@@ -28,15 +28,19 @@ When running a parallel pipeline, it is also possible to use
 multiple coroutines for the same pipeline stage; this lets you speed
 up a bottleneck stage by dividing its work among multiple threads.
 To do so, pass an iterable of coroutines to the Pipeline constructor
-in place of any single coroutine.
+in place of any single coroutine. The messages then leave the stage in
+the order its threads finish them, unless the coroutines are wrapped in
+an OrderedStage, which keeps the order in which they arrived.
 """
 
 from __future__ import annotations
 
+import functools
 import queue
 import sys
-from threading import Lock, Thread
-from typing import Callable, Generator, TypeVar
+import time
+from threading import Condition, Lock, Thread
+from typing import Callable, Generator, NamedTuple, TypeVar
 
 if sys.version_info >= (3, 11):
     from typing import TypeVarTuple, Unpack
@@ -186,6 +190,7 @@ def stage(
     [3, 4, 5]
     """
 
+    @functools.wraps(func)
     def coro(*args: Unpack[A]) -> Generator[R | T | None, T, None]:
         task: R | T | None = None
         while True:
@@ -210,6 +215,7 @@ def mutator_stage(func: Callable[[Unpack[A], T], R]):
     [{'x': True}, {'a': False, 'x': True}]
     """
 
+    @functools.wraps(func)
     def coro(*args: Unpack[A]) -> Generator[T | None, T, None]:
         task = None
         while True:
@@ -232,6 +238,69 @@ def _allmsgs(obj):
         return [obj]
 
 
+class OrderedStage(tuple):
+    """Several coroutines running the same stage in parallel threads,
+    whose messages are passed on to the next stage in the order they
+    were received, as if the stage ran in a single thread.
+
+    The last stage of a pipeline has no messages to pass on, so its
+    threads are not ordered.
+    """
+
+
+class _Sequencer:
+    """Numbers the messages received by the threads of an ordered stage
+    and lets the threads send on the messages they yield in turn.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.turn_changed = Condition()
+        self.next_ticket = 0
+        self.turn = 0
+
+    def get(self, in_queue):
+        """Get a message from `in_queue` with its ticket, which is None
+        for POISON.
+        """
+        with self.lock:
+            msg = in_queue.get()
+            if msg is POISON:
+                return msg, None
+            ticket = self.next_ticket
+            self.next_ticket += 1
+            return msg, ticket
+
+    def wait(self, ticket, thread):
+        """Block until it is the turn of `ticket`. Return False if
+        `thread` is aborted in the meantime.
+        """
+        with self.turn_changed:
+            while self.turn != ticket:
+                if thread.abort_flag:
+                    return False
+                # Time out to notice aborts.
+                self.turn_changed.wait(0.1)
+        return True
+
+    def done(self):
+        """Pass the turn on to the next ticket."""
+        with self.turn_changed:
+            self.turn += 1
+            self.turn_changed.notify_all()
+
+
+class StageStats(NamedTuple):
+    """The work done by the threads of a pipeline stage: the number of
+    messages they handled (or produced, for the first stage) and the
+    seconds they spent in the stage's coroutines.
+    """
+
+    name: str
+    messages: int
+    seconds: float
+
+
 class PipelineThread(Thread):
     """Abstract base class for pipeline-stage threads."""
 
@@ -241,6 +310,8 @@ class PipelineThread(Thread):
         self.abort_flag = False
         self.all_threads = all_threads
         self.exc_info = None
+        self.messages = 0
+        self.busy = 0.0
 
     def abort(self):
         """Shut down the thread at the next chance possible."""
@@ -279,16 +350,20 @@ class FirstPipelineThread(PipelineThread):
                         return
 
                 # Get the value from the generator.
+                start = time.perf_counter()
                 try:
                     msg = next(self.coro)
                 except StopIteration:
                     break
+                finally:
+                    self.busy += time.perf_counter() - start
 
                 # Send messages to the next stage.
                 for msg in _allmsgs(msg):
                     with self.abort_lock:
                         if self.abort_flag:
                             return
+                    self.messages += 1
                     self.out_queue.put(msg)
 
         except BaseException:
@@ -304,12 +379,13 @@ class MiddlePipelineThread(PipelineThread):
     last.
     """
 
-    def __init__(self, coro, in_queue, out_queue, all_threads):
+    def __init__(self, coro, in_queue, out_queue, all_threads, sequencer=None):
         super().__init__(all_threads)
         self.coro = coro
         self.in_queue = in_queue
         self.out_queue = out_queue
         self.out_queue.acquire()
+        self.sequencer = sequencer
 
     def run(self):
         try:
@@ -322,7 +398,10 @@ class MiddlePipelineThread(PipelineThread):
                         return
 
                 # Get the message from the previous stage.
-                msg = self.in_queue.get()
+                if self.sequencer:
+                    msg, ticket = self.sequencer.get(self.in_queue)
+                else:
+                    msg = self.in_queue.get()
                 if msg is POISON:
                     break
 
@@ -331,7 +410,14 @@ class MiddlePipelineThread(PipelineThread):
                         return
 
                 # Invoke the current stage.
+                start = time.perf_counter()
                 out = self.coro.send(msg)
+                self.busy += time.perf_counter() - start
+                self.messages += 1
+
+                # Wait for the earlier messages of an ordered stage.
+                if self.sequencer and not self.sequencer.wait(ticket, self):
+                    return
 
                 # Send messages to next stage.
                 for msg in _allmsgs(out):
@@ -340,6 +426,9 @@ class MiddlePipelineThread(PipelineThread):
                             return
                     self.out_queue.put(msg)
 
+                if self.sequencer:
+                    self.sequencer.done()
+
         except BaseException:
             self.abort_all(sys.exc_info())
             return
@@ -378,7 +467,10 @@ class LastPipelineThread(PipelineThread):
                         return
 
                 # Send to consumer.
+                start = time.perf_counter()
                 self.coro.send(msg)
+                self.busy += time.perf_counter() - start
+                self.messages += 1
 
         except BaseException:
             self.abort_all(sys.exc_info())
@@ -397,6 +489,7 @@ class Pipeline:
         """
         if len(stages) < 2:
             raise ValueError("pipeline must have at least two stages")
+        self.stats: list[StageStats] = []
         self.stages = []
         for stage in stages:
             if isinstance(stage, (list, tuple)):
@@ -415,7 +508,7 @@ class Pipeline:
     def run_parallel(self, queue_size=DEFAULT_QUEUE_SIZE):
         """Run the pipeline in parallel using one thread per stage. The
         messages between the stages are stored in queues of the given
-        size.
+        size. The work done by each stage is then found in `stats`.
         """
         queue_count = len(self.stages) - 1
         queues = [CountedQueue(queue_size) for i in range(queue_count)]
@@ -427,10 +520,13 @@ class Pipeline:
 
         # Middle stages.
         for i in range(1, queue_count):
+            sequencer = None
+            if isinstance(self.stages[i], OrderedStage):
+                sequencer = _Sequencer()
             for coro in self.stages[i]:
                 threads.append(
                     MiddlePipelineThread(
-                        coro, queues[i - 1], queues[i], threads
+                        coro, queues[i - 1], queues[i], threads, sequencer
                     )
                 )
 
@@ -441,6 +537,10 @@ class Pipeline:
         # Start threads.
         for thread in threads:
             thread.start()
+        stage_threads = []
+        remaining = iter(threads)
+        for stage in self.stages:
+            stage_threads.append([next(remaining) for _ in stage])
 
         # Wait for termination. The final thread lasts the longest.
         try:
@@ -462,6 +562,15 @@ class Pipeline:
             for thread in threads[:-1]:
                 thread.join()
 
+            self.stats = [
+                StageStats(
+                    getattr(stage[0], "__name__", type(stage[0]).__name__),
+                    sum(worker.messages for worker in workers),
+                    sum(worker.busy for worker in workers),
+                )
+                for stage, workers in zip(self.stages, stage_threads)
+            ]
+
         for thread in threads:
             exc_info = thread.exc_info
             if exc_info:
@@ -48,8 +48,10 @@ def libtree(lib):
     child node tuples.
     """
     root = Node({}, {})
-    for item in lib.items():
-        dest = item.destination(fragment=True)
+    router = lib.path_router()
+    items = lib.items(fields=router.fields, with_albums=True)
+    dests = router.destinations(items, fragment=True)
+    for item, dest in zip(items, dests):
         parts = util.components(dest)
         _insert(root, parts, item.id)
     return root
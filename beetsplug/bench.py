@@ -17,6 +17,7 @@
 import cProfile
 import timeit
 
+import beets
 from beets import importer, library, plugins, ui, vfs
 from beets.autotag import match
 from beets.plugins import BeetsPlugin
@@ -93,6 +94,60 @@ def match_benchmark(lib, prof, query=None, album_id=None):
         print("match duration:", interval)
 
 
+def regexp_benchmark(lib, prof, query, extension=None, number=10):
+    # Time a query in which every row goes through the `regexp` SQL
+    # function, first with the built-in implementation, then with a
+    # native one loaded from an SQLite extension if one is given.
+    if not query:
+        query = ["title::^.*[aeiou]{2}"]
+
+    def _run_query():
+        for _ in range(number):
+            list(lib.items(query))
+
+    def _measure(name):
+        if prof:
+            cProfile.runctx(
+                "_run_query()",
+                {},
+                {"_run_query": _run_query},
+                f"regexp.{name}.prof",
+            )
+        else:
+            interval = timeit.timeit(_run_query, number=1)
+            print(f"regexp ({name}):", interval / number)
+
+    _measure("python")
+    if extension:
+        lib.load_extension(extension)
+        _measure("native")
+
+
+def template_benchmark(lib, prof, query, fmt=None, number=1):
+    # Format every matching item like `beet list -f` does, without
+    # printing the result.
+    fmt = fmt or beets.config["format_item"].as_str()
+    items = list(lib.items(query, with_albums=True))
+
+    def _format_items():
+        for _ in range(number):
+            for item in items:
+                format(item, fmt)
+
+    if prof:
+        cProfile.runctx(
+            "_format_items()",
+            {},
+            {"_format_items": _format_items},
+            "template.prof",
+        )
+    else:
+        interval = timeit.timeit(_format_items, number=1)
+        count = len(items) * number
+        print("templates:", count)
+        print("templates/sec:", count / interval if interval else 0)
+
+
 class BenchmarkPlugin(BeetsPlugin):
     """A plugin for performing some simple performance benchmarks."""
 
@@ -128,4 +183,63 @@ class BenchmarkPlugin(BeetsPlugin):
             lib, opts.profile, ui.decargs(args), opts.id
         )
 
-        return [aunique_bench_cmd, match_bench_cmd]
+        regexp_bench_cmd = ui.Subcommand(
+            "bench_regexp", help="benchmark for regular expression queries"
+        )
+        regexp_bench_cmd.parser.add_option(
+            "-p",
+            "--profile",
+            action="store_true",
+            default=False,
+            help="performance profiling",
+        )
+        regexp_bench_cmd.parser.add_option(
+            "-e",
+            "--extension",
+            default=None,
+            help="SQLite extension providing a native regexp function",
+        )
+        regexp_bench_cmd.parser.add_option(
+            "-n",
+            "--number",
+            type="int",
+            default=10,
+            help="number of times to run the query",
+        )
+        regexp_bench_cmd.func = lambda lib, opts, args: regexp_benchmark(
+            lib, opts.profile, ui.decargs(args), opts.extension, opts.number
+        )
+
+        template_bench_cmd = ui.Subcommand(
+            "bench_template", help="benchmark for template formatting"
+        )
+        template_bench_cmd.parser.add_option(
+            "-p",
+            "--profile",
+            action="store_true",
+            default=False,
+            help="performance profiling",
+        )
+        template_bench_cmd.parser.add_option(
+            "-f",
+            "--format",
+            default=None,
+            help="template to format items with (default: format_item)",
+        )
+        template_bench_cmd.parser.add_option(
+            "-n",
+            "--number",
+            type="int",
+            default=1,
+            help="number of times to format each item",
+        )
+        template_bench_cmd.func = lambda lib, opts, args: template_benchmark(
+            lib, opts.profile, ui.decargs(args), opts.format, opts.number
+        )
+
+        return [
+            aunique_bench_cmd,
+            match_bench_cmd,
+            regexp_bench_cmd,
+            template_bench_cmd,
+        ]
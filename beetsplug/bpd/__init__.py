@@ -1485,7 +1485,8 @@ class Server(BaseServer):
         songs = 0
         playtime = 0.0
         for item in self.lib.items(
-            Item.field_query(key, value, dbcore.query.MatchQuery)
+            Item.field_query(key, value, dbcore.query.MatchQuery),
+            fields=("length",),
         ):
             songs += 1
             playtime += item.length
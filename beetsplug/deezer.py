@@ -16,6 +16,7 @@
 
 import collections
 import time
+from urllib.parse import urlencode
 
 import requests
 import unidecode
@@ -75,6 +76,12 @@ class DeezerPlugin(MetadataSourcePlugin, BeetsPlugin):
             return None
         return data
 
+    def _get(self, url):
+        """Fetch the metadata at `url`, or reuse the response to an
+        earlier request from the lookup cache.
+        """
+        return self._cached(url, lambda: self.fetch_data(url))
+
     def album_for_id(self, album_id):
         """Fetch an album by its Deezer ID or URL and return an
         AlbumInfo object or None if the album is not found.
@@ -87,7 +94,7 @@ class DeezerPlugin(MetadataSourcePlugin, BeetsPlugin):
         deezer_id = self._get_id("album", album_id, self.id_regex)
         if deezer_id is None:
             return None
-        album_data = self.fetch_data(self.album_url + deezer_id)
+        album_data = self._get(self.album_url + deezer_id)
         if album_data is None:
             return None
         contributors = album_data.get("contributors")
@@ -114,7 +121,7 @@ class DeezerPlugin(MetadataSourcePlugin, BeetsPlugin):
                 f"Invalid `release_date` returned by {self.data_source} API: "
                 f"{release_date!r}"
             )
-        tracks_obj = self.fetch_data(self.album_url + deezer_id + "/tracks")
+        tracks_obj = self._get(self.album_url + deezer_id + "/tracks")
         if tracks_obj is None:
             return None
         try:
@@ -125,10 +132,9 @@ class DeezerPlugin(MetadataSourcePlugin, BeetsPlugin):
         if not tracks_data:
             return None
         while "next" in tracks_obj:
-            tracks_obj = requests.get(
-                tracks_obj["next"],
-                timeout=10,
-            ).json()
+            tracks_obj = self._get(tracks_obj["next"])
+            if tracks_obj is None:
+                return None
             tracks_data.extend(tracks_obj["data"])
 
         tracks = []
@@ -207,7 +213,7 @@ class DeezerPlugin(MetadataSourcePlugin, BeetsPlugin):
             deezer_id = self._get_id("track", track_id, self.id_regex)
             if deezer_id is None:
                 return None
-            track_data = self.fetch_data(self.track_url + deezer_id)
+            track_data = self._get(self.track_url + deezer_id)
             if track_data is None:
                 return None
         track = self._get_track(track_data)
@@ -215,7 +221,7 @@ class DeezerPlugin(MetadataSourcePlugin, BeetsPlugin):
         # Get album's tracks to set `track.index` (position on the entire
         # release) and `track.medium_total` (total number of tracks on
         # the track's disc).
-        album_tracks_obj = self.fetch_data(
+        album_tracks_obj = self._get(
             self.album_url + str(track_data["album"]["id"]) + "/tracks"
         )
         if album_tracks_obj is None:
@@ -278,21 +284,12 @@ class DeezerPlugin(MetadataSourcePlugin, BeetsPlugin):
         if not query:
             return None
         self._log.debug(f"Searching {self.data_source} for '{query}'")
-        try:
-            response = requests.get(
-                self.search_url + query_type,
-                params={"q": query},
-                timeout=10,
-            )
-            response.raise_for_status()
-        except requests.exceptions.RequestException as e:
-            self._log.error(
-                "Error fetching data from {} API\n Error: {}",
-                self.data_source,
-                e,
-            )
+        data = self._get(
+            self.search_url + query_type + "?" + urlencode({"q": query})
+        )
+        if data is None:
             return None
-        response_data = response.json().get("data", [])
+        response_data = data.get("data", [])
         self._log.debug(
             "Found {} result(s) from {} for '{}'",
             len(response_data),
@@ -70,7 +70,12 @@ def tag_data_emitter(path):
 
 
 def library_data(lib, args, album=False):
-    for item in lib.albums(args) if album else lib.items(args):
+    objs = (
+        lib.albums(args, stream=True)
+        if album
+        else lib.items(args, stream=True, with_albums=True)
+    )
+    for item in objs:
         yield library_data_emitter(item)
 
 
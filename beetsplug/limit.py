@@ -38,11 +38,13 @@ def lslimit(lib, opts, args):
 
     query = decargs(args)
     if opts.album:
-        objs = lib.albums(query)
+        objs = lib.albums(query, limit=opts.head, stream=True)
     else:
-        objs = lib.items(query)
+        objs = lib.items(query, limit=opts.head, stream=True)
 
     if opts.head is not None:
+        # The limit is also passed to the query so that slow sorts only
+        # keep the first objects, but a limit of zero means no limit.
         objs = islice(objs, opts.head)
     elif opts.tail is not None:
         objs = deque(objs, opts.tail)
@@ -0,0 +1,450 @@
+# This file is part of beets.
+# Copyright 2016, Adrian Sampson.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+"""Match albums and tracks against a local index of MusicBrainz
+releases, built from a MusicBrainz JSON dump or from the lookup cache,
+instead of the MusicBrainz web service.
+"""
+
+import bz2
+import gzip
+import json
+import lzma
+import os
+import sqlite3
+from contextlib import closing
+
+from beets import config, ui
+from beets.autotag import cache, mb
+from beets.plugins import BeetsPlugin
+from beets.util import displayable_path, syspath
+
+# Releases added to the index in a single transaction.
+BATCH_SIZE = 1000
+
+
+def _compact(data):
+    """Drop the keys whose value is None or empty, which the
+    MusicBrainz web service leaves out of its XML responses.
+    """
+    return {k: v for k, v in data.items() if v not in (None, "", [], {})}
+
+
+def _artist_credit(credit):
+    """Translate a JSON artist credit into the list of credits and join
+    phrases that `musicbrainzngs` returns.
+    """
+    out = []
+    for part in credit or ():
+        artist = dict(part["artist"])
+        if artist.get("aliases"):
+            artist["alias-list"] = [
+                _compact(
+                    {
+                        "alias": alias.get("name"),
+                        "sort-name": alias.get("sort-name"),
+                        "locale": alias.get("locale"),
+                        "type": alias.get("type"),
+                        "primary": "primary" if alias.get("primary") else None,
+                    }
+                )
+                for alias in artist["aliases"]
+            ]
+        out.append(_compact({"artist": artist, "name": part.get("name")}))
+        if part.get("joinphrase"):
+            out.append(part["joinphrase"])
+    return out
+
+
+def _recording(recording):
+    return _compact(
+        {
+            "id": recording["id"],
+            "title": recording.get("title"),
+            "length": recording.get("length"),
+            "disambiguation": recording.get("disambiguation"),
+            "video": "true" if recording.get("video") else None,
+            "isrc-list": recording.get("isrcs"),
+            "artist-credit": _artist_credit(recording.get("artist-credit")),
+        }
+    )
+
+
+def _track(track):
+    return _compact(
+        {
+            "id": track["id"],
+            "number": track.get("number"),
+            "position": track.get("position"),
+            "title": track.get("title"),
+            "length": track.get("length"),
+            "artist-credit": _artist_credit(track.get("artist-credit")),
+            "recording": _recording(track["recording"]),
+        }
+    )
+
+
+def release_from_json(release):
+    """Translate a release of the MusicBrainz JSON dumps (the format of
+    the JSON web service) into the shape of the releases returned by
+    `musicbrainzngs`, which `mb.album_info` reads.
+    """
+    if "medium-list" in release:
+        # Already in the shape of `musicbrainzngs`, as in the cache.
+        return release
+
+    group = release.get("release-group") or {}
+    converted = _compact(
+        {
+            "id": release["id"],
+            "title": release.get("title"),
+            "status": release.get("status"),
+            "date": release.get("date"),
+            "country": release.get("country"),
+            "barcode": release.get("barcode"),
+            "asin": release.get("asin"),
+            "disambiguation": release.get("disambiguation"),
+            "text-representation": _compact(
+                release.get("text-representation") or {}
+            ),
+            "release-group": _compact(
+                {
+                    "id": group.get("id"),
+                    "title": group.get("title"),
+                    "type": group.get("primary-type"),
+                    "primary-type": group.get("primary-type"),
+                    "secondary-type-list": group.get("secondary-types"),
+                    "first-release-date": group.get("first-release-date"),
+                    "disambiguation": group.get("disambiguation"),
+                    "tag-list": group.get("tags"),
+                }
+            ),
+            "release-event-list": [
+                _compact(
+                    {
+                        "date": event.get("date"),
+                        "area": {
+                            "iso-3166-1-code-list": (
+                                event.get("area") or {}
+                            ).get("iso-3166-1-codes", [])
+                        },
+                    }
+                )
+                for event in release.get("release-events") or ()
+            ],
+            "label-info-list": [
+                _compact(
+                    {
+                        "catalog-number": info.get("catalog-number"),
+                        "label": info.get("label"),
+                    }
+                )
+                for info in release.get("label-info") or ()
+            ],
+            "url-relation-list": [
+                {"type": rel.get("type"), "target": rel["url"]["resource"]}
+                for rel in release.get("relations") or ()
+                if rel.get("target-type") == "url" and rel.get("url")
+            ],
+            "tag-list": release.get("tags"),
+        }
+    )
+    # `mb.album_info` expects these even when they are empty.
+    converted["artist-credit"] = _artist_credit(release.get("artist-credit"))
+    converted["medium-list"] = [
+        _medium(medium) for medium in release.get("media") or ()
+    ]
+    return converted
+
+
+def _medium(medium):
+    converted = _compact(
+        {
+            "position": medium.get("position"),
+            "format": medium.get("format"),
+            "title": medium.get("title"),
+            "data-track-list": [
+                _track(t) for t in medium.get("data-tracks") or ()
+            ],
+            "pregap": _track(medium["pregap"])
+            if medium.get("pregap")
+            else None,
+        }
+    )
+    converted["track-list"] = [_track(t) for t in medium.get("tracks") or ()]
+    return converted
+
+
+def _fts_query(terms, any_term=False):
+    """Build an FTS5 query matching the words of each of the `terms`, a
+    dict from column names to strings, as quoted strings.
+    """
+    parts = []
+    for column, text in terms.items():
+        for word in (text or "").split():
+            word = word.replace('"', '""')
+            parts.append(f'{column} : "{word}"')
+    return (" OR " if any_term else " AND ").join(parts)
+
+
+class ReleaseIndex:
+    """An SQLite database of MusicBrainz releases and their recordings,
+    with full-text indices of their artists, titles and track titles.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as conn, conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS releases (
+                    id INTEGER PRIMARY KEY,
+                    mbid TEXT UNIQUE,
+                    data TEXT);
+                CREATE TABLE IF NOT EXISTS recordings (
+                    id INTEGER PRIMARY KEY,
+                    mbid TEXT UNIQUE,
+                    data TEXT);
+                CREATE VIRTUAL TABLE IF NOT EXISTS release_search USING fts5(
+                    artist, title,
+                    tokenize="unicode61 remove_diacritics 2");
+                CREATE VIRTUAL TABLE IF NOT EXISTS recording_search USING fts5(
+                    artist, title,
+                    tokenize="unicode61 remove_diacritics 2");
+                """
+            )
+
+    def _connect(self):
+        return closing(
+            sqlite3.connect(self.path, timeout=config["timeout"].as_number())
+        )
+
+    def _store(self, conn, kind, mbid, data, search):
+        """Insert or replace a release or recording and its full-text
+        index entry.
+        """
+        row = conn.execute(
+            f"SELECT id FROM {kind}s WHERE mbid=?", (mbid,)
+        ).fetchone()
+        if row:
+            rowid = row[0]
+            conn.execute(
+                f"UPDATE {kind}s SET data=? WHERE id=?",
+                (json.dumps(data), rowid),
+            )
+            conn.execute(f"DELETE FROM {kind}_search WHERE rowid=?", (rowid,))
+        else:
+            rowid = conn.execute(
+                f"INSERT INTO {kind}s (mbid, data) VALUES (?, ?)",
+                (mbid, json.dumps(data)),
+            ).lastrowid
+        conn.execute(
+            f"INSERT INTO {kind}_search (rowid, artist, title) "
+            "VALUES (?, ?, ?)",
+            (rowid, *search),
+        )
+
+    def add(self, releases):
+        """Add the releases, in the shape returned by `musicbrainzngs`,
+        to the index and return their number.
+        """
+        count = 0
+        with self._connect() as conn:
+            for release in releases:
+                artist = mb._flatten_artist_credit(release["artist-credit"])[0]
+                self._store(
+                    conn,
+                    "release",
+                    release["id"],
+                    release,
+                    (artist, release["title"]),
+                )
+                for medium in release["medium-list"]:
+                    for track in medium["track-list"]:
+                        recording = track["recording"]
+                        credit = recording.get("artist-credit")
+                        self._store(
+                            conn,
+                            "recording",
+                            recording["id"],
+                            recording,
+                            (
+                                mb._flatten_artist_credit(credit)[0]
+                                if credit
+                                else artist,
+                                recording.get("title", track.get("title")),
+                            ),
+                        )
+                count += 1
+                if count % BATCH_SIZE == 0:
+                    conn.commit()
+            conn.commit()
+        return count
+
+    def release(self, mbid):
+        return self._get("release", mbid)
+
+    def recording(self, mbid):
+        return self._get("recording", mbid)
+
+    def _get(self, kind, mbid):
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT data FROM {kind}s WHERE mbid=?", (mbid,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def search(self, kind, terms, limit):
+        """Return the best matches of `kind` (``release`` or
+        ``recording``) for the `terms`, a dict from the columns of its
+        full-text index to strings. Matches of all the words come first,
+        or else matches of any of them.
+        """
+        with self._connect() as conn:
+            for any_term in (False, True):
+                query = _fts_query(terms, any_term)
+                if not query:
+                    return []
+                rows = conn.execute(
+                    f"SELECT {kind}s.data FROM {kind}_search "
+                    f"JOIN {kind}s ON {kind}s.id = {kind}_search.rowid "
+                    f"WHERE {kind}_search MATCH ? ORDER BY rank LIMIT ?",
+                    (query, limit),
+                ).fetchall()
+                if rows:
+                    return [json.loads(row[0]) for row in rows]
+        return []
+
+
+def read_dump(path):
+    """Yield the releases of a JSON dump file holding one release per
+    line, possibly compressed with gzip, bzip2 or xz.
+    """
+    opener = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}.get(
+        os.path.splitext(path)[1].lower(), open
+    )
+    with opener(syspath(path), "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                release = json.loads(line)
+                yield release_from_json(release.get("release", release))
+
+
+def cached_releases():
+    """Yield the MusicBrainz releases held by the lookup cache.
+
+    The release lookup does not describe the recordings of releases with
+    many tracks fully, so they are replaced by the recordings browsed
+    for the release, if the cache holds them.
+    """
+    lookups = cache.get_cache()
+    if lookups is None:
+        return
+
+    browsed = {}
+    for key, response in lookups.responses("musicbrainz"):
+        name, _, kwargs = json.loads(key)
+        if name == "browse_recordings" and "release" in kwargs:
+            for recording in response["recording-list"]:
+                browsed[recording["id"]] = recording
+
+    for key, response in lookups.responses("musicbrainz"):
+        if json.loads(key)[0] == "get_release_by_id":
+            release = response["release"]
+            for medium in release["medium-list"]:
+                for track in medium["track-list"]:
+                    recording_id = track["recording"]["id"]
+                    if recording_id in browsed:
+                        track["recording"] = browsed[recording_id]
+            yield release
+
+
+class MBIndexPlugin(BeetsPlugin):
+    def __init__(self):
+        super().__init__()
+        self.config.add({"path": "mbindex.db", "searchlimit": 5})
+        self._index = None
+
+    @property
+    def index(self):
+        path = self.config["path"].as_filename()
+        if self._index is None or self._index.path != path:
+            self._index = ReleaseIndex(path)
+        return self._index
+
+    def commands(self):
+        cmd = ui.Subcommand(
+            "mbindex", help="add MusicBrainz releases to the offline index"
+        )
+        cmd.parser.usage += " [DUMP...]"
+        cmd.parser.add_option(
+            "-c",
+            "--cache",
+            action="store_true",
+            help="add the releases of the lookup cache",
+        )
+        cmd.func = self.command
+        return [cmd]
+
+    def command(self, lib, opts, args):
+        if not (args or opts.cache):
+            raise ui.UserError("no dump files given")
+        if opts.cache:
+            count = self.index.add(cached_releases())
+            self._log.info("added {0} releases from the lookup cache", count)
+        for path in args:
+            try:
+                count = self.index.add(read_dump(path))
+            except (OSError, ValueError, KeyError) as exc:
+                raise ui.UserError(
+                    f"cannot read {displayable_path(path)}: {exc}"
+                )
+            self._log.info(
+                "added {0} releases from {1}", count, displayable_path(path)
+            )
+
+    def candidates(self, items, artist, album, va_likely, extra_tags=None):
+        limit = self.config["searchlimit"].get(int)
+        releases = []
+
+        # Albums tagged by MusicBrainz keep their release.
+        albumids = {item.mb_albumid for item in items}
+        if len(albumids) == 1 and (mbid := albumids.pop()):
+            if release := self.index.release(mbid):
+                releases.append(release)
+
+        terms = {"title": album}
+        if not va_likely:
+            terms["artist"] = artist
+        releases.extend(self.index.search("release", terms, limit))
+        return [mb.album_info(release, browse=False) for release in releases]
+
+    def item_candidates(self, item, artist, title):
+        limit = self.config["searchlimit"].get(int)
+        recordings = self.index.search(
+            "recording", {"artist": artist, "title": title}, limit
+        )
+        return [mb.track_info(recording) for recording in recordings]
+
+    def album_for_id(self, album_id):
+        mbid = mb._parse_id(album_id)
+        if mbid and (release := self.index.release(mbid)):
+            return mb.album_info(release, browse=False)
+        return None
+
+    def track_for_id(self, track_id):
+        mbid = mb._parse_id(track_id)
+        if mbid and (recording := self.index.recording(mbid)):
+            return mb.track_info(recording)
+        return None
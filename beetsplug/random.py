@@ -23,10 +23,11 @@ def random_func(lib, opts, args):
     """Select some random items or albums and print the results."""
     # Fetch all the objects matching the query into a list.
     query = decargs(args)
+    # Only the fields used to pick the objects are read up front.
     if opts.album:
-        objs = list(lib.albums(query))
+        objs = list(lib.albums(query, fields=("albumartist",)))
     else:
-        objs = list(lib.items(query))
+        objs = list(lib.items(query, fields=("albumartist", "length")))
 
     # Print a random subset.
     objs = random_objs(
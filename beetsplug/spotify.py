@@ -23,6 +23,7 @@ import json
 import re
 import time
 import webbrowser
+from urllib.parse import urlencode
 
 import confuse
 import requests
@@ -233,6 +234,15 @@ class SpotifyPlugin(MetadataSourcePlugin, BeetsPlugin):
                 self._log.error(f"Request failed. Error: {e}")
                 raise SpotifyAPIError("Request failed.")
 
+    def _get(self, url, params=None):
+        """Send a GET request for metadata, or reuse the response to an
+        earlier one from the lookup cache.
+        """
+        key = url + ("?" + urlencode(params) if params else "")
+        return self._cached(
+            key, lambda: self._handle_response(requests.get, url, params)
+        )
+
     def album_for_id(self, album_id):
         """Fetch an album by its Spotify ID or URL and return an
         AlbumInfo object or None if the album is not found.
@@ -246,9 +256,7 @@ class SpotifyPlugin(MetadataSourcePlugin, BeetsPlugin):
         if spotify_id is None:
             return None
 
-        album_data = self._handle_response(
-            requests.get, self.album_url + spotify_id
-        )
+        album_data = self._get(self.album_url + spotify_id)
         if album_data["name"] == "":
             self._log.debug("Album removed from Spotify: {}", album_id)
             return None
@@ -279,9 +287,7 @@ class SpotifyPlugin(MetadataSourcePlugin, BeetsPlugin):
         tracks_data = album_data["tracks"]
         tracks_items = tracks_data["items"]
         while tracks_data["next"]:
-            tracks_data = self._handle_response(
-                requests.get, tracks_data["next"]
-            )
+            tracks_data = self._get(tracks_data["next"])
             tracks_items.extend(tracks_data["items"])
 
         tracks = []
@@ -363,17 +369,13 @@ class SpotifyPlugin(MetadataSourcePlugin, BeetsPlugin):
             spotify_id = self._get_id("track", track_id, self.id_regex)
             if spotify_id is None:
                 return None
-            track_data = self._handle_response(
-                requests.get, self.track_url + spotify_id
-            )
+            track_data = self._get(self.track_url + spotify_id)
         track = self._get_track(track_data)
 
         # Get album's tracks to set `track.index` (position on the entire
         # release) and `track.medium_total` (total number of tracks on
         # the track's disc).
-        album_data = self._handle_response(
-            requests.get, self.album_url + track_data["album"]["id"]
-        )
+        album_data = self._get(self.album_url + track_data["album"]["id"])
         medium_total = 0
         for i, track_data in enumerate(album_data["tracks"]["items"], start=1):
             if track_data["disc_number"] == track.medium:
@@ -425,10 +427,8 @@ class SpotifyPlugin(MetadataSourcePlugin, BeetsPlugin):
             return None
         self._log.debug(f"Searching {self.data_source} for '{query}'")
         try:
-            response = self._handle_response(
-                requests.get,
-                self.search_url,
-                params={"q": query, "type": query_type},
+            response = self._get(
+                self.search_url, params={"q": query, "type": query_type}
             )
         except SpotifyAPIError as e:
             self._log.debug("Spotify API error: {}", e)
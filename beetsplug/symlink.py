@@ -66,7 +66,7 @@ def album_imported(album):
 
         threads = []
 
-        for item in album.items(None, None, 'id, path'):
+        for item in album.items(fields=('path',)):
             t = symlink_item_thread(dst_dir, item)
             t.start()
             threads.append(t)
@@ -22,6 +22,7 @@ import re
 
 from beets import util
 from beets.plugins import BeetsPlugin
+from beets.scan import ScanJournal
 from beets.ui import Subcommand, print_
 
 __author__ = "https://github.com/MrNuggelz"
@@ -42,10 +43,14 @@ class Unimported(BeetsPlugin):
                 os.path.join(lib.directory, x.encode())
                 for x in self.config["ignore_subdirectories"].as_str_seq()
             ]
+            # Only the directories that changed since the last run are
+            # listed again.
+            journal = ScanJournal(lib, "unimported")
             in_folder = set()
-            for root, _, files in os.walk(lib.directory):
+            for root, dirs, files, _ in journal.walk(lib.directory):
                 # do not traverse if root is a child of an ignored directory
                 if any(root.startswith(ignored) for ignored in ignore_dirs):
+                    dirs.clear()
                     continue
                 for file in files:
                     # ignore files with ignored extensions
@@ -53,8 +58,8 @@ class Unimported(BeetsPlugin):
                         continue
                     in_folder.add(os.path.join(root, file))
 
-            in_library = {x.path for x in lib.items()}
-            art_files = {x.artpath for x in lib.albums()}
+            in_library = {x.path for x in lib.items(fields=("path",))}
+            art_files = {x.artpath for x in lib.albums(fields=("artpath",))}
             paths = set()
             for f in in_folder - in_library - art_files:
                 paths.add(util.displayable_path(f))
@@ -63,6 +68,7 @@ class Unimported(BeetsPlugin):
             paths.sort()
             for p in paths:
                 print_(p)
+            journal.save()
 
         unimported = Subcommand(
             "unimported",
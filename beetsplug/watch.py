@@ -0,0 +1,318 @@
+# This file is part of beets.
+# Copyright 2016, Adrian Sampson.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+"""Keep the library in sync with its files by watching the library
+directory for changes with inotify.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+import confuse
+import mediafile
+
+from beets import config, dbcore, ui
+from beets.library import PathQuery
+from beets.plugins import BeetsPlugin
+from beets.ui.commands import import_files, update_items
+from beets.util import bytestring_path, displayable_path, syspath
+
+# Event flags from <sys/inotify.h>.
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (
+    IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_ONLYDIR
+)
+
+# The header of a `struct inotify_event`, followed by `len` bytes of
+# NUL-padded name.
+EVENT = struct.Struct("iIII")
+
+# The number of paths matched by a single query.
+CHUNK_SIZE = 100
+
+
+class Inotify:
+    """A minimal binding of the Linux inotify API, watching directory
+    trees for files that are written, moved or deleted.
+    """
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not available on this system")
+        self.fd = self._libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self.watches = {}
+
+    def close(self):
+        os.close(self.fd)
+
+    def add(self, path):
+        """Watch the directory at `path`."""
+        wd = self._libc.inotify_add_watch(
+            self.fd, os.fsencode(path), WATCH_MASK
+        )
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), displayable_path(path))
+        self.watches[wd] = path
+
+    def add_tree(self, top):
+        """Watch the directory at `top` and all the directories under
+        it. Return the paths of the files found in them.
+        """
+        paths = []
+        for root, _, files in os.walk(syspath(top)):
+            root = bytestring_path(root)
+            self.add(root)
+            paths.extend(os.path.join(root, bytestring_path(f)) for f in files)
+        return paths
+
+    def moved(self, src, dst):
+        """Note that the watched directory `src` was moved to `dst`,
+        along with the directories under it, which are still watched.
+        """
+        for wd, path in self.watches.items():
+            if path == src or path.startswith(os.path.join(src, b"")):
+                self.watches[wd] = dst + path[len(src) :]
+
+    def read(self, timeout=None):
+        """Wait for events up to `timeout` seconds, and return them as a
+        list of `(path, mask, cookie)` tuples. The path is None for an
+        event telling that events were lost. The cookie pairs the
+        events of the two ends of a move.
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = EVENT.unpack_from(data, offset)
+            offset += EVENT.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                events.append((None, mask, cookie))
+            elif mask & IN_IGNORED:
+                # The directory was removed or moved away.
+                self.watches.pop(wd, None)
+            elif wd in self.watches:
+                directory = self.watches[wd]
+                path = os.path.join(directory, name) if name else directory
+                events.append((path, mask, cookie))
+        return events
+
+
+class WatchPlugin(BeetsPlugin):
+    def __init__(self):
+        super().__init__()
+        self.config.add(
+            {
+                "debounce": 2.0,
+                "move": False,
+                "import": False,
+            }
+        )
+
+    def commands(self):
+        cmd = ui.Subcommand(
+            "watch", help="keep the library in sync with its files"
+        )
+        cmd.func = self.watch
+        return [cmd]
+
+    def watch(self, lib, opts, args):
+        try:
+            inotify = Inotify()
+        except OSError as exc:
+            raise ui.UserError(f"cannot watch the library: {exc}")
+        try:
+            try:
+                inotify.add_tree(lib.directory)
+            except OSError as exc:
+                raise ui.UserError(f"cannot watch the library: {exc}")
+            self._log.info(
+                "watching {0} for changes", displayable_path(lib.directory)
+            )
+            self.run(lib, inotify)
+        finally:
+            inotify.close()
+
+    def run(self, lib, inotify, until=None):
+        """Pick up the changes reported by `inotify` and sync them with
+        the library once no more changes arrived for a while. Stop once
+        the `until` callable returns true, if given.
+        """
+        debounce = self.config["debounce"].as_number()
+        changed = set()
+        # The paths moved from, by the cookie pairing them with the
+        # paths they are moved to, and the pairs of paths.
+        moved_from = {}
+        moves = []
+        first = deadline = None
+        while not (until and until()):
+            timeout = None
+            if deadline is not None:
+                timeout = max(deadline - time.monotonic(), 0)
+            if until is not None:
+                timeout = min(timeout, 0.1) if timeout is not None else 0.1
+            events = inotify.read(timeout)
+
+            now = time.monotonic()
+            for path, mask, cookie in events:
+                if path is None:
+                    # Check the whole library, and watch the directories
+                    # created in the meantime.
+                    self._log.warning("lost changes, checking the library")
+                    changed.add(lib.directory)
+                    try:
+                        changed.update(inotify.add_tree(lib.directory))
+                    except OSError as exc:
+                        self._log.warning("cannot watch {0}", exc)
+                elif mask & IN_MOVED_FROM:
+                    moved_from[cookie] = path
+                elif mask & IN_MOVED_TO and cookie in moved_from:
+                    # Moved within the library.
+                    src = moved_from.pop(cookie)
+                    moves.append((src, path))
+                    changed.add(path)
+                    if mask & IN_ISDIR:
+                        inotify.moved(src, path)
+                elif mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                    # The files may be there before the directory is
+                    # watched.
+                    try:
+                        changed.update(inotify.add_tree(path))
+                    except OSError as exc:
+                        self._log.warning("cannot watch {0}", exc)
+                elif not mask & IN_CREATE:
+                    changed.add(path)
+            if events:
+                # Wait for the changes to settle, but not forever while
+                # changes keep coming.
+                first = first or now
+                deadline = min(now + debounce, first + 10 * debounce)
+
+            if deadline is not None and now >= deadline:
+                # The paths not moved to another path in the library
+                # were moved out of it.
+                changed.update(moved_from.values())
+                if moves:
+                    self.move_paths(lib, moves)
+                if changed:
+                    self.sync(lib, changed)
+                changed = set()
+                moved_from = {}
+                moves = []
+                first = deadline = None
+
+    def move_paths(self, lib, moves):
+        """Update the paths of the items and album art at or below the
+        paths moved, given as `(src, dst)` pairs, so that they keep
+        their data.
+        """
+        with lib.transaction():
+            for src, dst in moves:
+                self._log.info(
+                    "moved: {0} -> {1}",
+                    displayable_path(src),
+                    displayable_path(dst),
+                )
+                for item in lib.items(PathQuery("path", src)):
+                    item.path = dst + item.path[len(src) :]
+                    item.store(fields=["path"])
+                for album in lib.albums(PathQuery("artpath", src)):
+                    album.artpath = dst + album.artpath[len(src) :]
+                    album.store(fields=["artpath"])
+
+    def sync(self, lib, paths):
+        """Update the items at or below the changed `paths`, and find
+        the new files among them.
+        """
+        new = []
+        paths = sorted(paths)
+        for start in range(0, len(paths), CHUNK_SIZE):
+            chunk = paths[start : start + CHUNK_SIZE]
+            query = dbcore.OrQuery([PathQuery("path", p) for p in chunk])
+            known = {item.path for item in lib.items(query, fields=("path",))}
+            if known:
+                update_items(
+                    lib,
+                    query,
+                    False,
+                    self.config["move"].get(bool),
+                    False,
+                    None,
+                )
+            new.extend(
+                p
+                for p in chunk
+                if p not in known and os.path.isfile(syspath(p))
+            )
+
+        new_dirs = set()
+        for path in new:
+            try:
+                mediafile.MediaFile(syspath(path))
+            except mediafile.UnreadableFileError:
+                continue
+            self._log.info("new file: {0}", displayable_path(path))
+            new_dirs.add(os.path.dirname(path))
+
+        if new_dirs and self.config["import"].get(bool):
+            self.import_dirs(lib, sorted(new_dirs))
+
+    def import_dirs(self, lib, dirs):
+        """Import the new directories `dirs` without asking questions.
+        The settings this needs only apply to this import.
+        """
+        # There is nobody to answer the importer's questions.
+        overrides = {"quiet": True}
+        if config["import"]["duplicate_action"].get() == "ask":
+            overrides["duplicate_action"] = "skip"
+        layer = confuse.ConfigSource.of({"import": overrides})
+        config.sources.insert(0, layer)
+        try:
+            import_files(lib, dirs, None)
+        finally:
+            config.sources[:] = [s for s in config.sources if s is not layer]
@@ -230,7 +230,7 @@ def _get_unique_table_field_values(model, field, sort_field):
     """retrieve all unique values belonging to a key from a model"""
     if field not in model.all_keys() or sort_field not in model.all_keys():
         raise KeyError
-    with g.lib.transaction() as tx:
+    with g.lib.transaction(read_only=True) as tx:
         rows = tx.query(
             "SELECT DISTINCT '{}' FROM '{}' ORDER BY '{}'".format(
                 field, model._table, sort_field
@@ -301,7 +301,7 @@ def get_item(id):
 @app.route("/item/query/")
 @resource_list("items")
 def all_items():
-    return g.lib.items(None, None, limit)
+    return g.lib.items(None, None, limit, stream=True)
 
 
 @app.route("/item/<int:item_id>/file")
@@ -343,7 +343,7 @@ def item_file(item_id):
 @app.route("/item/query/<query:queries>", methods=["GET", "DELETE", "PATCH"])
 @resource_query("items", patchable=True)
 def item_query(queries):
-    return g.lib.items(queries, None, limit)
+    return g.lib.items(queries, None, limit, stream=get_method() == "GET")
 
 
 @app.route("/item/path/<everything:path>")
@@ -381,13 +381,13 @@ def get_album(id):
 @app.route("/album/query/")
 @resource_list("albums")
 def all_albums():
-    return g.lib.albums(None, None, limit)
+    return g.lib.albums(None, None, limit, stream=True)
 
 
 @app.route("/album/query/<query:queries>", methods=["GET", "DELETE"])
 @resource_query("albums")
 def album_query(queries):
-    return g.lib.albums(queries, None, limit)
+    return g.lib.albums(queries, None, limit, stream=get_method() == "GET")
 
 
 @app.route("/album/<int:album_id>/art")
@@ -416,7 +416,7 @@ def album_unique_field_values(key):
 
 @app.route("/artist/")
 def all_artists():
-    with g.lib.transaction() as tx:
+    with g.lib.transaction(read_only=True) as tx:
         rows = tx.query("SELECT DISTINCT albumartist FROM albums")
     all_artists = [row[0] for row in rows]
     return flask.jsonify(artist_names=all_artists)
@@ -427,7 +427,7 @@ def all_artists():
 
 @app.route("/stats")
 def stats():
-    with g.lib.transaction() as tx:
+    with g.lib.transaction(read_only=True) as tx:
         item_rows = tx.query("SELECT COUNT(*) FROM items")
         album_rows = tx.query("SELECT COUNT(*) FROM albums")
     return flask.jsonify(
@@ -0,0 +1,185 @@
+# This file is part of beets.
+# Copyright 2016, Adrian Sampson.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+"""Tests for the `mbindex` plugin."""
+
+import gzip
+import os
+import shutil
+from unittest.mock import patch
+
+import pytest
+
+from beets.autotag import cache
+from beets.library import Item
+from beets.test import _common
+from beets.test.helper import PluginTestCase
+from beets.ui import UserError
+from beetsplug.mbindex import MBIndexPlugin
+
+DUMP = os.path.join(_common.RSRC, b"mbindex.jsonl")
+QUIET_ROOMS = "f0e1d2c3-0000-4000-8000-000000000001"
+LUMIERE = "f0e1d2c3-0000-4000-8000-000000000002"
+
+
+class MBIndexTest(PluginTestCase):
+    plugin = "mbindex"
+
+    def setUp(self):
+        super().setUp()
+        self.config["mbindex"]["path"] = os.path.join(
+            os.fsdecode(self.temp_dir), "mbindex.db"
+        )
+        self.run_command("mbindex", DUMP.decode())
+        self.mbindex = MBIndexPlugin()
+
+    def test_album_for_id(self):
+        info = self.mbindex.album_for_id(QUIET_ROOMS)
+        assert info.album == "Quiet Rooms"
+        assert info.artist == "The Tenants"
+        assert info.artist_sort == "Tenants, The"
+        assert info.label == "Hallway Records"
+        assert info.catalognum == "QR 001"
+        assert (info.year, info.month, info.day) == (2004, 5, 10)
+        assert info.albumtype == "album"
+        assert info.media == "CD"
+        assert [t.title for t in info.tracks] == ["Open Door", "Stairwell Echo"]
+        assert info.tracks[1].length == 185.5
+        assert info.tracks[1].medium_index == 2
+        assert info.data_source == "MusicBrainz"
+
+    def test_multiple_artists_and_relations(self):
+        self.config["musicbrainz"]["external_ids"]["discogs"] = True
+        info = self.mbindex.album_for_id(LUMIERE)
+        assert info.artist == "Élodie Marchand & The Tenants"
+        assert info.artists == ["Élodie Marchand", "The Tenants"]
+        assert info.albumtypes == ["ep", "live"]
+        assert (info.original_year, info.original_month) == (2010, 11)
+        assert info.discogs_albumid == 123
+        assert info.tracks[0].artist == "Élodie Marchand"
+
+    @patch("beets.autotag.mb.BROWSE_MAXTRACKS", 1)
+    def test_large_release_not_browsed(self):
+        with patch("musicbrainzngs.browse_recordings") as browse:
+            info = self.mbindex.album_for_id(QUIET_ROOMS)
+            self.mbindex.candidates([], "The Tenants", "Quiet Rooms", False)
+        browse.assert_not_called()
+        assert len(info.tracks) == 2
+
+    def test_unknown_id(self):
+        assert self.mbindex.album_for_id(LUMIERE.replace("2", "9")) is None
+        assert self.mbindex.album_for_id("not an id") is None
+
+    def test_track_for_id(self):
+        info = self.mbindex.track_for_id("b0000000-0000-4000-8000-000000000012")
+        assert info.title == "Stairwell Echo"
+        assert info.artist == "The Tenants"
+
+    def test_candidates(self):
+        [info] = self.mbindex.candidates(
+            [Item()], "the tenants", "quiet rooms", False
+        )
+        assert info.album_id == QUIET_ROOMS
+
+    def test_candidates_ignore_accents(self):
+        [info] = self.mbindex.candidates(
+            [Item()], "Elodie Marchand", "Lumiere du nord", False
+        )
+        assert info.album_id == LUMIERE
+
+    def test_candidates_match_some_words(self):
+        infos = self.mbindex.candidates(
+            [Item()], "The Tenants", "Quiet Rooms (Deluxe Edition)", False
+        )
+        assert [i.album_id for i in infos] == [QUIET_ROOMS, LUMIERE]
+
+    def test_candidates_various_artists(self):
+        [info] = self.mbindex.candidates(
+            [Item()], "Various Artists", "Lumière du Nord", True
+        )
+        assert info.album_id == LUMIERE
+
+    def test_candidates_by_album_id(self):
+        infos = self.mbindex.candidates(
+            [Item(mb_albumid=LUMIERE)], "the tenants", "quiet rooms", False
+        )
+        assert [i.album_id for i in infos] == [LUMIERE, QUIET_ROOMS]
+
+    def test_item_candidates(self):
+        [info] = self.mbindex.item_candidates(Item(), "tenants", "open door")
+        assert info.track_id == "b0000000-0000-4000-8000-000000000011"
+
+    def test_reimport_replaces_releases(self):
+        self.run_command("mbindex", DUMP.decode())
+        assert len(self.mbindex.candidates([Item()], "", "rooms", True)) == 1
+
+    def test_compressed_dump(self):
+        path = os.path.join(self.temp_dir, b"dump.jsonl.gz")
+        with open(DUMP, "rb") as src, gzip.open(path, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        self.config["mbindex"]["path"] = os.path.join(
+            os.fsdecode(self.temp_dir), "other.db"
+        )
+        self.run_command("mbindex", path.decode())
+        assert MBIndexPlugin().album_for_id(QUIET_ROOMS) is not None
+
+    def test_releases_from_cache(self):
+        self.config["lookup_cache"]["enabled"] = True
+        self.config["lookup_cache"]["path"] = os.path.join(
+            os.fsdecode(self.temp_dir), "cache.db"
+        )
+        release = self.mbindex.index.release(QUIET_ROOMS)
+        release["id"] = release["id"].replace("1", "7")
+        cache.lookup(
+            "musicbrainz",
+            '["get_release_by_id", ["x"], {}]',
+            lambda: {"release": release},
+        )
+        self.run_command("mbindex", "--cache")
+        assert self.mbindex.album_for_id(release["id"]).album == "Quiet Rooms"
+
+    def test_browsed_recordings_from_cache(self):
+        self.config["lookup_cache"]["enabled"] = True
+        self.config["lookup_cache"]["path"] = os.path.join(
+            os.fsdecode(self.temp_dir), "cache.db"
+        )
+        release = self.mbindex.index.release(QUIET_ROOMS)
+        release["id"] = release["id"].replace("1", "7")
+        recording = dict(
+            release["medium-list"][0]["track-list"][0]["recording"]
+        )
+        recording["work-relation-list"] = [
+            {"type": "performance", "work": {"id": "w1", "title": "Door"}}
+        ]
+        cache.lookup(
+            "musicbrainz",
+            '["get_release_by_id", ["x"], {}]',
+            lambda: {"release": release},
+        )
+        cache.lookup(
+            "musicbrainz",
+            '["browse_recordings", [], {"release": "x", "offset": 0}]',
+            lambda: {"recording-list": [recording]},
+        )
+        self.run_command("mbindex", "--cache")
+        info = self.mbindex.album_for_id(release["id"])
+        assert info.tracks[0].work == "Door"
+
+    def test_no_dump(self):
+        with pytest.raises(UserError):
+            self.run_command("mbindex")
+
+    def test_unreadable_dump(self):
+        with pytest.raises(UserError):
+            self.run_command("mbindex", "/nonexistent.jsonl")
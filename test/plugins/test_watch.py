@@ -0,0 +1,272 @@
+# This file is part of beets.
+# Copyright 2016, Adrian Sampson.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+"""Tests for the `watch` plugin."""
+
+import os
+import shutil
+import unittest
+from unittest.mock import patch
+
+from mediafile import MediaFile
+
+from beets.test import _common
+from beets.test.helper import PluginTestCase
+from beets.util import syspath
+from beetsplug.watch import (
+    IN_CLOSE_WRITE,
+    IN_DELETE,
+    IN_MOVED_FROM,
+    IN_MOVED_TO,
+    IN_Q_OVERFLOW,
+    Inotify,
+    WatchPlugin,
+)
+
+try:
+    Inotify().close()
+    HAVE_INOTIFY = True
+except OSError:
+    HAVE_INOTIFY = False
+
+
+@unittest.skipUnless(HAVE_INOTIFY, "inotify not available")
+class InotifyTest(PluginTestCase):
+    plugin = "watch"
+
+    def setUp(self):
+        super().setUp()
+        self.inotify = Inotify()
+        self.sub = os.path.join(self.libdir, b"sub")
+        os.makedirs(syspath(self.sub))
+        self.inotify.add_tree(self.libdir)
+
+    def tearDown(self):
+        self.inotify.close()
+        super().tearDown()
+
+    def test_written_file(self):
+        path = os.path.join(self.sub, b"a.mp3")
+        _common.touch(path)
+        assert (path, IN_CLOSE_WRITE, 0) in self.inotify.read(1)
+
+    def test_deleted_file(self):
+        path = os.path.join(self.sub, b"a.mp3")
+        _common.touch(path)
+        self.inotify.read(1)
+        os.remove(syspath(path))
+        assert (path, IN_DELETE, 0) in self.inotify.read(1)
+
+    def test_no_event(self):
+        assert self.inotify.read(0) == []
+
+    def test_new_directory_watched(self):
+        new = os.path.join(self.sub, b"new")
+        os.mkdir(syspath(new))
+        [(path, _, _)] = self.inotify.read(1)
+        assert path == new
+        assert self.inotify.add_tree(new) == []
+        _common.touch(os.path.join(new, b"a.mp3"))
+        assert (os.path.join(new, b"a.mp3"), IN_CLOSE_WRITE, 0) in (
+            self.inotify.read(1)
+        )
+
+    def test_move_paired(self):
+        path = os.path.join(self.sub, b"a.mp3")
+        _common.touch(path)
+        self.inotify.read(1)
+        os.rename(syspath(path), syspath(os.path.join(self.sub, b"b.mp3")))
+        [(src, from_mask, from_cookie), (dst, to_mask, to_cookie)] = (
+            self.inotify.read(1)
+        )
+        assert (src, dst) == (path, os.path.join(self.sub, b"b.mp3"))
+        assert from_mask & IN_MOVED_FROM
+        assert to_mask & IN_MOVED_TO
+        assert from_cookie == to_cookie != 0
+
+    def test_moved_directory_still_watched(self):
+        moved = os.path.join(self.libdir, b"moved")
+        os.rename(syspath(self.sub), syspath(moved))
+        self.inotify.read(1)
+        self.inotify.moved(self.sub, moved)
+        _common.touch(os.path.join(moved, b"a.mp3"))
+        assert (os.path.join(moved, b"a.mp3"), IN_CLOSE_WRITE, 0) in (
+            self.inotify.read(1)
+        )
+
+
+class WatchSyncTest(PluginTestCase):
+    plugin = "watch"
+
+    def setUp(self):
+        super().setUp()
+        self.watch = WatchPlugin()
+        self.item = self.add_item_fixture(title="old title")
+        self.item.mtime = 0
+        self.item.store()
+
+    def test_modified_item_updated(self):
+        mf = MediaFile(syspath(self.item.path))
+        mf.title = "new title"
+        mf.save()
+        self.watch.sync(self.lib, {self.item.path})
+        assert self.lib.get_item(self.item.id).title == "new title"
+
+    def test_moved_item_kept(self):
+        self.item.rating = "5"
+        self.item.store()
+        new = os.path.join(self.libdir, b"moved.mp3")
+        os.rename(syspath(self.item.path), syspath(new))
+        self.watch.move_paths(self.lib, [(self.item.path, new)])
+        self.watch.sync(self.lib, {new})
+        item = self.lib.get_item(self.item.id)
+        assert item.path == new
+        assert item.rating == "5"
+
+    def test_moved_directory_items_kept(self):
+        directory = os.path.dirname(self.item.path)
+        new = os.path.join(self.libdir, b"moved")
+        os.rename(syspath(directory), syspath(new))
+        self.watch.move_paths(self.lib, [(directory, new)])
+        self.watch.sync(self.lib, {new})
+        item = self.lib.get_item(self.item.id)
+        assert item.path == os.path.join(new, os.path.basename(self.item.path))
+
+    def test_deleted_item_removed(self):
+        os.remove(syspath(self.item.path))
+        self.watch.sync(self.lib, {self.item.path})
+        assert self.lib.get_item(self.item.id) is None
+
+    def test_deleted_directory_items_removed(self):
+        directory = os.path.dirname(self.item.path)
+        shutil.rmtree(syspath(directory))
+        self.watch.sync(self.lib, {directory})
+        assert self.lib.get_item(self.item.id) is None
+
+    def test_new_file_not_imported_by_default(self):
+        new = os.path.join(self.libdir, b"new", b"new.mp3")
+        os.makedirs(syspath(os.path.dirname(new)))
+        shutil.copy(syspath(self.item.path), syspath(new))
+        with patch("beetsplug.watch.import_files") as import_files:
+            self.watch.sync(self.lib, {new})
+        import_files.assert_not_called()
+
+    def test_new_file_directory_imported(self):
+        new = os.path.join(self.libdir, b"new", b"new.mp3")
+        os.makedirs(syspath(os.path.dirname(new)))
+        shutil.copy(syspath(self.item.path), syspath(new))
+        _common.touch(os.path.join(self.libdir, b"new", b"cover.txt"))
+        self.config["watch"]["import"] = True
+        with patch("beetsplug.watch.import_files") as import_files:
+            self.watch.sync(
+                self.lib,
+                {new, os.path.join(self.libdir, b"new", b"cover.txt")},
+            )
+        import_files.assert_called_once_with(
+            self.lib, [os.path.dirname(new)], None
+        )
+        assert not self.config["import"]["quiet"].get(bool)
+
+    def test_import_settings_restored(self):
+        settings = []
+
+        def import_files(lib, paths, query):
+            settings.append(
+                (
+                    self.config["import"]["quiet"].get(bool),
+                    self.config["import"]["duplicate_action"].get(),
+                )
+            )
+
+        self.config["import"]["duplicate_action"] = "ask"
+        with patch("beetsplug.watch.import_files", import_files):
+            self.watch.import_dirs(self.lib, [self.libdir])
+        assert settings == [(True, "skip")]
+        assert not self.config["import"]["quiet"].get(bool)
+        assert self.config["import"]["duplicate_action"].get() == "ask"
+
+
+class WatchRunTest(PluginTestCase):
+    plugin = "watch"
+
+    def test_events_coalesced(self):
+        class FakeInotify:
+            def __init__(self):
+                self.batches = [
+                    [(b"/a", IN_CLOSE_WRITE, 0)],
+                    [(b"/b", IN_CLOSE_WRITE, 0), (b"/a", IN_CLOSE_WRITE, 0)],
+                ]
+
+            def read(self, timeout):
+                return self.batches.pop(0) if self.batches else []
+
+        self.config["watch"]["debounce"] = 0.05
+        watch = WatchPlugin()
+        synced = []
+        with patch.object(
+            watch, "sync", lambda lib, paths: synced.append(paths)
+        ):
+            watch.run(self.lib, FakeInotify(), until=lambda: len(synced))
+        assert synced == [{b"/a", b"/b"}]
+
+    def test_lost_events_rescan_library(self):
+        class FakeInotify:
+            def __init__(self):
+                self.batches = [[(None, IN_Q_OVERFLOW, 0)]]
+                self.trees = []
+
+            def read(self, timeout):
+                return self.batches.pop(0) if self.batches else []
+
+            def add_tree(self, top):
+                self.trees.append(top)
+                return [os.path.join(top, b"new.mp3")]
+
+        self.config["watch"]["debounce"] = 0.05
+        watch = WatchPlugin()
+        inotify = FakeInotify()
+        synced = []
+        with patch.object(
+            watch, "sync", lambda lib, paths: synced.append(paths)
+        ):
+            watch.run(self.lib, inotify, until=lambda: len(synced))
+        assert inotify.trees == [self.libdir]
+        assert synced == [{self.libdir, os.path.join(self.libdir, b"new.mp3")}]
+
+    def test_moves_paired(self):
+        class FakeInotify:
+            def __init__(self):
+                self.batches = [
+                    [(b"/a", IN_MOVED_FROM, 1), (b"/out", IN_MOVED_FROM, 2)],
+                    [(b"/b", IN_MOVED_TO, 1), (b"/in", IN_MOVED_TO, 3)],
+                ]
+
+            def read(self, timeout):
+                return self.batches.pop(0) if self.batches else []
+
+        self.config["watch"]["debounce"] = 0.05
+        watch = WatchPlugin()
+        moved = []
+        synced = []
+        with (
+            patch.object(
+                watch, "move_paths", lambda lib, moves: moved.append(moves)
+            ),
+            patch.object(
+                watch, "sync", lambda lib, paths: synced.append(paths)
+            ),
+        ):
+            watch.run(self.lib, FakeInotify(), until=lambda: len(synced))
+        assert moved == [[(b"/a", b"/b")]]
+        assert synced == [{b"/b", b"/out", b"/in"}]
@@ -16,10 +16,11 @@
 
 import re
 import unittest
+from unittest.mock import patch
 
 import pytest
 
-from beets import autotag, config
+from beets import autotag, config, plugins
 from beets.autotag import AlbumInfo, TrackInfo, correct_list_fields, match
 from beets.autotag.hooks import Distance, string_dist
 from beets.library import Item
@@ -355,6 +356,64 @@ class TrackDistanceTest(BeetsTestCase):
         assert dist == 0.0
 
 
+class TrackDistanceMatrixTest(BeetsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.items = [
+            _make_item("one", 1),
+            _make_item("Two (live)", 0),
+            _make_item("three, the", 3),
+            Item(title="four & more", disc=2, length=300, mb_trackid="x"),
+        ]
+        self.tracks = _make_trackinfo() + [
+            TrackInfo(
+                title="the four and more",
+                length=250,
+                index=4,
+                medium=2,
+                medium_index=1,
+                track_id="x",
+            ),
+            TrackInfo(title="five", medium=1, track_id="y"),
+            TrackInfo(),
+        ]
+
+    def assert_matches_track_distance(self):
+        expected = [
+            [float(match.track_distance(i, t)) for t in self.tracks]
+            for i in self.items
+        ]
+        costs = match.track_distance_matrix(self.items, self.tracks)
+        assert costs.tolist() == expected
+
+    def test_matches_track_distance(self):
+        self.assert_matches_track_distance()
+
+    def test_includes_plugin_distance(self):
+        class DistancePlugin(plugins.BeetsPlugin):
+            def track_distance(self, item, info):
+                dist = Distance()
+                dist.add_expr("source", info.title == "five")
+                return dist
+
+        with patch.object(
+            plugins, "find_plugins", return_value=[DistancePlugin()]
+        ):
+            self.assert_matches_track_distance()
+
+    def test_plugin_without_track_distance_not_asked(self):
+        plugin = plugins.BeetsPlugin()
+        with (
+            patch.object(plugins, "find_plugins", return_value=[plugin]),
+            patch.object(plugin, "track_distance") as track_distance,
+        ):
+            match.track_distance_matrix(self.items, self.tracks)
+        track_distance.assert_not_called()
+
+    def test_no_items(self):
+        assert match.track_distance_matrix([], self.tracks).shape == (0, 6)
+
+
 class AlbumDistanceTest(BeetsTestCase):
     def _mapping(self, items, info):
         out = {}
@@ -15,10 +15,13 @@
 """Tests for the DBCore database abstraction."""
 
 import os
+import re
 import shutil
 import sqlite3
+import threading
 import unittest
 from tempfile import mkstemp
+from unittest.mock import patch
 
 import pytest
 
@@ -273,6 +276,23 @@ class ModelTest(unittest.TestCase):
         row = self.db._connection().execute("select * from test").fetchone()
         assert row["field_one"] == 123
 
+    def test_table_revision(self):
+        model = ModelFixture1()
+        model.add(self.db)
+        revision = self.db.table_revision("test", ["field_one"])
+
+        model.field_two = "two"
+        model.store()
+        assert self.db.table_revision("test", ["field_one"]) == revision
+
+        model.field_one = 1
+        model.store()
+        assert self.db.table_revision("test", ["field_one"]) != revision
+
+        revision = self.db.table_revision("test")
+        ModelFixture1().add(self.db)
+        assert self.db.table_revision("test") != revision
+
     def test_revision(self):
         old_rev = self.db.revision
         model = ModelFixture1()
@@ -704,6 +724,186 @@ class ParseSortedQueryTest(unittest.TestCase):
         assert len(q.subqueries) == 1
 
 
+class RowValuesTest(unittest.TestCase):
+    def setUp(self):
+        self.db = DatabaseFixture1(":memory:")
+        ModelFixture1(field_one=1, field_two="two").add(self.db)
+        self.model = self.db._fetch(ModelFixture1).get()
+
+    def tearDown(self):
+        self.db._close()
+
+    def test_values_read_from_row(self):
+        assert isinstance(self.model._values_fixed._data, dbcore.db.RowValues)
+        assert self.model.field_one == 1
+        assert self.model.field_two == "two"
+        assert set(self.model._values_fixed) == {"id", "field_one", "field_two"}
+
+    def test_column_positions_shared(self):
+        ModelFixture1(field_one=2).add(self.db)
+        first, second = self.db._fetch(ModelFixture1)
+        assert (
+            first._values_fixed._data._index
+            is second._values_fixed._data._index
+        )
+
+    def test_set_value(self):
+        self.model.field_one = 2
+        assert self.model.field_one == 2
+        assert self.model._dirty == {"field_one"}
+
+    def test_delete_value_copies_row(self):
+        del self.model._values_fixed["field_two"]
+        assert isinstance(self.model._values_fixed._data, dict)
+        assert "field_two" not in self.model._values_fixed
+        assert self.model.field_one == 1
+
+    def test_copy(self):
+        copy = self.model.copy()
+        copy.field_one = 2
+        assert self.model.field_one == 1
+        assert copy.field_two == "two"
+
+
+class ProjectionTest(unittest.TestCase):
+    def setUp(self):
+        self.db = DatabaseFixture1(":memory:")
+        model = ModelFixture1(field_one=1, field_two="two")
+        model.foo = "foo"
+        model.bar = "bar"
+        model.add(self.db)
+
+    def tearDown(self):
+        self.db._close()
+
+    def _fetch(self, *fields, stream=False):
+        results = self.db._fetch(ModelFixture1, fields=fields, stream=stream)
+        return next(iter(results))
+
+    def test_only_projected_fields_read(self):
+        model = self._fetch("field_one", "foo")
+        assert set(model._values_fixed) == {"id", "field_one"}
+        assert model._values_flex.keys() == ["foo"]
+        assert model.foo == "foo"
+
+    def test_streaming_projection(self):
+        model = self._fetch("foo", stream=True)
+        assert set(model._values_fixed) == {"id"}
+        assert model._values_flex.keys() == ["foo"]
+
+    def test_unprojected_fields_loaded_once(self):
+        model = self._fetch("field_one")
+        with patch.object(self.db, "_get", wraps=self.db._get) as get:
+            assert model.field_two == "two"
+            assert model.bar == "bar"
+            assert model.foo == "foo"
+        get.assert_called_once()
+        assert model._projection is None
+
+    def test_missing_projected_field_not_loaded(self):
+        model = self._fetch("baz")
+        with patch.object(self.db, "_get") as get:
+            assert model.get("baz") is None
+        get.assert_not_called()
+
+    def test_modified_values_kept(self):
+        model = self._fetch("field_one")
+        model.field_two = "new"
+        model.foo = "new"
+        assert model.field_one == 1
+        assert model.bar == "bar"
+        assert model.field_two == "new"
+        assert model.foo == "new"
+        assert model._dirty == {"field_two", "foo"}
+
+    def test_store_projected(self):
+        model = self._fetch("field_one")
+        model.field_one = 2
+        model.store()
+        stored = self.db._get(ModelFixture1, model.id)
+        assert stored.field_one == 2
+        assert stored.field_two == "two"
+        assert stored.foo == "foo"
+
+    def test_contains_unprojected(self):
+        model = self._fetch("field_one")
+        assert "bar" in model
+
+    def test_slow_sort_fields_projected(self):
+        sort = dbcore.query.SlowFieldSort("field_two")
+        results = self.db._fetch(ModelFixture1, sort=sort, fields=["foo"])
+        assert results.projection == {"id", "foo", "field_two"}
+
+
+class AggregateTest(unittest.TestCase):
+    def setUp(self):
+        self.db = DatabaseFixture1(":memory:")
+        for one, two in ((1, "a"), (2, "a"), (4, "b")):
+            model = ModelFixture1(field_one=one, field_two=two)
+            model.flex = str(one)
+            model.add(self.db)
+
+    def tearDown(self):
+        self.db._close()
+
+    def _aggregate(self, query=None, **aggregates):
+        return self.db.aggregate(ModelFixture1, aggregates, query)
+
+    def test_sql_aggregates(self):
+        assert self._aggregate(
+            count=dbcore.Aggregate("count", "id"),
+            total=dbcore.Aggregate("sum", "field_one"),
+            distinct=dbcore.Aggregate("count", "field_two", distinct=True),
+            least=dbcore.Aggregate("min", "field_one"),
+        ) == {"count": 3, "total": 7, "distinct": 2, "least": 1}
+
+    def test_query(self):
+        query = dbcore.query.MatchQuery("field_two", "a")
+        result = self._aggregate(
+            query, total=dbcore.Aggregate("sum", "field_one")
+        )
+        assert result == {"total": 3}
+
+    def test_no_match(self):
+        query = dbcore.query.MatchQuery("field_two", "c")
+        assert self._aggregate(
+            query,
+            total=dbcore.Aggregate("sum", "field_one"),
+            most=dbcore.Aggregate("max", "field_one"),
+        ) == {"total": 0, "most": None}
+
+    def test_flexible_field(self):
+        result = self._aggregate(
+            count=dbcore.Aggregate("count", "flex", distinct=True)
+        )
+        assert result == {"count": 3}
+
+    def test_slow_query(self):
+        class SlowQuery(dbcore.Query):
+            def match(self, obj):
+                return obj.field_one > 1
+
+        result = self._aggregate(
+            SlowQuery(), total=dbcore.Aggregate("sum", "field_one")
+        )
+        assert result == {"total": 6}
+
+    def test_slow_query_tested_once(self):
+        tested = []
+
+        class SlowQuery(dbcore.Query):
+            def match(self, obj):
+                tested.append(obj.field_one)
+                return obj.field_one > 1
+
+        self._aggregate(SlowQuery(), total=dbcore.Aggregate("sum", "id"))
+        assert tested == [1, 2, 4]
+
+    def test_unknown_function(self):
+        with pytest.raises(ValueError, match="unknown aggregate function"):
+            self._aggregate(avg=dbcore.Aggregate("avg", "field_one"))
+
+
 class ResultsIteratorTest(unittest.TestCase):
     def setUp(self):
         self.db = DatabaseFixture1(":memory:")
@@ -776,3 +976,425 @@ class ResultsIteratorTest(unittest.TestCase):
             self.db._fetch(ModelFixture1, dbcore.query.FalseQuery()).get()
             is None
         )
+
+
+class StreamingResultsTest(unittest.TestCase):
+    def setUp(self):
+        self.db = DatabaseFixture1(":memory:")
+        self.db.fetch_chunk_size = 2
+        for i in range(5):
+            model = ModelFixture1()
+            model.field_one = i
+            model["foo"] = f"flex{i}"
+            model.add(self.db)
+
+    def tearDown(self):
+        self.db._connection().close()
+
+    def test_iterate_across_chunks(self):
+        objs = self.db._fetch(ModelFixture1, stream=True)
+        assert isinstance(objs, dbcore.db.StreamingResults)
+        assert [o.field_one for o in objs] == [0, 1, 2, 3, 4]
+
+    def test_flex_attrs_attached_per_chunk(self):
+        objs = self.db._fetch(ModelFixture1, stream=True)
+        assert [o.foo for o in objs] == [f"flex{i}" for i in range(5)]
+
+    def test_iterate_twice(self):
+        objs = self.db._fetch(ModelFixture1, stream=True)
+        list(objs)
+        assert len(list(objs)) == 5
+
+    def test_length(self):
+        objs = self.db._fetch(ModelFixture1, stream=True)
+        assert len(objs) == 5
+
+    def test_slow_query(self):
+        q = dbcore.query.SubstringQuery("foo", "x3", False)
+        objs = self.db._fetch(ModelFixture1, q, stream=True)
+        assert [o.field_one for o in objs] == [3]
+        assert len(objs) == 1
+
+    def test_slow_sort(self):
+        s = dbcore.query.SlowFieldSort("foo", ascending=False)
+        objs = self.db._fetch(ModelFixture1, sort=s, stream=True)
+        assert objs[0].foo == "flex4"
+
+    def test_limit(self):
+        objs = self.db._fetch(ModelFixture1, limit=3, stream=True)
+        assert len(objs) == 3
+        assert len(list(objs)) == 3
+
+    def test_store_while_iterating(self):
+        for obj in self.db._fetch(ModelFixture1, stream=True):
+            obj.field_two = "changed"
+            obj.store()
+        objs = self.db._fetch(ModelFixture1)
+        assert {o.field_two for o in objs} == {"changed"}
+
+    def test_out_of_range(self):
+        objs = self.db._fetch(ModelFixture1, stream=True)
+        with pytest.raises(IndexError):
+            objs[100]
+
+    def test_no_results(self):
+        q = dbcore.query.FalseQuery()
+        assert self.db._fetch(ModelFixture1, q, stream=True).get() is None
+
+    def test_rows_read_at_once_without_reader(self):
+        # An in-memory database has no read connections: the rows and
+        # their flexible attributes are read together.
+        with patch.object(
+            self.db, "_fetch_rows", wraps=self.db._fetch_rows
+        ) as fetch_rows:
+            objs = list(self.db._fetch(ModelFixture1, stream=True))
+        fetch_rows.assert_called_once()
+        assert [o.foo for o in objs] == [f"flex{i}" for i in range(5)]
+
+    def test_flex_attrs_follow_sort_order(self):
+        s = dbcore.query.FixedFieldSort("field_one", ascending=False)
+        objs = self.db._fetch(ModelFixture1, sort=s, limit=3, stream=True)
+        assert [(o.field_one, o.foo) for o in objs] == [
+            (4, "flex4"),
+            (3, "flex3"),
+            (2, "flex2"),
+        ]
+
+
+class FlexAttributeMergeTest(unittest.TestCase):
+    def setUp(self):
+        self.db = DatabaseFixture1(":memory:")
+        for i in range(4):
+            model = ModelFixture1()
+            model.field_one = i % 2
+            if i != 2:
+                model["foo"] = f"flex{i}"
+                model["bar"] = i
+            model.add(self.db)
+
+    def tearDown(self):
+        self.db._connection().close()
+
+    def test_flex_attrs_follow_sort_order(self):
+        s = dbcore.query.FixedFieldSort("field_one", ascending=False)
+        objs = self.db._fetch(ModelFixture1, sort=s)
+        assert [(o.id, o.get("foo")) for o in objs] == [
+            (2, "flex1"),
+            (4, "flex3"),
+            (1, "flex0"),
+            (3, None),
+        ]
+
+    def test_flex_attrs_with_limit(self):
+        s = dbcore.query.FixedFieldSort("field_one")
+        objs = self.db._fetch(ModelFixture1, sort=s, limit=2)
+        assert [(o.id, o.get("bar")) for o in objs] == [(1, "0"), (3, None)]
+
+    def test_flex_rows_of_other_entities_skipped(self):
+        rows = [{"id": 1}, {"id": 2}, {"id": 3}]
+        flex_rows = [
+            {"entity_id": 1, "key": "foo", "value": "a", "position": 1},
+            {"entity_id": 9, "key": "foo", "value": "x", "position": 2},
+            {"entity_id": 3, "key": "foo", "value": "c", "position": 3},
+        ]
+        merged = dbcore.db._merge_flex_rows(rows, flex_rows)
+        assert [flex for _, flex in merged] == [{"foo": "a"}, {}, {"foo": "c"}]
+
+
+class IndexedModelFixture(ModelFixture1):
+    _indices = [
+        dbcore.Index.for_expression("test", "field_one"),
+        dbcore.Index("test_by_fields", ("field_one", "field_two")),
+    ]
+
+
+class IndexedDatabaseFixture(dbcore.Database):
+    _models = (IndexedModelFixture,)
+
+
+class IndexTest(unittest.TestCase):
+    def setUp(self):
+        self.db = IndexedDatabaseFixture(":memory:")
+
+    def tearDown(self):
+        self.db._connection().close()
+
+    def index_names(self):
+        return [name for name, _ in self.db.indices("test")]
+
+    def test_declared_indices_created_on_open(self):
+        assert self.index_names() == ["test_by_field_one", "test_by_fields"]
+
+    def test_index_name_from_expression(self):
+        index = dbcore.Index.for_expression("test", "unidecode(field_two)")
+        assert index == (
+            "test_by_unidecode_field_two",
+            ("unidecode(field_two)",),
+        )
+
+    def test_create_expression_index(self):
+        index = self.db.create_index(
+            IndexedModelFixture, "bytelower(field_two)"
+        )
+        assert index.name in self.index_names()
+
+        model = IndexedModelFixture(field_two="Foo")
+        model.add(self.db)
+        model["field_two"] = None
+        model.store()
+
+    def test_create_index_on_missing_column(self):
+        with pytest.raises(sqlite3.OperationalError):
+            self.db.create_index(IndexedModelFixture, "nonexistent")
+
+    def test_drop_index(self):
+        self.db.drop_index("test_by_fields")
+        assert self.index_names() == ["test_by_field_one"]
+
+    def test_explain_uses_index(self):
+        q = dbcore.query.MatchQuery("field_one", 1)
+        plan = self.db.explain(IndexedModelFixture, q)
+        assert any("test_by_field_one" in detail for detail in plan)
+
+
+class ConnectionTest(unittest.TestCase):
+    def setUp(self):
+        handle, self.libfile = mkstemp("db")
+        os.close(handle)
+        self.db = DatabaseFixture1(
+            self.libfile,
+            pragmas={"journal_mode": "wal", "synchronous": "normal"},
+            read_connections=2,
+        )
+        model = ModelFixture1(field_one=1)
+        model.add(self.db)
+
+    def tearDown(self):
+        self.db._close()
+        os.remove(self.libfile)
+
+    def test_pragmas_applied(self):
+        conn = self.db._connection()
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+
+    def test_in_memory_database_has_no_read_connections(self):
+        db = DatabaseFixture1(":memory:", read_connections=2)
+        with db.transaction(read_only=True) as tx:
+            assert tx._reader is None
+        db._close()
+
+    def test_read_only_transaction_uses_pool(self):
+        with self.db.transaction(read_only=True) as tx:
+            assert tx._reader is not None
+            with pytest.raises(dbcore.db.DBAccessError):
+                tx.mutate("INSERT INTO test (field_one) VALUES (2)")
+        assert self.db._idle_readers.qsize() == 1
+
+    def test_write_nested_in_read_only_transaction(self):
+        with self.db.transaction(read_only=True):
+            model = self.db._fetch(ModelFixture1).get()
+            model.field_one = 2
+            model.store()
+            ModelFixture1(field_one=3).add(self.db)
+            assert not self.db._db_lock.locked()
+        assert self.db._idle_readers.qsize() == 1
+        objs = self.db._fetch(ModelFixture1)
+        assert [o.field_one for o in objs] == [2, 3]
+
+    def test_read_while_writing_in_other_thread(self):
+        counts = []
+
+        def read():
+            counts.append(len(self.db._fetch(ModelFixture1)))
+
+        with self.db.transaction() as tx:
+            tx.mutate("INSERT INTO test (field_one) VALUES (2)")
+            thread = threading.Thread(target=read)
+            thread.start()
+            thread.join(5)
+            assert not thread.is_alive()
+            # The writer sees its own changes.
+            assert len(self.db._fetch(ModelFixture1)) == 2
+        # Readers only see committed changes.
+        assert counts == [1]
+
+    def test_pool_is_bounded(self):
+        first = self.db._fetch(ModelFixture1, stream=True)
+        second = self.db._fetch(ModelFixture1, stream=True)
+        for _ in zip(first, second):
+            # Both read connections are in use: fall back to the writer.
+            with self.db.transaction(read_only=True) as tx:
+                assert tx._reader is None
+        assert self.db._open_readers == 2
+        assert self.db._idle_readers.qsize() == 2
+
+    def test_streaming_reads_own_transaction(self):
+        with self.db.transaction() as tx:
+            tx.mutate("INSERT INTO test (field_one) VALUES (2)")
+            objs = self.db._fetch(ModelFixture1, stream=True)
+            assert [o.field_one for o in objs] == [1, 2]
+
+    def test_transaction_stacks_reclaimed(self):
+        thread = threading.Thread(target=lambda: self.db._fetch(ModelFixture1))
+        thread.start()
+        thread.join()
+        assert not self.db._tx_stacks
+
+
+class RegexpFunctionTest(unittest.TestCase):
+    def setUp(self):
+        self.db = DatabaseFixture1(":memory:")
+        for value in ["abc", "abd", "xyz"]:
+            ModelFixture1(field_two=value).add(self.db)
+
+    def tearDown(self):
+        self.db._close()
+
+    def test_regexp_query(self):
+        q = dbcore.query.RegexpQuery("field_two", "^ab")
+        objs = self.db._fetch(ModelFixture1, q)
+        assert sorted(o.field_two for o in objs) == ["abc", "abd"]
+
+    def test_regexp_matches_bytes(self):
+        with self.db.transaction() as tx:
+            rows = tx.query("SELECT regexp(?, ?)", (b"caf\xc3\xa9", "é$"))
+        assert rows[0][0] == 1
+
+    def test_pattern_compiled_once_per_connection(self):
+        q = dbcore.query.RegexpQuery("field_two", "^ab")
+        with patch("re.compile", wraps=re.compile) as compile:
+            db = DatabaseFixture1(":memory:")
+            for value in ["abc", "abd", "xyz"]:
+                ModelFixture1(field_two=value).add(db)
+            assert len(db._fetch(ModelFixture1, q)) == 2
+            assert len(db._fetch(ModelFixture1, q)) == 2
+        calls = [c for c in compile.call_args_list if c.args == ("^ab",)]
+        assert len(calls) == 1
+        db._close()
+
+
+class QueryCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.db = DatabaseFixture1(":memory:", query_cache_size=2)
+        self.model = ModelFixture1(field_one=1)
+        self.model.add(self.db)
+
+    def tearDown(self):
+        self.db._close()
+
+    def fetch(self, value=1):
+        q = dbcore.query.MatchQuery("field_one", value)
+        return [o.id for o in self.db._fetch(ModelFixture1, q)]
+
+    def test_disabled_by_default(self):
+        db = DatabaseFixture1(":memory:")
+        assert db.query_cache is None
+        db._close()
+
+    def test_repeated_query_hits(self):
+        assert self.fetch() == [self.model.id]
+        assert self.fetch() == [self.model.id]
+        info = self.db.query_cache.info()
+        assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+
+    def test_write_invalidates(self):
+        assert self.fetch() == [self.model.id]
+        self.model.field_one = 2
+        self.model.store()
+        assert self.fetch() == []
+        assert self.db.query_cache.info().hits == 0
+
+    def test_least_recently_used_evicted(self):
+        self.fetch(1)
+        self.fetch(2)
+        self.fetch(1)
+        self.fetch(3)
+        assert self.db.query_cache.info().currsize == 2
+        self.fetch(1)
+        self.fetch(2)
+        assert self.db.query_cache.info().hits == 2
+
+    def test_bypassed_in_transaction(self):
+        with self.db.transaction() as tx:
+            tx.mutate("UPDATE test SET field_one = 2")
+            assert self.fetch() == []
+        assert self.db.query_cache.info().misses == 0
+
+    def test_results_not_shared(self):
+        q = dbcore.query.MatchQuery("field_one", 1)
+        first = self.db._fetch(ModelFixture1, q).get()
+        first.field_one = 5
+        assert self.db._fetch(ModelFixture1, q).get().field_one == 1
+
+
+class BulkWriteTest(unittest.TestCase):
+    def setUp(self):
+        self.db = DatabaseFixture1(":memory:")
+
+    def tearDown(self):
+        self.db._connection().close()
+
+    def fetch(self):
+        return list(self.db._fetch(ModelFixture1, sort=None))
+
+    def count_statements(self, func):
+        mutate = dbcore.db.Transaction._mutate
+        with patch.object(
+            dbcore.db.Transaction, "_mutate", autospec=True, side_effect=mutate
+        ) as mock:
+            func()
+        return mock.call_count
+
+    def test_bulk_add(self):
+        existing = ModelFixture1(field_one=0)
+        existing.add(self.db)
+        models = [ModelFixture1(field_one=i, foo=f"flex{i}") for i in (1, 2)]
+        self.db.bulk_add(models)
+
+        assert [m.id for m in models] == [existing.id + 1, existing.id + 2]
+        assert [(m.field_one, m.get("foo")) for m in self.fetch()] == [
+            (0, None),
+            (1, "flex1"),
+            (2, "flex2"),
+        ]
+        assert not any(m._dirty for m in models)
+
+    def test_bulk_add_nothing(self):
+        self.db.bulk_add([])
+        assert self.fetch() == []
+
+    def test_bulk_store(self):
+        models = [ModelFixture1(field_one=i, foo="bar") for i in range(3)]
+        self.db.bulk_add(models)
+        for model in models:
+            model.field_two = "two"
+            model.baz = "qux"
+            del model["foo"]
+        self.db.bulk_store(models)
+
+        for model in self.fetch():
+            assert model.field_two == "two"
+            assert model.baz == "qux"
+            assert "foo" not in model
+
+    def test_bulk_store_only_given_fields(self):
+        model = ModelFixture1(field_one=1)
+        model.add(self.db)
+        model.field_one = 2
+        model.field_two = "two"
+        self.db.bulk_store([model], fields=["field_two"])
+
+        stored = self.db._get(ModelFixture1, model.id)
+        assert (stored.field_one, stored.field_two) == (1, "two")
+
+    def test_bulk_store_batches_statements(self):
+        models = [ModelFixture1(field_one=i) for i in range(10)]
+        self.db.bulk_add(models)
+        for model in models:
+            model.field_one += 1
+            model.foo = "bar"
+
+        # One UPDATE and one INSERT for all models.
+        assert self.count_statements(lambda: self.db.bulk_store(models)) == 2
+        assert [m.field_one for m in self.fetch()] == list(range(1, 11))
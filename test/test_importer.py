@@ -23,6 +23,7 @@ import sys
 import unicodedata
 import unittest
 from io import StringIO
+from multiprocessing.pool import ThreadPool
 from pathlib import Path
 from tarfile import TarFile
 from tempfile import mkstemp
@@ -34,7 +35,7 @@ from mediafile import MediaFile
 
 from beets import config, importer, logging, util
 from beets.autotag import AlbumInfo, AlbumMatch, TrackInfo
-from beets.importer import albums_in_dir
+from beets.importer import ImportState, albums_in_dir
 from beets.test import _common
 from beets.test.helper import (
     NEEDS_REFLINK,
@@ -673,6 +674,71 @@ class ImportTracksTest(ImportTestCase):
         self.assert_file_in_lib(b"singletons", b"Applied Track 1.mp3")
 
 
+class ReadWorkersTest(ImportTestCase):
+    """Test reading the files of a directory with several threads."""
+
+    def setUp(self):
+        super().setUp()
+        self.paths = [
+            bytestring_path(p) for p in self.prepare_album_for_import(3)
+        ]
+        self.other = os.path.join(os.path.dirname(self.paths[0]), b"a.txt")
+        _common.touch(self.other)
+
+    def test_read_items_in_order(self):
+        session = self.setup_importer()
+        factory = importer.ImportTaskFactory(self.import_dir, session)
+        session.read_pool = ThreadPool(3)
+        try:
+            items = factory.read_items([self.other, *reversed(self.paths)])
+        finally:
+            session.read_pool.terminate()
+        assert [item.path for item in items] == list(reversed(self.paths))
+
+    def test_import_singletons(self):
+        self.setup_singleton_importer(autotag=False, read_workers=3)
+        self.importer.run()
+        assert sorted(item.title for item in self.lib.items()) == [
+            "Tag Track 1",
+            "Tag Track 2",
+            "Tag Track 3",
+        ]
+
+    def test_import_album_sequentially(self):
+        self.setup_importer(autotag=False, read_workers=1)
+        self.importer.run()
+        assert len(self.lib.albums().get().items()) == 3
+
+
+class StageWorkersTest(ImportTestCase):
+    """Test looking up and manipulating tasks with several threads."""
+
+    def setUp(self):
+        super().setUp()
+        self.prepare_albums_for_import(4)
+        self.config["threaded"] = True
+        self.matcher = AutotagStub().install()
+        self.matcher.matching = AutotagStub.IDENT
+
+    def tearDown(self):
+        super().tearDown()
+        self.matcher.restore()
+
+    def test_import_in_order(self):
+        self.setup_importer(lookup_workers=3, file_workers=3, resume=True)
+        for _ in range(4):
+            self.importer.add_choice(importer.action.APPLY)
+        self.importer.run()
+
+        albums = list(self.lib.albums())
+        assert [a.album for a in albums] == [
+            f"Applied Album {i}" for i in range(1, 5)
+        ]
+        for album in albums:
+            self.assertExists(album.items().get().path)
+        assert not ImportState().tagprogress
+
+
 class ImportCompilationTest(ImportTestCase):
     """Test ASIS import of a folder containing tracks with different artists."""
 
@@ -23,6 +23,7 @@ import sys
 import time
 import unicodedata
 import unittest
+from unittest.mock import patch
 
 import pytest
 from mediafile import MediaFile, UnreadableFileError
@@ -543,6 +544,116 @@ class DestinationTest(BeetsTestCase):
         assert self.i.destination() == np("one/foo/two")
 
 
+class FormatItemsTest(BeetsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.i = item(self.lib)
+        self.i.artist = ""
+        self.i.store()
+        self.album = self.lib.add_album([self.i])
+
+    def _check(self, fmt):
+        expected = [format(i, fmt) for i in self.lib.items()]
+        assert list(self.lib.format_items(fmt=fmt)) == expected
+        return expected
+
+    def test_fixed_fields_without_items(self):
+        with patch.object(beets.library.Item, "_awaken") as awaken:
+            lines = list(self.lib.format_items(fmt="$title %upper{$album}"))
+        awaken.assert_not_called()
+        assert lines == ["the title THE ALBUM"]
+
+    def test_matches_format(self):
+        self._check("$title - $track")
+        self._check("%if{$comp,$album,$title}")
+
+    def test_artist_fallback(self):
+        assert self._check("$artist") == ["the album artist"]
+
+    def test_default_format(self):
+        self._check("")
+
+    def test_album_and_flexible_fields(self):
+        self.album.genre = "album genre"
+        self.album.foo = "bar"
+        self.album.store(inherit=False)
+        assert self._check("$foo") == ["bar"]
+        self._check("%aunique{} $path")
+
+    def test_query(self):
+        assert list(self.lib.format_items("title:nothing", "$title")) == []
+
+
+class PathFormatRouterTest(BeetsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.lib.directory = b"base"
+        self.lib.path_formats = [
+            ("default", "$artist/$title"),
+            ("comp:true", "Compilations/$title"),
+        ]
+        self.i = item(self.lib)
+        self.i.comp = False
+
+    def test_router_reused(self):
+        assert self.lib.path_router() is self.lib.path_router()
+
+    def test_router_rebuilt_on_change(self):
+        router = self.lib.path_router()
+        self.lib.path_formats = [("default", "$title")]
+        assert self.lib.path_router() is not router
+        router = self.lib.path_router()
+        config["asciify_paths"] = True
+        assert self.lib.path_router() is not router
+
+    def test_query_parsed_once(self):
+        self.lib.path_router()
+        with patch("beets.library.parse_query_string") as parse:
+            self.i.destination()
+            self.i.destination()
+        parse.assert_not_called()
+
+    def test_template_for(self):
+        router = self.lib.path_router()
+        assert router.template_for(self.i).original == "$artist/$title"
+        self.i.comp = True
+        assert router.template_for(self.i).original == "Compilations/$title"
+
+    def test_destinations(self):
+        other = item(self.lib)
+        other.comp = True
+        router = self.lib.path_router()
+        assert router.destinations([self.i, other], fragment=True) == [
+            os.path.join("the artist", "the title"),
+            os.path.join("Compilations", "the title"),
+        ]
+        assert router.count == 2
+
+    def test_fields(self):
+        assert self.lib.path_router().fields == {
+            "album_id",
+            "path",
+            "artist",
+            "title",
+            "comp",
+        }
+
+    def test_fields_with_computed_field(self):
+        self.lib.path_formats = [("default", "$computed")]
+        getters = {"computed": lambda item: "value"}
+        with patch("beets.plugins.item_field_getters", return_value=getters):
+            assert self.lib.path_router().fields is None
+
+    def test_destinations_of_projected_items(self):
+        self.i.store()
+        router = self.lib.path_router()
+        items = self.lib.items(fields=router.fields)
+        assert router.destinations(items, fragment=True) == [
+            os.path.join("the artist", "the title")
+        ]
+        assert items.get()._projection is not None
+
+
 class ItemFormattedMappingTest(ItemInDBTestCase):
     def test_formatted_item_value(self):
         formatted = self.i.formatted()
@@ -807,6 +918,31 @@ class DisambiguationTest(BeetsTestCase, PathFormattingMixin):
         self._setf("foo%aunique{albumartist album flex,year}/$title")
         self._assert_dest(b"/base/foo/the title", self.i1)
 
+    def test_unique_albums_not_queried(self):
+        album2 = self.lib.get_album(self.i2)
+        album2.album = "different album"
+        album2.store()
+        with patch.object(self.lib, "albums") as albums:
+            self._assert_dest(b"/base/foo/the title", self.i1)
+        albums.assert_not_called()
+
+    def test_ambiguous_groups_follow_changes(self):
+        keys = ["albumartist", "album"]
+        groups = self.lib._ambiguous_groups(Album, keys)
+        assert groups == {("the album artist", "the album")}
+        album2 = self.lib.get_album(self.i2)
+        album2.album = "different album"
+        album2.store()
+        assert self.lib._ambiguous_groups(Album, keys) == set()
+
+    def test_ambiguous_groups_kept_when_other_fields_change(self):
+        keys = ["albumartist", "album"]
+        groups = self.lib._ambiguous_groups(Album, keys)
+        album2 = self.lib.get_album(self.i2)
+        album2.year = 2003
+        album2.store()
+        assert self.lib._ambiguous_groups(Album, keys) is groups
+
 
 class SingletonDisambiguationTest(BeetsTestCase, PathFormattingMixin):
     def setUp(self):
@@ -1043,6 +1179,37 @@ class AlbumInfoTest(BeetsTestCase):
         assert i.album == ai.album
 
 
+class AlbumPrefetchTest(BeetsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.album = self.lib.add_album([item(), item()])
+        self.album.flex = "value"
+        self.album.store()
+        self.lib.add(item())
+
+    def test_items_share_prefetched_album(self):
+        first, second, singleton = self.lib.items(with_albums=True)
+        assert first._cached_album is second._cached_album
+        assert first._cached_album.id == self.album.id
+        assert first.flex == "value"
+        assert singleton._cached_album is None
+
+    def test_albums_loaded_once(self):
+        self.lib.fetch_chunk_size = 1
+        with (
+            patch.object(self.lib, "_fetch", wraps=self.lib._fetch) as fetch,
+            patch.object(self.lib, "get_album") as get,
+        ):
+            items = self.lib.items(
+                "singleton:false", stream=True, with_albums=True
+            )
+            assert [i.flex for i in items] == ["value", "value"]
+        get.assert_not_called()
+        # The items query, then the album of the first chunk. The second
+        # chunk finds it in the identity map.
+        assert fetch.call_count == 2
+
+
 class ArtDestinationTest(BeetsTestCase):
     def setUp(self):
         super().setUp()
@@ -1190,6 +1357,31 @@ class MtimeTest(BeetsTestCase):
         self.i.read()
         assert self.i.mtime >= self._mtime()
 
+    def test_filesize_stored(self):
+        size = os.path.getsize(self.ipath)
+        assert self.i.filesize == size
+        assert self.lib.get_item(self.i.id).filesize == size
+
+    def test_filesize_up_to_date_after_write(self):
+        self.i.comments = "a much longer comment than before" * 100
+        self.i.write()
+        assert self.i.filesize == os.path.getsize(self.ipath)
+
+    def test_filesize_not_read_when_stored(self):
+        with patch.object(beets.library.Item, "try_filesize") as try_size:
+            item = beets.library.Item(path=self.ipath, title="a title")
+            self.lib.add(item)
+            item.filesize = 0
+            item.store()
+        try_size.assert_not_called()
+        assert self.lib.get_item(item.id)._values_fixed["filesize"] == 0
+
+    def test_filesize_not_read_when_bulk_added(self):
+        with patch.object(beets.library.Item, "try_filesize") as try_size:
+            item = beets.library.Item(path=self.ipath, title="a title")
+            self.lib.bulk_add([item])
+        try_size.assert_not_called()
+
 
 class ImportTimeTest(BeetsTestCase):
     def added(self):
@@ -0,0 +1,165 @@
+# This file is part of beets.
+# Copyright 2016, Adrian Sampson.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+"""Tests for the lookup cache of the metadata sources."""
+
+import os
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from beets.autotag import cache
+from beets.autotag.cache import LookupCache
+from beets.test.helper import BeetsTestCase
+from beets.ui import UserError
+
+
+class LookupCacheTest(BeetsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = LookupCache(
+            os.path.join(self.temp_dir, b"cache.db"), 10, 20, 1000
+        )
+
+    def age(self, seconds):
+        """Pretend that the responses were fetched `seconds` ago."""
+        with self.cache._connect() as conn, conn:
+            conn.execute("UPDATE responses SET fetched=fetched-?", (seconds,))
+
+    def wait_for_refresh(self):
+        self.cache._queue.join()
+
+    def test_fresh_response_reused(self):
+        fetch = Mock(return_value={"id": "1"})
+        assert self.cache.get("source", "key", fetch) == {"id": "1"}
+        assert self.cache.get("source", "key", fetch) == {"id": "1"}
+        fetch.assert_called_once()
+
+    def test_sources_cached_separately(self):
+        self.cache.get("one", "key", lambda: 1)
+        assert self.cache.get("two", "key", lambda: 2) == 2
+
+    def test_stale_response_refreshed_in_background(self):
+        self.cache.get("source", "key", lambda: "old")
+        self.age(15)
+        assert self.cache.get("source", "key", lambda: "new") == "old"
+        self.wait_for_refresh()
+        assert self.cache.get("source", "key", Mock()) == "new"
+
+    def test_refreshes_share_one_thread(self):
+        for key in ("one", "two", "three"):
+            self.cache.get("source", key, lambda: "old")
+        self.age(15)
+        for key in ("one", "two", "three"):
+            self.cache.get("source", key, lambda: "new")
+        self.wait_for_refresh()
+        workers = [
+            t for t in threading.enumerate() if t.name == "lookup-cache-refresh"
+        ]
+        assert workers == [self.cache._worker]
+        assert self.cache._worker.daemon
+        assert self.cache.get("source", "three", Mock()) == "new"
+
+    def test_refresh_skipped_when_queue_full(self):
+        self.cache.get("source", "key", lambda: "old")
+        self.age(15)
+        fetch = Mock(return_value="new")
+        self.cache._queue = cache.queue.Queue(1)
+        self.cache._queue.put(("other", "key", Mock()))
+        assert self.cache.get("source", "key", fetch) == "old"
+        assert ("source", "key") not in self.cache._refreshing
+        fetch.assert_not_called()
+
+    def test_expired_response_fetched(self):
+        self.cache.get("source", "key", lambda: "old")
+        self.age(30)
+        assert self.cache.get("source", "key", lambda: "new") == "new"
+
+    def test_none_not_cached(self):
+        self.cache.get("source", "key", lambda: None)
+        assert self.cache.get("source", "key", lambda: "found") == "found"
+
+    def test_failed_fetch_not_cached(self):
+        with pytest.raises(OSError, match="offline"):
+            self.cache.get(
+                "source", "key", Mock(side_effect=OSError("offline"))
+            )
+        assert self.cache.get("source", "key", lambda: "found") == "found"
+
+    def test_least_recently_used_evicted(self):
+        now = time.time()
+        with patch("time.time", return_value=now - 2):
+            self.cache.put("source", "a", "x" * 400)
+        with patch("time.time", return_value=now - 1):
+            self.cache.put("source", "b", "x" * 400)
+        with patch("time.time", return_value=now):
+            self.cache.get("source", "a", Mock())
+            self.cache.put("source", "c", "x" * 400)
+
+        fetch = Mock(return_value="fetched")
+        assert self.cache.get("source", "a", fetch) == "x" * 400
+        assert self.cache.get("source", "b", fetch) == "fetched"
+
+    def test_stats(self):
+        self.cache.get("one", "a", lambda: "x")
+        self.cache.get("one", "a", lambda: "x")
+        self.cache.get("one", "b", lambda: "y")
+        self.age(15)
+        self.cache.get("two", "a", lambda: "z")
+        [one, two] = self.cache.stats()
+        assert one == ("one", 2, 6, 2, 1)
+        assert two == ("two", 1, 3, 0, 0)
+
+    def test_clear_source(self):
+        self.cache.get("one", "a", lambda: 1)
+        self.cache.get("two", "a", lambda: 2)
+        assert self.cache.clear("one") == 1
+        assert [s.source for s in self.cache.stats()] == ["two"]
+
+
+class CacheCommandTest(BeetsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.config["lookup_cache"]["enabled"] = True
+        self.config["lookup_cache"]["path"] = os.path.join(
+            os.fsdecode(self.temp_dir), "cache.db"
+        )
+
+    def test_stats(self):
+        cache.lookup("musicbrainz", "key", lambda: {"id": "1"})
+        out = self.run_with_output("cache", "stats")
+        assert out == "musicbrainz: 1 responses, 11.0 B, 0 expired, 0 hits\n"
+
+    def test_empty(self):
+        assert self.run_with_output("cache") == "The lookup cache is empty.\n"
+
+    def test_clear(self):
+        cache.lookup("musicbrainz", "key", lambda: "value")
+        cache.lookup("spotify", "key", lambda: "value")
+        out = self.run_with_output("cache", "clear", "spotify")
+        assert out == "Removed 1 responses.\n"
+        assert (
+            self.run_with_output("cache", "clear") == "Removed 1 responses.\n"
+        )
+
+    def test_disabled(self):
+        self.config["lookup_cache"]["enabled"] = False
+        with pytest.raises(UserError):
+            self.run_command("cache")
+
+    def test_unknown_action(self):
+        with pytest.raises(UserError):
+            self.run_command("cache", "drop")
@@ -777,6 +777,18 @@ class MBLibraryTest(BeetsTestCase):
             assert ti.title == "foo"
             assert ti.track_id == "bar"
 
+    def test_match_track_cached(self):
+        config["lookup_cache"]["enabled"] = True
+        with mock.patch("musicbrainzngs.search_recordings") as p:
+            p.return_value = {
+                "recording-list": [{"title": "foo", "id": "bar"}],
+            }
+            list(mb.match_track("hello", "there"))
+            ti = list(mb.match_track("hello", "there"))[0]
+
+        p.assert_called_once()
+        assert ti.title == "foo"
+
     def test_match_album(self):
         mbid = "d2a6f856-b553-40a0-ac54-a321e8e2da99"
         with mock.patch("musicbrainzngs.search_releases") as sp:
@@ -14,6 +14,7 @@
 
 """Test the "pipeline.py" restricted parallel programming library."""
 
+import time
 import unittest
 
 import pytest
@@ -72,6 +73,15 @@ def _multi_work():
         i = pipeline.multiple([i, -i])
 
 
+# A worker that takes longer for the earlier messages.
+def _slow_work(num=5):
+    i = None
+    while True:
+        i = yield i
+        time.sleep((num - i) * 0.02)
+        i = pipeline.multiple([i] * (i % 2 + 1))
+
+
 class SimplePipelineTest(unittest.TestCase):
     def setUp(self):
         self.result = []
@@ -117,6 +127,57 @@ class ParallelStageTest(unittest.TestCase):
         pl = pipeline.Pipeline((_produce(), (_work(), _work())))
         assert list(pl.pull()) == [0, 2, 4, 6, 8]
 
+    def test_stats(self):
+        self.pl.run_parallel()
+        assert [(s.name, s.messages) for s in self.pl.stats] == [
+            ("_produce", 5),
+            ("_work", 5),
+            ("_consume", 5),
+        ]
+        assert all(s.seconds >= 0 for s in self.pl.stats)
+
+
+class OrderedStageTest(unittest.TestCase):
+    def setUp(self):
+        self.result = []
+        self.pl = pipeline.Pipeline(
+            (
+                _produce(),
+                pipeline.OrderedStage([_slow_work(), _slow_work()]),
+                _consume(self.result),
+            )
+        )
+
+    def test_run_sequential(self):
+        self.pl.run_sequential()
+        assert self.result == [0, 1, 1, 2, 3, 3, 4]
+
+    def test_run_parallel(self):
+        self.pl.run_parallel()
+        assert self.result == [0, 1, 1, 2, 3, 3, 4]
+
+    def test_run_parallel_constrained(self):
+        pl = pipeline.Pipeline(
+            (
+                _produce(100),
+                pipeline.OrderedStage([_work(), _work(), _work()]),
+                _consume(self.result),
+            )
+        )
+        pl.run_parallel(1)
+        assert self.result == [i * 2 for i in range(100)]
+
+    def test_exception(self):
+        pl = pipeline.Pipeline(
+            (
+                _produce(),
+                pipeline.OrderedStage([_exc_work(), _exc_work()]),
+                _consume(self.result),
+            )
+        )
+        with pytest.raises(PipelineError):
+            pl.run_parallel()
+
 
 class ExceptionTest(unittest.TestCase):
     def setUp(self):
@@ -231,6 +292,7 @@ class StageDecoratorTest(unittest.TestCase):
 
         pl = pipeline.Pipeline([iter([1, 2, 3]), add(2)])
         assert list(pl.pull()) == [3, 4, 5]
+        assert add(2).__name__ == "add"
 
     def test_mutator_stage_decorator(self):
         @pipeline.mutator_stage
@@ -1104,3 +1104,68 @@ class RelatedQueriesTest(BeetsTestCase, AssertsMixin):
         q = "artpath::A Album1"
         results = self.lib.items(q)
         self.assert_items_matched(results, ["Album1 Item1", "Album1 Item2"])
+
+
+class FlexQueryTest(BeetsTestCase, AssertsMixin):
+    """Test that queries on flexible attributes are evaluated in SQL."""
+
+    def setUp(self):
+        super().setUp()
+        self.add_item(title="rock", mood="happy", rating=5)
+        self.add_item(title="jazz", mood="calm", rating=2)
+        self.add_item(title="none")
+        album = self.add_album(title="album item")
+        album.mood = "sad"
+        album.store()
+
+    def parse(self, query_string, model_cls=beets.library.Item):
+        query, _ = beets.library.parse_query_string(query_string, model_cls)
+        return query
+
+    def test_match_query_is_pushed_down(self):
+        q = self.parse("mood:=happy")
+        assert q.clause()[0] is not None
+        self.assert_items_matched(self.lib.items(q), ["rock"])
+
+    def test_substring_query_is_pushed_down(self):
+        q = self.parse("mood:a")
+        assert q.clause()[0] is not None
+        self.assert_items_matched(
+            self.lib.items(q), ["rock", "jazz", "album item"]
+        )
+
+    def test_regexp_query_is_pushed_down(self):
+        q = self.parse("mood::^c")
+        assert q.clause()[0] is not None
+        self.assert_items_matched(self.lib.items(q), ["jazz"])
+
+    @patch("beets.library.Item._types", {"rating": types.INTEGER})
+    def test_numeric_query_is_pushed_down(self):
+        q = self.parse("rating:3..")
+        assert q.clause()[0] is not None
+        self.assert_items_matched(self.lib.items(q), ["rock"])
+
+    def test_negated_query(self):
+        results = self.lib.items("^mood:happy")
+        self.assert_items_matched(results, ["jazz", "none", "album item"])
+
+    def test_falls_back_to_album_attribute(self):
+        q = self.parse("mood:sad")
+        assert q.clause()[0] is not None
+        self.assert_items_matched(self.lib.items(q), ["album item"])
+
+    def test_item_attribute_takes_precedence_over_album(self):
+        item = self.lib.items("title:album").get()
+        item.mood = "happy"
+        item.store()
+        self.assert_items_matched(self.lib.items("mood:sad"), [])
+
+    def test_album_query(self):
+        q = self.parse("mood:sad", beets.library.Album)
+        assert q.clause()[0] is not None
+        assert len(self.lib.albums(q)) == 1
+
+    def test_query_matching_missing_value_stays_slow(self):
+        q = self.parse("mood:")
+        assert q.clause()[0] is None
+        assert len(self.lib.items(q)) == 4
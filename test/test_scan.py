@@ -0,0 +1,101 @@
+# This file is part of beets.
+# Copyright 2016, Adrian Sampson.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+"""Tests for the incremental directory walks."""
+
+import os
+from unittest.mock import patch
+
+from beets.scan import ScanJournal
+from beets.test import _common
+from beets.test.helper import BeetsTestCase
+from beets.util import syspath
+
+
+class ScanJournalTest(BeetsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.top = os.path.join(self.temp_dir, b"top")
+        self.sub = os.path.join(self.top, b"sub")
+        os.makedirs(syspath(self.sub))
+        _common.touch(os.path.join(self.top, b"a.mp3"))
+        _common.touch(os.path.join(self.sub, b"b.mp3"))
+        self.age(self.top, self.sub)
+
+    def age(self, *paths):
+        """Make the mtime of directories old enough to be trusted."""
+        for path in paths:
+            os.utime(syspath(path), (1000000000, 1000000000))
+
+    def walk(self, scanner="test", save=True):
+        journal = ScanJournal(self.lib, scanner)
+        walked = list(journal.walk(self.top))
+        if save:
+            journal.save()
+        return walked
+
+    def test_first_walk_reads_all_directories(self):
+        assert self.walk() == [
+            (self.top, [b"sub"], [b"a.mp3"], True),
+            (self.sub, [], [b"b.mp3"], True),
+        ]
+
+    def test_unchanged_directories_are_not_read(self):
+        self.walk()
+        with patch("os.scandir") as scandir:
+            walked = self.walk()
+        scandir.assert_not_called()
+        assert walked == [
+            (self.top, [b"sub"], [b"a.mp3"], False),
+            (self.sub, [], [b"b.mp3"], False),
+        ]
+
+    def test_changed_directory_is_read(self):
+        self.walk()
+        _common.touch(os.path.join(self.sub, b"c.mp3"))
+        os.utime(syspath(self.sub), (1000000010, 1000000010))
+        assert self.walk() == [
+            (self.top, [b"sub"], [b"a.mp3"], False),
+            (self.sub, [], [b"b.mp3", b"c.mp3"], True),
+        ]
+
+    def test_recently_changed_directory_is_read_again(self):
+        os.utime(syspath(self.sub))
+        self.walk()
+        walked = self.walk()
+        assert [changed for _, _, _, changed in walked] == [False, True]
+
+    def test_walk_not_saved(self):
+        self.walk(save=False)
+        assert all(changed for _, _, _, changed in self.walk())
+
+    def test_scanners_have_separate_journals(self):
+        self.walk()
+        assert all(changed for _, _, _, changed in self.walk("other"))
+
+    def test_pruned_directory_not_walked(self):
+        journal = ScanJournal(self.lib, "test")
+        walked = []
+        for root, dirs, _, _ in journal.walk(self.top):
+            walked.append(root)
+            dirs.clear()
+        assert walked == [self.top]
+
+    def test_removed_directory_forgotten(self):
+        self.walk()
+        os.remove(syspath(os.path.join(self.sub, b"b.mp3")))
+        os.rmdir(syspath(self.sub))
+        os.utime(syspath(self.top), (1000000010, 1000000010))
+        assert self.walk() == [(self.top, [], [b"a.mp3"], True)]
+        assert list(ScanJournal(self.lib, "test").entries) == [self.top]
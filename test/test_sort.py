@@ -566,3 +566,67 @@ class NonExistingFieldTest(DummyDataTestCase):
         assert isinstance(query.subqueries[0], dbcore.query.TrueQuery)
         assert isinstance(sort, dbcore.query.SlowFieldSort)
         assert sort.field == "-bar"
+
+
+@patch("beets.library.Item._types", {"rating": types.Integer()})
+class SortTypedFlexFieldTest(DummyDataTestCase):
+    def setUp(self):
+        super().setUp()
+        self.items = list(self.lib.items("id+"))
+        for item, rating in zip(self.items, [10, 9, None, -1]):
+            if rating is not None:
+                item.rating = rating
+                item.store()
+
+    def test_sort_is_fast(self):
+        _, s = beets.library.parse_query_string("rating+", beets.library.Item)
+        assert isinstance(s, dbcore.query.FlexFieldSort)
+        assert not s.is_slow()
+
+    def test_sort_asc(self):
+        results = self.lib.items("rating+")
+        assert results.sort is None
+        assert [r.id for r in results] == [
+            self.items[i].id for i in (3, 2, 1, 0)
+        ]
+
+    def test_sort_desc(self):
+        results = self.lib.items("rating-")
+        assert [r.id for r in results] == [
+            self.items[i].id for i in (0, 1, 2, 3)
+        ]
+
+    @patch("beets.library.Album._types", {"rating": types.Integer()})
+    def test_sort_falls_back_to_album_value(self):
+        album = self.items[2].get_album()
+        album.rating = 20
+        album.store()
+        results = self.lib.items("rating-")
+        assert results[0].id == self.items[2].id
+
+    def test_sort_with_limit(self):
+        results = self.lib.items("rating-", limit=2)
+        assert [r.rating for r in results] == [10, 9]
+
+
+class SortLimitTest(DummyDataTestCase):
+    def test_slow_sort_applies_limit_after_sorting(self):
+        results = self.lib.items("flex2- id+", limit=2)
+        assert isinstance(results.sort, dbcore.query.MultipleSort)
+        assert [r.flex2 for r in results] == ["Flex2-A", "Flex2-A"]
+        assert len(results) == 2
+
+    def test_slow_sort_desc_keeps_order_of_ties(self):
+        expected = list(self.lib.items("flex1-"))[:3]
+        results = self.lib.items("flex1-", limit=3)
+        assert [r.id for r in results] == [r.id for r in expected]
+
+    def test_slow_sort_limit_when_streaming(self):
+        results = self.lib.items("flex1+", limit=1, stream=True)
+        assert [r.flex1 for r in results] == ["Flex1-0"]
+        assert len(results) == 1
+
+    def test_slow_query_applies_limit_after_filtering(self):
+        results = self.lib.items("album::^Foo", limit=1)
+        assert [r.album for r in results] == ["Foo"]
+        assert len(results) == 1
@@ -274,3 +274,77 @@ class EvalTest(unittest.TestCase):
 
     def test_function_call_with_empty_arg(self):
         assert self._eval("%len{}") == "0"
+
+
+class BranchingTest(unittest.TestCase):
+    class Values(dict):
+        """Values that record which ones are looked up."""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.looked_up = []
+
+        def __getitem__(self, key):
+            self.looked_up.append(key)
+            return super().__getitem__(key)
+
+    @staticmethod
+    @functemplate.branching
+    def _if(condition, trueval, falseval=""):
+        return trueval if condition else falseval
+
+    def _eval(self, template, func=None):
+        self.values = self.Values(yes="1", no="", a="A", b="B")
+        functions = {"if": func or self._if, "lower": str.lower}
+        return functemplate.Template(template).substitute(
+            self.values, functions
+        )
+
+    def test_taken_branch(self):
+        assert self._eval("%if{$yes,$a,$b}") == "A"
+        assert self._eval("%if{$no,$a,%lower{$b}}") == "b"
+
+    def test_untaken_branch_not_looked_up(self):
+        self._eval("%if{$yes,$a,%lower{$b}}")
+        assert "b" not in self.values.looked_up
+
+    def test_missing_branch(self):
+        assert self._eval("%if{$no,$a}") == ""
+
+    def test_undefined_value_in_taken_branch(self):
+        assert self._eval("%if{$yes,$c,$b}") == "$c"
+
+    def test_function_not_branching(self):
+        def if_(condition, trueval, falseval=""):
+            return trueval if condition else falseval
+
+        assert self._eval("%if{$yes,$a,$b}", if_) == "A"
+        assert "b" in self.values.looked_up
+
+
+class SubstituteManyTest(unittest.TestCase):
+    functions = {"lower": str.lower, "if": BranchingTest._if}
+
+    def _eval(self, template, rows):
+        tmpl = functemplate.Template(template)
+        return list(tmpl.substitute_many(rows, self.functions))
+
+    def test_rows_in_order(self):
+        rows = [{"a": "X", "b": "Y"}, {"a": "Z", "b": "W"}]
+        assert self._eval("$a-%lower{$b}", rows) == ["X-y", "Z-w"]
+
+    def test_lazy_branches(self):
+        rows = [{"c": "1", "a": "A"}, {"c": "", "b": "B"}]
+        assert self._eval("%if{$c,$a,$b}", rows) == ["A", "B"]
+
+    def test_missing_value_interpreted(self):
+        rows = [{"a": "A"}, {}]
+        assert self._eval("$a!", rows) == ["A!", "$a!"]
+
+    def test_missing_function_interpreted(self):
+        assert self._eval("%upper{$a}", [{"a": "a"}]) == ["%upper{$a}"]
+
+    def test_names_include_branches(self):
+        tmpl = functemplate.Template("%if{$c,%lower{$a},$b}")
+        assert tmpl.varnames == {"a", "b", "c"}
+        assert tmpl.funcnames == {"if", "lower"}
@@ -591,6 +591,15 @@ class UpdateTest(BeetsTestCase):
             exclude_fields=exclude_fields,
         )
 
+    def test_filesize_stored_for_unchanged_item(self):
+        self.i2.filesize = 0
+        self.i2.store()
+        self._update(reset_mtime=False)
+        stored = self.lib.get_item(self.i2.id)
+        assert stored._values_fixed["filesize"] == os.path.getsize(
+            syspath(self.i2.path)
+        )
+
     def test_delete_removes_item(self):
         assert list(self.lib.items())
         util.remove(self.i.path)
@@ -621,6 +630,85 @@ class UpdateTest(BeetsTestCase):
         item = self.lib.items().get()
         assert item.title == "differentTitle"
 
+    def test_modified_metadata_detected_in_batches(self):
+        for item in (self.i, self.i2):
+            mf = MediaFile(syspath(item.path))
+            mf.title = f"differentTitle{item.id}"
+            mf.save()
+            item.mtime = 0
+            item.store()
+        commands.update_items(
+            self.lib, (), False, False, False, None, jobs=2, batch_size=1
+        )
+        for item in (self.i, self.i2):
+            stored = self.lib.get_item(item.id)
+            assert stored.title == f"differentTitle{item.id}"
+
+    def test_invalid_jobs_rejected(self):
+        with pytest.raises(ui.UserError, match="number of jobs"):
+            self.run_command("update", "-j", "0")
+
+    def test_incremental_skips_unchanged_directories(self):
+        def update(incremental):
+            # Make the directories old enough for the journal to trust.
+            for root, _, _ in os.walk(syspath(self.libdir)):
+                os.utime(root, (1000000000, 1000000000))
+            item = self.lib.get_item(self.i.id)
+            item.mtime = 0
+            item.store()
+            commands.update_items(
+                self.lib, (), False, False, False, None, incremental=incremental
+            )
+
+        update(True)
+        mf = MediaFile(syspath(self.i.path))
+        mf.title = "differentTitle"
+        mf.save()
+        update(True)
+        assert self.lib.get_item(self.i.id).title != "differentTitle"
+        update(False)
+        assert self.lib.get_item(self.i.id).title == "differentTitle"
+
+    def _incremental_update(self, query=()):
+        # Make the directories old enough for the journal to trust.
+        for root, _, _ in os.walk(syspath(self.libdir)):
+            os.utime(root, (1000000000, 1000000000))
+        commands.update_items(
+            self.lib, query, False, False, False, None, incremental=True
+        )
+
+    def _retitle(self):
+        mf = MediaFile(syspath(self.i.path))
+        mf.title = "differentTitle"
+        mf.save()
+        self.i.mtime = 0
+        self.i.store()
+
+    def test_incremental_with_query_not_recorded(self):
+        self._retitle()
+        self._incremental_update([f"id:{self.i2.id}"])
+        self._incremental_update()
+        assert self.lib.get_item(self.i.id).title == "differentTitle"
+
+    def test_incremental_read_error_checked_again(self):
+        self._retitle()
+        with patch.object(
+            library.Item, "read", side_effect=library.ReadError("x", "y")
+        ):
+            self._incremental_update()
+        self._incremental_update()
+        assert self.lib.get_item(self.i.id).title == "differentTitle"
+
+    def test_incremental_detects_deleted_item(self):
+        commands.update_items(
+            self.lib, (), False, False, False, None, incremental=True
+        )
+        util.remove(self.i.path)
+        commands.update_items(
+            self.lib, (), False, False, False, None, incremental=True
+        )
+        assert self.lib.get_item(self.i.id) is None
+
     def test_modified_metadata_moved(self):
         mf = MediaFile(syspath(self.i.path))
         mf.title = "differentTitle"
@@ -1517,6 +1605,44 @@ class CommonOptionsParserCliTest(BeetsTestCase):
         # output = self.run_with_output('stats', '-e')
         # assert 'Total size:' in output
 
+    def test_stats_stored_filesize(self):
+        self.item.filesize = 1234
+        self.item.store()
+        with patch("os.path.getsize") as getsize:
+            output = self.run_with_output("stats", "-e")
+        getsize.assert_not_called()
+        assert "Tracks: 1\n" in output
+        assert "(1234 bytes)" in output
+        assert "Albums: 1\n" in output
+
+    def test_stats_slow_query_uses_stored_filesize(self):
+        self.item.filesize = 0
+        self.item.length = 10
+        self.item.bitrate = 8000
+        self.item.store()
+        with patch.object(library.Item, "try_filesize") as try_filesize:
+            output = self.run_with_output("stats", "albumtotal::.")
+        try_filesize.assert_not_called()
+        assert "Tracks: 1\n" in output
+        assert "Approximate total size: 9.8 KiB" in output
+
+    def test_index(self):
+        output = self.run_with_output("index")
+        assert "items_by_album_id:" in output
+
+        output = self.run_with_output("index", "-a", "--create", "genre")
+        assert output == "Created index albums_by_genre.\n"
+        assert "albums_by_genre:" in self.run_with_output("index", "-a")
+
+        output = self.run_with_output("index", "--explain", "mb_trackid:=x")
+        assert "items_by_mb_trackid" in output
+
+        output = self.run_with_output("index", "-a", "-d", "albums_by_genre")
+        assert output == "Dropped index albums_by_genre.\n"
+
+        with pytest.raises(ui.UserError):
+            self.run_command("index", "--create", "nonexistent")
+
     def test_version(self):
         output = self.run_with_output("version")
         assert "Python version" in output